@@ -0,0 +1,247 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from . import metrics, models, scoring, search, validation
+from .config import settings
+
+STANDARD_COLS = models.STANDARD_COLS
+
+def split_controls(value: Optional[str]) -> List[str]:
+    """'A.8.2|A.8.3' -> ['A.8.2', 'A.8.3']"""
+    if not value:
+        return []
+    return [c.strip() for c in value.split("|") if c.strip()]
+
+@dataclass(frozen=True, slots=True)
+class CatalogQuestion:
+    # Compact, read-only copy of a models.Question row. Attribute names match
+    # the ORM model so reports can use either interchangeably.
+    id: int
+    question_id: str
+    section_id: Optional[str]
+    question_text: Optional[str]
+    iam_domain: Optional[str]
+    answer_type: Optional[str]
+    question_type: Optional[str]
+    iso_27001_2022: Optional[str]
+    nist_800_53_rev5: Optional[str]
+    soc_2_tsc: Optional[str]
+    gdpr: Optional[str]
+    pci_dss_4_0: Optional[str]
+    hipaa: Optional[str]
+    cis_controls: Optional[str]
+    notes: Optional[str]
+
+    @classmethod
+    def from_row(cls, row: models.Question) -> "CatalogQuestion":
+        return cls(**{name: getattr(row, name) for name in cls.__dataclass_fields__})
+
+# Fields a models.QuestionRevision keeps; `id` (the catalog position) comes from the question
+QUESTION_FIELDS = [name for name in CatalogQuestion.__dataclass_fields__ if name != "id"]
+
+class Catalog:
+    """Immutable snapshot of the question table for one catalog version."""
+
+    __slots__ = ("version", "questions", "index", "by_standard", "controls", "scoring", "validator", "_search_index")
+
+    def __init__(self, version: int, questions: Tuple[CatalogQuestion, ...]):
+        self.version = version
+        self.questions = questions
+        # question_id -> position in `questions`
+        self.index = MappingProxyType({q.question_id: pos for pos, q in enumerate(questions)})
+        # standard column -> questions mapped to it (non-empty column value)
+        self.by_standard = MappingProxyType({
+            std: tuple(q for q in questions if getattr(q, std) and getattr(q, std).strip())
+            for std in STANDARD_COLS
+        })
+        # (standard, control_id) -> question positions, in catalog order
+        controls = {}
+        for pos, q in enumerate(questions):
+            for std in STANDARD_COLS:
+                for control_id in split_controls(getattr(q, std)):
+                    positions = controls.setdefault((std, control_id), [])
+                    if not positions or positions[-1] != pos:
+                        positions.append(pos)
+        self.controls = MappingProxyType({key: tuple(p) for key, p in controls.items()})
+        # Membership bitsets, built once per version
+        self.scoring = scoring.ScoringEngine(questions, controls=self.controls)
+        # Answer rules per question, from its answer_type
+        self.validator = validation.CatalogValidator(questions)
+        self._search_index = None
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    def __iter__(self) -> Iterator[CatalogQuestion]:
+        return iter(self.questions)
+
+    def __contains__(self, question_id: str) -> bool:
+        return question_id in self.index
+
+    def get(self, question_id: str) -> Optional[CatalogQuestion]:
+        pos = self.index.get(question_id)
+        return self.questions[pos] if pos is not None else None
+
+    @property
+    def search_index(self) -> search.SearchIndex:
+        # Built on first use: most historical snapshots are never searched.
+        # A concurrent first search may build it twice; both are identical.
+        index = self._search_index
+        if index is None:
+            index = self._search_index = search.SearchIndex(self.questions, self.scoring)
+        return index
+
+def diff(old: Catalog, new: Catalog) -> Tuple[List[str], List[str]]:
+    """(standards whose membership changed, question_ids that moved in or out of them).
+
+    Positions are append-only, so membership bitsets of two versions are
+    directly comparable; control-ID-only edits leave the standard summary as is.
+    """
+    standards = []
+    changed = 0
+    for std in STANDARD_COLS:
+        moved = old.scoring.members[std] ^ new.scoring.members[std]
+        if moved:
+            standards.append(std)
+            changed |= moved
+    question_ids = [q.question_id for pos, q in enumerate(new.questions) if changed >> pos & 1]
+    return standards, question_ids
+
+_current: Optional[Catalog] = None
+_lock = threading.Lock()
+# Recently used snapshots by version, including the current one
+_versions: "OrderedDict[int, Catalog]" = OrderedDict()
+_versions_lock = threading.Lock()
+
+def get_version(db: Session) -> int:
+    version = db.query(models.CatalogState.version).filter(models.CatalogState.id == 1).scalar()
+    return version or 0
+
+def bump_version(db: Session) -> int:
+    # Caller commits; the new stamp becomes visible together with the rows it covers.
+    state = db.get(models.CatalogState, 1)
+    if state is None:
+        state = models.CatalogState(id=1, version=0)
+        db.add(state)
+    state.version = (state.version or 0) + 1
+    db.flush()
+    return state.version
+
+def cached_version(version: int) -> Optional[Catalog]:
+    with _versions_lock:
+        catalog = _versions.get(version)
+        if catalog is not None:
+            _versions.move_to_end(version)
+        return catalog
+
+def remember(catalog: Catalog):
+    with _versions_lock:
+        _versions[catalog.version] = catalog
+        _versions.move_to_end(catalog.version)
+        while len(_versions) > max(settings.CATALOG_CACHE_VERSIONS, 1):
+            _versions.popitem(last=False)
+
+def snapshot(version: int, questions: Iterable[CatalogQuestion]) -> Catalog:
+    """Catalog of `questions`, reusing the equal question objects of cached versions."""
+    with _versions_lock:
+        cached = list(_versions.values())
+    shared = {q: q for cat in cached for q in cat.questions}
+    return Catalog(version, tuple(shared.get(q, q) for q in questions))
+
+@metrics.timed("catalog.load")
+def load_catalog(db: Session) -> Catalog:
+    while True:
+        version = get_version(db)
+        rows = db.query(models.Question).order_by(models.Question.id).all()
+        questions = [CatalogQuestion.from_row(r) for r in rows]
+        # An import may have committed between the two reads; retry so the
+        # snapshot never carries a version stamp it does not match.
+        if get_version(db) == version:
+            return snapshot(version, questions)
+
+@metrics.timed("catalog.load_version")
+def load_version(db: Session, version: int) -> Catalog:
+    """Snapshot of an earlier `version`, from the question revisions in effect at it.
+
+    Positions are append-only, so it is a prefix of every later version and
+    reads answers packed against any of them.
+    """
+    current = get_version(db)
+    if version > current:
+        raise LookupError(f"Unknown catalog version: {version}")
+    if version == current:
+        catalog = load_catalog(db)
+        if catalog.version == version:
+            return catalog
+    revision = models.QuestionRevision
+    rows = db.execute(
+        select(models.Question.id, *(getattr(revision, name) for name in QUESTION_FIELDS))
+        .join(models.Question, models.Question.question_id == revision.question_id)
+        .where(revision.valid_from <= version, or_(revision.valid_to.is_(None), revision.valid_to > version))
+        .order_by(models.Question.id)
+    ).mappings()
+    return snapshot(version, [CatalogQuestion(**row) for row in rows])
+
+def get_catalog(db: Session) -> Catalog:
+    global _current
+    version = get_version(db)
+    catalog = _current
+    if catalog is not None and catalog.version == version:
+        return catalog
+    with _lock:
+        catalog = _current
+        if catalog is None or catalog.version != version:
+            catalog = cached_version(version) or load_catalog(db)
+            remember(catalog)
+            _current = catalog
+    return catalog
+
+def get_catalog_version(db: Session, version: Optional[int]) -> Catalog:
+    """Snapshot a submission was scored against; None (legacy rows) is the current catalog.
+
+    A cached version is served without a query: snapshots never change.
+    """
+    if version is None:
+        return get_catalog(db)
+    catalog = cached_version(version)
+    if catalog is None:
+        catalog = load_version(db, version)
+        remember(catalog)
+    return catalog
+
+async def get_version_async(db: AsyncSession) -> int:
+    version = await db.scalar(select(models.CatalogState.version).where(models.CatalogState.id == 1))
+    return version or 0
+
+async def get_catalog_async(db: AsyncSession) -> Catalog:
+    global _current
+    version = await get_version_async(db)
+    catalog = _current
+    if catalog is not None and catalog.version == version:
+        return catalog
+    # No lock: a concurrent reload builds an identical snapshot
+    catalog = cached_version(version) or await db.run_sync(load_catalog)
+    remember(catalog)
+    _current = catalog
+    return catalog
+
+async def get_catalog_version_async(db: AsyncSession, version: Optional[int]) -> Catalog:
+    if version is None:
+        return await get_catalog_async(db)
+    catalog = cached_version(version)
+    if catalog is None:
+        catalog = await db.run_sync(load_version, version)
+        remember(catalog)
+    return catalog
+
+def invalidate():
+    global _current
+    with _lock:
+        _current = None
+        with _versions_lock:
+            _versions.clear()
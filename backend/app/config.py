@@ -1,8 +1,91 @@
 import os
+from pathlib import Path
+from pydantic import field_validator
 from pydantic_settings import BaseSettings
 
+# backend/; relative paths resolve against it rather than the working directory
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+def resolve_path(path: str) -> str:
+    return path if os.path.isabs(path) else str(BASE_DIR / path)
+
+def resolve_sqlite_url(url: str) -> str:
+    scheme, sep, rest = url.partition(":///")
+    if not scheme.startswith("sqlite") or not sep or rest in ("", ":memory:") or rest.startswith("/"):
+        return url
+    return f"{scheme}{sep}{resolve_path(rest)}"
+
 class Settings(BaseSettings):
-    DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./backend/db/questions.db" if os.path.exists("backend/db") else "sqlite:///./db/questions.db")
-    CSV_PATH: str = os.getenv("CSV_PATH", "backend/question.csv" if os.path.exists("backend/question.csv") else "question.csv")
+    DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///db/questions.db")
+    CSV_PATH: str = os.getenv("CSV_PATH", "question.csv")
+    # Rows per transaction for streamed /import-csv/upload ingestion
+    IMPORT_BATCH_SIZE: int = int(os.getenv("IMPORT_BATCH_SIZE", "5000"))
+    # Submissions scored and inserted per transaction by POST /submit/batch
+    SUBMIT_BATCH_CHUNK_SIZE: int = int(os.getenv("SUBMIT_BATCH_CHUNK_SIZE", "1000"))
+    # Upper bound (characters) for the in-process rendered report LRU
+    REPORT_CACHE_MAX_BYTES: int = int(os.getenv("REPORT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    # Catalog snapshots kept in memory per process (current plus recently used versions)
+    CATALOG_CACHE_VERSIONS: int = int(os.getenv("CATALOG_CACHE_VERSIONS", "8"))
+    # Upper bound (bytes, raw + gzip) for pre-encoded /questions responses
+    CATALOG_RESPONSE_CACHE_MAX_BYTES: int = int(os.getenv("CATALOG_RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+    # Background jobs (control breakdowns, re-scores); 0 workers disables the in-process pool
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "2"))
+    JOB_POLL_INTERVAL: float = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+    JOB_RETRY_BASE_SECONDS: float = float(os.getenv("JOB_RETRY_BASE_SECONDS", "2"))
+    JOB_RETRY_MAX_SECONDS: float = float(os.getenv("JOB_RETRY_MAX_SECONDS", "300"))
+    # A running job older than this is assumed lost with its worker and re-queued
+    JOB_TIMEOUT_SECONDS: int = int(os.getenv("JOB_TIMEOUT_SECONDS", "600"))
+    # Finished jobs are deleted this long after they finish (0 keeps them); workers purge every JOB_PURGE_INTERVAL
+    JOB_RETENTION_SECONDS: int = int(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+    JOB_PURGE_INTERVAL: float = float(os.getenv("JOB_PURGE_INTERVAL", "3600"))
+
+    # Submissions read (and encoded) per batch by exports
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+    # Submissions per rescore_chunk job after a catalog change
+    RESCORE_CHUNK_SIZE: int = int(os.getenv("RESCORE_CHUNK_SIZE", "2000"))
+
+    # Per-route latency histograms, SQL counts and /metrics
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    # Allow ?profile=1 on any request to return its cProfile stats instead
+    PROFILING_ENABLED: bool = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+
+    # SQLite connection pragmas (applied on every new connection)
+    SQLITE_JOURNAL_MODE: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+    # Connection pool (file-backed SQLite and server databases)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "20"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+    # Production server (python -m app.server)
+    HOST: str = os.getenv("HOST", "0.0.0.0")
+    PORT: int = int(os.getenv("PORT", "8000"))
+    # Worker processes; each warms its own catalog before accepting traffic
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+    SERVER_BACKLOG: int = int(os.getenv("SERVER_BACKLOG", "2048"))
+    SERVER_KEEPALIVE: int = int(os.getenv("SERVER_KEEPALIVE", "5"))
+    # Concurrent connections per worker before 503s; 0 is unlimited
+    SERVER_LIMIT_CONCURRENCY: int = int(os.getenv("SERVER_LIMIT_CONCURRENCY", "0"))
+    SERVER_GRACEFUL_TIMEOUT: int = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", "30"))
+    FORWARDED_ALLOW_IPS: str = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "info")
+
+    @field_validator("DATABASE_URL")
+    @classmethod
+    def _resolve_database_url(cls, value: str) -> str:
+        return resolve_sqlite_url(value)
+
+    @field_validator("CSV_PATH")
+    @classmethod
+    def _resolve_csv_path(cls, value: str) -> str:
+        return resolve_path(value)
 
 settings = Settings()
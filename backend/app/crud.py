@@ -1,38 +1,145 @@
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import and_, delete, func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from . import models, schemas
+from . import catalog, metrics, models, schemas, scoring
+from .db import upsert_insert
 import json
 
+# Keep IN (...) lists under SQLite's bound-parameter limit
+KEY_CHUNK_SIZE = 500
+
 def get_question_by_qid(db: Session, question_id: str):
     return db.query(models.Question).filter(models.Question.question_id == question_id).first()
 
-def upsert_question(db: Session, question_data: dict):
-    # Check if exists
-    db_question = get_question_by_qid(db, question_data["question_id"])
-    if db_question:
-        # Update
-        for key, value in question_data.items():
-            setattr(db_question, key, value)
-        db.commit()
-        db.refresh(db_question)
-        return db_question, False # Updated
+@metrics.timed("crud.upsert_questions")
+def bulk_upsert_questions(db: Session, rows: list):
+    """Insert or update many questions without committing.
+
+    Existing rows are fetched with keyed IN queries, compared in memory and
+    only changed rows are written, as executemany batches.
+    Returns (inserted, updated, unchanged).
+    """
+    # Later rows win, as with repeated upserts
+    incoming = {row["question_id"]: row for row in rows}
+    qids = list(incoming)
+    columns = [getattr(models.Question, key) for key in next(iter(incoming.values()), {})]
+
+    existing = {}
+    for start in range(0, len(qids), KEY_CHUNK_SIZE):
+        chunk = qids[start:start + KEY_CHUNK_SIZE]
+        stmt = select(models.Question.id, *columns).where(models.Question.question_id.in_(chunk))
+        for row in db.execute(stmt).mappings():
+            existing[row["question_id"]] = row
+
+    to_insert = []
+    to_update = []
+    unchanged = 0
+    for qid, data in incoming.items():
+        current = existing.get(qid)
+        if current is None:
+            to_insert.append(data)
+        elif any(current[key] != value for key, value in data.items()):
+            to_update.append({"id": current["id"], **data})
+        else:
+            unchanged += 1
+
+    if to_insert:
+        db.execute(insert(models.Question), to_insert)
+    if to_update:
+        db.execute(update(models.Question), to_update)
+    replace_question_controls(db, to_insert + to_update)
+    return len(to_insert), len(to_update), unchanged
+
+def _control_rows(question_data: dict) -> list:
+    return [
+        {"question_id": question_data["question_id"], "standard": std, "control_id": control_id}
+        for std in models.STANDARD_COLS
+        for control_id in dict.fromkeys(catalog.split_controls(question_data.get(std)))
+    ]
+
+def replace_question_controls(db: Session, rows: list):
+    """Re-derive question_controls rows for the given questions, without committing."""
+    qids = [row["question_id"] for row in rows]
+    for start in range(0, len(qids), KEY_CHUNK_SIZE):
+        chunk = qids[start:start + KEY_CHUNK_SIZE]
+        db.execute(delete(models.QuestionControl).where(models.QuestionControl.question_id.in_(chunk)))
+    control_rows = [c for row in rows for c in _control_rows(row)]
+    if control_rows:
+        db.execute(insert(models.QuestionControl), control_rows)
+
+def rebuild_question_controls(db: Session):
+    # Backfill for databases populated before the control index existed
+    db.execute(delete(models.QuestionControl))
+    columns = [models.Question.question_id, *(getattr(models.Question, std) for std in models.STANDARD_COLS)]
+    rows = [dict(r) for r in db.execute(select(*columns)).mappings()]
+    replace_question_controls(db, rows)
+    db.commit()
+
+def record_question_revisions(db: Session, version: int, question_ids=None) -> int:
+    """Open a revision at `version` for each question that differs from its open one, without committing.
+
+    Checks only `question_ids` (None: every question). The previous
+    revision of a changed question is closed at `version`; unchanged
+    questions keep theirs. Returns the number of revisions opened.
+    """
+    revision = models.QuestionRevision
+    fields = catalog.QUESTION_FIELDS
+    current = select(*(getattr(models.Question, name) for name in fields))
+    open_revisions = select(revision.id, *(getattr(revision, name) for name in fields)).where(revision.valid_to.is_(None))
+    if question_ids is None:
+        chunks = [None]
     else:
-        # Insert
-        db_question = models.Question(**question_data)
-        db.add(db_question)
-        db.commit()
-        db.refresh(db_question)
-        return db_question, True # Inserted
+        question_ids = list(question_ids)
+        chunks = [question_ids[start:start + KEY_CHUNK_SIZE] for start in range(0, len(question_ids), KEY_CHUNK_SIZE)]
+
+    opened = 0
+    for chunk in chunks:
+        rows_stmt, open_stmt = current, open_revisions
+        if chunk is not None:
+            rows_stmt = rows_stmt.where(models.Question.question_id.in_(chunk))
+            open_stmt = open_stmt.where(revision.question_id.in_(chunk))
+        existing = {row["question_id"]: row for row in db.execute(open_stmt).mappings()}
+        changed = []
+        closed = []
+        for row in db.execute(rows_stmt).mappings():
+            previous = existing.get(row["question_id"])
+            if previous is not None:
+                if all(previous[name] == row[name] for name in fields):
+                    continue
+                closed.append(previous["id"])
+            changed.append({**row, "valid_from": version})
+        if closed:
+            db.execute(update(revision).where(revision.id.in_(closed)).values(valid_to=version))
+        if changed:
+            db.execute(insert(revision), changed)
+        opened += len(changed)
+    return opened
 
 def get_questions(db: Session, skip: int = 0, limit: int = 1000):
     return db.query(models.Question).offset(skip).limit(limit).all()
 
-def create_submission(db: Session, submission: schemas.SubmissionIn, summary: dict, report_html: str):
-    db_submission = models.Submission(
+@metrics.timed("crud.submission_values")
+def submission_values(submission: schemas.SubmissionIn, summary: dict, questions: catalog.Catalog, encoded=None) -> dict:
+    """Column values for a new Submission row."""
+    if encoded is None:
+        encoded = questions.scoring.encode_answers(submission.answers)
+    return dict(
+        submission_id=models.generate_uuid(),
         client_id=submission.client_id,
-        answers=[a.model_dump() for a in submission.answers],
-        summary=summary,
-        report_html=report_html
+        # Set here rather than by the server default, so no refresh is needed
+        created_at=datetime.now(timezone.utc),
+        answers_packed=scoring.pack_answers(encoded),
+        catalog_version=questions.version,
+        summary=summary
     )
+
+def new_submission(submission: schemas.SubmissionIn, summary: dict, questions: catalog.Catalog, encoded=None):
+    return models.Submission(**submission_values(submission, summary, questions, encoded))
+
+def create_submission(db: Session, submission: schemas.SubmissionIn, summary: dict, questions: catalog.Catalog, encoded=None):
+    db_submission = new_submission(submission, summary, questions, encoded)
     db.add(db_submission)
     db.commit()
     db.refresh(db_submission)
@@ -40,3 +147,245 @@ def create_submission(db: Session, submission: schemas.SubmissionIn, summary: di
 
 def get_submission(db: Session, submission_id: str):
     return db.query(models.Submission).filter(models.Submission.submission_id == submission_id).first()
+
+def encoded_submission_answers(submission: models.Submission, questions: catalog.Catalog):
+    """Code vector for a stored submission, from either storage format."""
+    if submission.answers_packed is not None:
+        return questions.scoring.unpack(submission.answers_packed)
+    return questions.scoring.encode_answers(schemas.AnswerIn(**a) for a in submission.answers or [])
+
+def submission_answers(submission: models.Submission, questions: catalog.Catalog):
+    """Answers as API dicts ({question_id, answer, notes}), from either storage format."""
+    if submission.answers_packed is not None:
+        return questions.scoring.decode_answers(questions.scoring.unpack(submission.answers_packed))
+    return submission.answers or []
+
+
+# Async variants, for endpoints running on the event loop with db.get_async_db
+
+async def get_question_by_qid_async(db: AsyncSession, question_id: str):
+    return await db.scalar(select(models.Question).where(models.Question.question_id == question_id))
+
+def questions_query(
+    columns=None,
+    after_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 1000,
+    iam_domain: Optional[str] = None,
+    section_id: Optional[str] = None,
+    standard: Optional[str] = None,
+    control_id: Optional[str] = None,
+):
+    """Keyset-paginated question query; every filter is served by an index."""
+    stmt = select(*columns) if columns else select(models.Question)
+    if after_id is not None:
+        stmt = stmt.where(models.Question.id > after_id)
+    if iam_domain is not None:
+        stmt = stmt.where(models.Question.iam_domain == iam_domain)
+    if section_id is not None:
+        stmt = stmt.where(models.Question.section_id == section_id)
+    if standard is not None:
+        # ix_question_controls_standard_control instead of scanning the column text
+        controls = select(models.QuestionControl.question_id).where(models.QuestionControl.standard == standard)
+        if control_id is not None:
+            controls = controls.where(models.QuestionControl.control_id == control_id)
+        stmt = stmt.where(models.Question.question_id.in_(controls))
+    stmt = stmt.order_by(models.Question.id).limit(limit)
+    if skip:
+        stmt = stmt.offset(skip)
+    return stmt
+
+async def get_questions_async(db: AsyncSession, skip: int = 0, limit: int = 1000, **filters):
+    result = await db.scalars(questions_query(skip=skip, limit=limit, **filters))
+    return result.all()
+
+async def get_question_rows_async(db: AsyncSession, columns, limit: int = 1000, **filters):
+    """Projection of only `columns`, as dicts."""
+    result = await db.execute(questions_query(columns, limit=limit, **filters))
+    return [dict(row) for row in result.mappings()]
+
+async def insert_submissions_async(db: AsyncSession, rows: list):
+    """Insert submission_values() rows as one executemany, in one transaction."""
+    if rows:
+        await db.execute(insert(models.Submission), rows)
+    await db.commit()
+
+async def get_submission_async(db: AsyncSession, submission_id: str):
+    return await db.get(models.Submission, submission_id)
+
+# Client history: served by ix_submissions_client_created and client_latest
+
+def _field(sub, name):
+    return sub[name] if isinstance(sub, dict) else getattr(sub, name)
+
+def latest_rows(submissions) -> list:
+    """Newest (client_id, submission_id, created_at) per client among `submissions`."""
+    latest = {}
+    for sub in submissions:
+        client_id = _field(sub, "client_id")
+        current = latest.get(client_id)
+        if current is None or _field(sub, "created_at") >= current["created_at"]:
+            latest[client_id] = {
+                "client_id": client_id,
+                "submission_id": _field(sub, "submission_id"),
+                "created_at": _field(sub, "created_at"),
+            }
+    return list(latest.values())
+
+def _latest_upsert(dialect: str):
+    stmt = upsert_insert(dialect)(models.ClientLatest)
+    return stmt.on_conflict_do_update(
+        index_elements=["client_id"],
+        set_={"submission_id": stmt.excluded.submission_id, "created_at": stmt.excluded.created_at},
+        # Never move the pointer back to an older submission
+        where=models.ClientLatest.created_at <= stmt.excluded.created_at,
+    )
+
+def update_client_latest(db: Session, submissions):
+    """Point client_latest at the newest of `submissions`, without committing."""
+    rows = latest_rows(submissions)
+    if rows:
+        db.execute(_latest_upsert(db.get_bind().dialect.name), rows)
+
+def rebuild_client_latest(db: Session) -> int:
+    """Recompute client_latest from the submissions and commit; returns the client count."""
+    db.execute(delete(models.ClientLatest))
+    newest = (
+        select(models.Submission.client_id, func.max(models.Submission.created_at).label("created_at"))
+        .group_by(models.Submission.client_id)
+        .subquery()
+    )
+    rows = db.execute(
+        select(models.Submission.client_id, models.Submission.submission_id, models.Submission.created_at)
+        .join(newest, and_(
+            models.Submission.client_id == newest.c.client_id,
+            models.Submission.created_at == newest.c.created_at,
+        ))
+    ).mappings()
+    rows = latest_rows(dict(row) for row in rows)
+    if rows:
+        db.execute(insert(models.ClientLatest), rows)
+    db.commit()
+    return len(rows)
+
+async def get_latest_submission_async(db: AsyncSession, client_id: str):
+    latest = await db.get(models.ClientLatest, client_id)
+    if latest is None:
+        return None
+    return await db.get(models.Submission, latest.submission_id)
+
+async def get_client_submissions_async(db: AsyncSession, client_id: str, limit: int = 50, before: Optional[str] = None):
+    """A client's submissions, newest first, keyset-paginated by `before` (a submission_id)."""
+    stmt = select(models.Submission).where(models.Submission.client_id == client_id)
+    if before is not None:
+        cursor = await db.get(models.Submission, before)
+        if cursor is None or cursor.client_id != client_id:
+            raise ValueError(f"Unknown cursor: {before}")
+        stmt = stmt.where(or_(
+            models.Submission.created_at < cursor.created_at,
+            and_(models.Submission.created_at == cursor.created_at, models.Submission.submission_id < cursor.submission_id),
+        ))
+    stmt = stmt.order_by(models.Submission.created_at.desc(), models.Submission.submission_id.desc()).limit(limit)
+    return (await db.scalars(stmt)).all()
+
+
+# Drafts: answers saved incrementally, one row per answered question
+
+def new_draft(client_id: str, questions: catalog.Catalog):
+    now = datetime.now(timezone.utc)
+    return models.Draft(
+        draft_id=models.generate_uuid(), client_id=client_id, status="open",
+        catalog_version=questions.version, counters=questions.scoring.empty_counters(),
+        answered=0, revision=0, created_at=now, updated_at=now
+    )
+
+async def get_draft_async(db: AsyncSession, draft_id: str):
+    return await db.get(models.Draft, draft_id)
+
+async def get_draft_answers_async(db: AsyncSession, draft_id: str, question_ids=None) -> dict:
+    """question_id -> DraftAnswer, for all answers or only `question_ids`."""
+    stmt = select(models.DraftAnswer).where(models.DraftAnswer.draft_id == draft_id)
+    if question_ids is None:
+        return {row.question_id: row for row in await db.scalars(stmt)}
+    answers = {}
+    question_ids = list(question_ids)
+    for start in range(0, len(question_ids), KEY_CHUNK_SIZE):
+        chunk = question_ids[start:start + KEY_CHUNK_SIZE]
+        for row in await db.scalars(stmt.where(models.DraftAnswer.question_id.in_(chunk))):
+            answers[row.question_id] = row
+    return answers
+
+async def draft_counters_async(db: AsyncSession, draft_id: str, questions: catalog.Catalog):
+    """Recount a draft from its answer rows: (counters, answered)."""
+    engine = questions.scoring
+    codes = bytearray(engine.size)
+    answered = 0
+    for row in (await get_draft_answers_async(db, draft_id)).values():
+        pos = engine.positions.get(row.question_id)
+        if pos is not None:
+            codes[pos] = scoring.answer_code(row.answer)
+            answered += 1
+    return engine.count(codes), answered
+
+async def update_draft_async(db: AsyncSession, draft: models.Draft, deltas, questions: catalog.Catalog) -> bool:
+    """Apply answer deltas and move the draft counters by them, without committing.
+
+    Only the touched answer rows are read and written. A repeated
+    question_id keeps its last delta. Returns False if another request
+    updated the draft first.
+    """
+    engine = questions.scoring
+    deltas = {delta.question_id: delta for delta in deltas}
+    existing = await get_draft_answers_async(db, draft.draft_id, deltas)
+    if draft.counters is not None and draft.catalog_version == questions.version:
+        counters = {std: dict(counts) for std, counts in draft.counters.items()}
+        answered = draft.answered
+    else:
+        # Standard membership may differ from when the counters were built
+        counters, answered = await draft_counters_async(db, draft.draft_id, questions)
+
+    for qid, delta in deltas.items():
+        row = existing.get(qid)
+        old = scoring.answer_code(row.answer) if row else scoring.UNANSWERED
+        if delta.answer is None:
+            new = scoring.UNANSWERED
+            if row:
+                await db.delete(row)
+                answered -= 1
+        else:
+            new = scoring.answer_code(delta.answer)
+            if row:
+                row.answer = delta.answer
+                row.notes = delta.notes
+            else:
+                db.add(models.DraftAnswer(
+                    draft_id=draft.draft_id, question_id=qid, answer=delta.answer, notes=delta.notes
+                ))
+                answered += 1
+        engine.apply_delta(counters, engine.positions[qid], old, new)
+
+    result = await db.execute(
+        update(models.Draft)
+        .where(models.Draft.draft_id == draft.draft_id, models.Draft.revision == draft.revision)
+        .values(
+            counters=counters, answered=answered, catalog_version=questions.version,
+            revision=draft.revision + 1, updated_at=datetime.now(timezone.utc)
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+async def finalize_draft_async(db: AsyncSession, draft: models.Draft, submission: models.Submission) -> bool:
+    """Store the submission and close the draft, without committing; False on a concurrent update."""
+    db.add(submission)
+    await db.execute(delete(models.DraftAnswer).where(models.DraftAnswer.draft_id == draft.draft_id))
+    result = await db.execute(
+        update(models.Draft)
+        .where(models.Draft.draft_id == draft.draft_id, models.Draft.revision == draft.revision)
+        .values(
+            status="finalized", submission_id=submission.submission_id, revision=draft.revision + 1,
+            updated_at=datetime.now(timezone.utc)
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
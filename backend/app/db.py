@@ -1,13 +1,127 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from . import metrics
 from .config import settings
 
-engine = create_engine(
-    settings.DATABASE_URL, connect_args={"check_same_thread": False}
-)
+try:
+    import orjson
+except ImportError: # Optional; JSON columns then decode with the stdlib
+    orjson = None
+
+# Summaries are decoded on every read and export
+JSON_OPTIONS = {"json_deserializer": orjson.loads} if orjson is not None else {}
+
+def async_database_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto its async driver (aiosqlite / asyncpg)."""
+    scheme, sep, rest = url.partition("://")
+    if "+" in scheme:
+        return url # Driver chosen explicitly
+    if scheme == "sqlite":
+        return f"sqlite+aiosqlite{sep}{rest}"
+    if scheme in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg{sep}{rest}"
+    return url
+
+def _is_memory_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+def engine_options(url: str) -> dict:
+    """create_engine() keyword arguments for the configured backend."""
+    url = make_url(url)
+    options = {}
+    if url.get_backend_name() == "sqlite":
+        if url.get_driver_name() == "pysqlite":
+            options["connect_args"] = {"check_same_thread": False}
+        if _is_memory_sqlite(url):
+            # Single-connection pool; pool sizing does not apply
+            return options
+        if url.get_driver_name() == "aiosqlite":
+            # Defaults to NullPool, i.e. a new connection thread per session
+            options["poolclass"] = AsyncAdaptedQueuePool
+    else:
+        options["pool_pre_ping"] = settings.DB_POOL_PRE_PING
+        options["pool_recycle"] = settings.DB_POOL_RECYCLE
+    options["pool_size"] = settings.DB_POOL_SIZE
+    options["max_overflow"] = settings.DB_MAX_OVERFLOW
+    options["pool_timeout"] = settings.DB_POOL_TIMEOUT
+    return options
+
+def apply_sqlite_pragmas(engine: Engine):
+    """WAL journal, relaxed fsync, busy wait and mmap on every new SQLite connection."""
+    if engine.dialect.name != "sqlite":
+        return
+    pragmas = [
+        f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}",
+    ]
+    if not _is_memory_sqlite(engine.url):
+        pragmas.insert(0, f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+# Backends with an async driver mapping (async_database_url) and an
+# INSERT ... ON CONFLICT upsert (upsert_insert), which every submit runs
+SUPPORTED_DIALECTS = ("sqlite", "postgresql")
+# Oldest server versions with native JSON column support; SQLite needs JSON1
+MIN_JSON_VERSIONS = {"postgresql": (9, 2)}
+
+def check_database(engine: Engine):
+    """Fail fast at startup on a backend the app cannot write to."""
+    name = engine.dialect.name
+    if name not in SUPPORTED_DIALECTS:
+        raise RuntimeError(f"Unsupported database backend: {name}. Use SQLite or PostgreSQL")
+    with engine.connect() as conn:
+        if name == "sqlite":
+            try:
+                conn.execute(text("SELECT json('{}')"))
+            except Exception as e:
+                raise RuntimeError("SQLite was built without the JSON1 extension") from e
+            return
+        version = engine.dialect.server_version_info or ()
+        if version and version[:2] < MIN_JSON_VERSIONS[name]:
+            raise RuntimeError(
+                f"{name} {'.'.join(map(str, version))} lacks JSON support; "
+                f"{'.'.join(map(str, MIN_JSON_VERSIONS[name]))}+ is required"
+            )
+
+def upsert_insert(dialect: str):
+    """The dialect's insert(), whose statements support on_conflict_do_update().
+
+    check_database admits only SUPPORTED_DIALECTS at startup, so writes never
+    reach the error below.
+    """
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f"Unsupported database backend: {dialect}. Use SQLite or PostgreSQL")
+    return insert
+
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL), **JSON_OPTIONS)
+apply_sqlite_pragmas(engine)
+metrics.instrument(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+ASYNC_DATABASE_URL = async_database_url(settings.DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL), **JSON_OPTIONS)
+apply_sqlite_pragmas(async_engine.sync_engine)
+metrics.instrument(async_engine.sync_engine)
+# Objects stay usable after commit without an implicit (blocking) reload
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -16,3 +130,11 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def get_session_factory():
+    """For responses that outlive the request's session, such as streamed exports."""
+    return SessionLocal
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
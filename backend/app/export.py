@@ -0,0 +1,294 @@
+"""Bulk export of submissions for offline analytics.
+
+Two row shapes:
+- "submissions": one row per submission, with status and counts per standard.
+- "answers": one row per answered question.
+
+Formats are CSV, NDJSON, Arrow IPC and Parquet. Arrow and Parquet need the
+optional pyarrow package. Rows are read in EXPORT_BATCH_SIZE batches with
+yield_per (a server-side cursor where the driver has one) and encoded batch
+by batch, so memory stays bounded however many rows match.
+
+    python -m app.export --format parquet --start 2024-01-01 --out submissions.parquet
+"""
+import argparse
+import csv
+import io
+import sys
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from . import catalog, crud, models, responses
+from .config import settings
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError: # Optional; only the arrow and parquet formats need it
+    pyarrow = None
+
+STATUS_COUNTS = ("total", "yes", "no", "na", "unanswered")
+
+# (name, type) per column; types are "str", "int" and "timestamp"
+Column = Tuple[str, str]
+
+SUBMISSION_COLUMNS: List[Column] = [
+    ("submission_id", "str"), ("client_id", "str"), ("created_at", "timestamp"), ("catalog_version", "int"),
+    *(column for std in models.STANDARD_COLS for column in [
+        (f"{std}_status", "str"), *((f"{std}_{count}", "int") for count in STATUS_COUNTS)
+    ]),
+]
+ANSWER_COLUMNS: List[Column] = [
+    ("submission_id", "str"), ("client_id", "str"), ("created_at", "timestamp"),
+    ("question_id", "str"), ("answer", "str"), ("notes", "str"),
+]
+
+def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite returns naive datetimes; every stored timestamp is UTC
+    if value is None:
+        return None
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+_NO_ENTRY = (None,) * (1 + len(STATUS_COUNTS))
+
+def submission_row(submission) -> tuple:
+    summary = submission.summary or {}
+    row = (submission.submission_id, submission.client_id, as_utc(submission.created_at), submission.catalog_version)
+    for std in models.STANDARD_COLS:
+        entry = summary.get(std)
+        if not entry:
+            row += _NO_ENTRY
+            continue
+        counts = entry.get("counts") or {}
+        # Unrolled STATUS_COUNTS: this runs per standard for every exported row
+        row += (
+            entry.get("status"), counts.get("total"), counts.get("yes"),
+            counts.get("no"), counts.get("na"), counts.get("unanswered"),
+        )
+    return row
+
+def answer_rows(submission, questions: catalog.Catalog) -> Iterator[tuple]:
+    created_at = as_utc(submission.created_at)
+    for answer in crud.submission_answers(submission, questions):
+        yield (
+            submission.submission_id, submission.client_id, created_at,
+            answer["question_id"], answer["answer"], answer.get("notes"),
+        )
+
+KINDS: Dict[str, List[Column]] = {"submissions": SUBMISSION_COLUMNS, "answers": ANSWER_COLUMNS}
+
+def submissions_query(*columns, client_id: Optional[str] = None, start: Optional[datetime] = None, end: Optional[datetime] = None):
+    """`columns` of submissions with start <= created_at < end, oldest first."""
+    stmt = select(*columns)
+    if client_id is not None:
+        stmt = stmt.where(models.Submission.client_id == client_id)
+    if start is not None:
+        stmt = stmt.where(models.Submission.created_at >= as_utc(start))
+    if end is not None:
+        stmt = stmt.where(models.Submission.created_at < as_utc(end))
+    return stmt.order_by(models.Submission.created_at, models.Submission.submission_id)
+
+def iter_batches(
+    db: Session, kind: str = "submissions", batch_size: int = settings.EXPORT_BATCH_SIZE, **filters
+) -> Iterator[List[tuple]]:
+    """Export rows of `kind`, one list per batch of submissions read."""
+    if kind not in KINDS:
+        raise ValueError(f"Unknown export kind: {kind}")
+    # Plain rows rather than ORM objects: nothing accumulates in the session,
+    # and report HTML and controls stay unread
+    columns = [
+        models.Submission.submission_id, models.Submission.client_id,
+        models.Submission.created_at, models.Submission.catalog_version,
+    ]
+    if kind == "answers":
+        columns += [models.Submission.answers, models.Submission.answers_packed]
+    else:
+        columns.append(models.Submission.summary)
+    questions = catalog.get_catalog(db) if kind == "answers" else None
+    result = db.execute(submissions_query(*columns, **filters).execution_options(yield_per=batch_size))
+    for submissions in result.partitions():
+        if kind == "answers":
+            yield [row for submission in submissions for row in answer_rows(submission, questions)]
+        else:
+            yield [submission_row(submission) for submission in submissions]
+
+
+# Writers: encode a header, then each batch, then a footer, as bytes
+
+def _text_value(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+class CsvWriter:
+    media_type = "text/csv; charset=utf-8"
+    extension = "csv"
+
+    def __init__(self, columns: List[Column]):
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+        self.writer.writerow([name for name, _ in columns])
+
+    def _drain(self) -> bytes:
+        data = self.buffer.getvalue().encode("utf-8")
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data
+
+    def header(self) -> bytes:
+        return self._drain()
+
+    def write(self, rows: List[tuple]) -> bytes:
+        self.writer.writerows([_text_value(v) for v in row] for row in rows)
+        return self._drain()
+
+    def close(self) -> bytes:
+        return b""
+
+class NdjsonWriter:
+    media_type = "application/x-ndjson"
+    extension = "ndjson"
+
+    def __init__(self, columns: List[Column]):
+        self.names = [name for name, _ in columns]
+
+    def header(self) -> bytes:
+        return b""
+
+    def write(self, rows: List[tuple]) -> bytes:
+        names = self.names
+        return b"".join(
+            responses.dumps({name: _text_value(v) for name, v in zip(names, row)}) + b"\n" for row in rows
+        )
+
+    def close(self) -> bytes:
+        return b""
+
+class _Sink:
+    """Write-only file object whose contents are taken after each batch."""
+
+    closed = False
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def _arrow_schema(columns: List[Column]):
+    types = {"str": pyarrow.string(), "int": pyarrow.int64(), "timestamp": pyarrow.timestamp("us", tz="UTC")}
+    return pyarrow.schema([(name, types[kind]) for name, kind in columns])
+
+class ArrowWriter:
+    """Arrow IPC stream: one record batch per export batch."""
+
+    media_type = "application/vnd.apache.arrow.stream"
+    extension = "arrow"
+
+    def __init__(self, columns: List[Column]):
+        self.schema = _arrow_schema(columns)
+        self.sink = _Sink()
+        self.writer = self._open()
+
+    def _open(self):
+        return pyarrow.ipc.new_stream(pyarrow.PythonFile(self.sink, mode="w"), self.schema)
+
+    def header(self) -> bytes:
+        return self.sink.drain()
+
+    def write(self, rows: List[tuple]) -> bytes:
+        if rows:
+            columns = list(zip(*rows))
+            self.writer.write_table(pyarrow.Table.from_arrays(
+                [pyarrow.array(values, type=field.type) for values, field in zip(columns, self.schema)],
+                schema=self.schema,
+            ))
+        return self.sink.drain()
+
+    def close(self) -> bytes:
+        self.writer.close()
+        return self.sink.drain()
+
+class ParquetWriter(ArrowWriter):
+    """Parquet: one row group per export batch; the footer is written on close."""
+
+    media_type = "application/vnd.apache.parquet"
+    extension = "parquet"
+
+    def _open(self):
+        return pyarrow.parquet.ParquetWriter(pyarrow.PythonFile(self.sink, mode="w"), self.schema, compression="zstd")
+
+FORMATS: Dict[str, Callable[[List[Column]], Any]] = {
+    "csv": CsvWriter, "ndjson": NdjsonWriter, "arrow": ArrowWriter, "parquet": ParquetWriter,
+}
+
+def writer_for(fmt: str, kind: str):
+    """Raises ValueError for an unknown format or kind, or a missing pyarrow."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}. Use one of {', '.join(FORMATS)}")
+    if kind not in KINDS:
+        raise ValueError(f"Unknown export kind: {kind}. Use one of {', '.join(KINDS)}")
+    if fmt in ("arrow", "parquet") and pyarrow is None:
+        raise ValueError(f"The {fmt} format needs the pyarrow package")
+    return FORMATS[fmt](KINDS[kind])
+
+def iter_export(db: Session, writer, kind: str = "submissions", batch_size: int = settings.EXPORT_BATCH_SIZE, **filters) -> Iterator[bytes]:
+    """Encoded export, chunk by chunk."""
+    yield writer.header()
+    for rows in iter_batches(db, kind, batch_size, **filters):
+        data = writer.write(rows)
+        if data:
+            yield data
+    yield writer.close()
+
+def parse_datetime(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+def main(argv=None):
+    from .db import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Export submissions for offline analytics")
+    parser.add_argument("--format", default="csv", choices=list(FORMATS))
+    parser.add_argument("--kind", default="submissions", choices=list(KINDS))
+    parser.add_argument("--client-id")
+    parser.add_argument("--start", type=parse_datetime, help="created_at lower bound (inclusive), ISO 8601")
+    parser.add_argument("--end", type=parse_datetime, help="created_at upper bound (exclusive), ISO 8601")
+    parser.add_argument("--batch-size", type=int, default=settings.EXPORT_BATCH_SIZE)
+    parser.add_argument("--out", help="output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    try:
+        writer = writer_for(args.format, args.kind)
+    except ValueError as e:
+        parser.error(str(e))
+    out = open(args.out, "wb") if args.out else sys.stdout.buffer
+    try:
+        with SessionLocal() as db:
+            for chunk in iter_export(
+                db, writer, args.kind, args.batch_size, client_id=args.client_id, start=args.start, end=args.end
+            ):
+                out.write(chunk)
+    finally:
+        if args.out:
+            out.close()
+
+if __name__ == "__main__":
+    main()
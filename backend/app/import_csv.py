@@ -1,61 +1,180 @@
+import codecs
 import csv
-import json
+from itertools import islice
+from typing import Callable, Iterable, Iterator, Optional
+from multipart.exceptions import FormParserError
+from multipart.multipart import MultipartParser, parse_options_header
 from sqlalchemy.orm import Session
-from . import crud, models
+from . import catalog, crud, metrics, models
 from .config import settings
 
-def import_questions_from_csv(db: Session, csv_path: str = settings.CSV_PATH):
-    inserted_count = 0
-    updated_count = 0
-    
-    # Standards columns mapping
-    STANDARD_COLS = [
-        "iso_27001_2022", "nist_800_53_rev5", "soc_2_tsc", 
-        "gdpr", "pci_dss_4_0", "hipaa", "cis_controls"
-    ]
+# CSV columns mapped onto models.Question; anything else is kept in meta
+QUESTION_COLUMNS = [
+    "question_id", "section_id", "question_text", "iam_domain", "answer_type",
+    "question_type", *models.STANDARD_COLS, "notes"
+]
 
+def question_data_from_row(row: dict) -> Optional[dict]:
+    # Extract basic fields
+    question_id = row.get("question_id")
+    if not question_id:
+        return None # Skip empty rows
+
+    question_data = {col: row.get(col, "") for col in QUESTION_COLUMNS}
+    question_data["answer_type"] = row.get("answer_type", "yes_no_partial_with_text")
+    # Only unmapped, named columns; the mapped ones already have their own fields
+    question_data["meta"] = {
+        k: v for k, v in row.items()
+        if isinstance(k, str) and k and k not in question_data
+    }
+    return question_data
+
+def iter_question_rows(lines: Iterable[str]) -> Iterator[dict]:
+    for row in csv.DictReader(lines):
+        question_data = question_data_from_row(row)
+        if question_data is not None:
+            yield question_data
+
+def iter_text_lines(chunks: Iterable[bytes], encoding: str = "utf-8-sig") -> Iterator[str]:
+    """Decode a byte stream into newline-terminated lines, one chunk at a time."""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    pending = ""
+    for chunk in chunks:
+        pending += decoder.decode(chunk)
+        if "\n" not in pending:
+            continue
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+class UploadError(ValueError):
+    """A malformed upload body, as opposed to a malformed CSV."""
+
+def iter_multipart_file(chunks: Iterable[bytes], content_type: str, field: str = "file") -> Iterator[bytes]:
+    """The bytes of one multipart/form-data part, as the body arrives.
+
+    Parts are parsed from the raw body rather than spooled to a temporary
+    file first; other fields are skipped. Raises UploadError if the body is
+    malformed or has no `field` part.
+    """
+    _, options = parse_options_header(content_type)
+    boundary = options.get(b"boundary")
+    if not boundary:
+        raise UploadError("Multipart upload without a boundary")
+    wanted = field.encode()
+    # Current part: its header being read, and whether it is the wanted one
+    state = {"header": b"", "value": b"", "current": False, "found": False}
+    data = []
+
+    def on_part_begin():
+        state["current"] = False
+
+    def on_header_field(buf, start, end):
+        state["header"] += buf[start:end]
+
+    def on_header_value(buf, start, end):
+        state["value"] += buf[start:end]
+
+    def on_header_end():
+        if state["header"].lower() == b"content-disposition":
+            _, params = parse_options_header(state["value"])
+            state["current"] = params.get(b"name") == wanted
+            state["found"] = state["found"] or state["current"]
+        state["header"] = state["value"] = b""
+
+    def on_part_data(buf, start, end):
+        if state["current"]:
+            data.append(buf[start:end])
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin, "on_header_field": on_header_field,
+        "on_header_value": on_header_value, "on_header_end": on_header_end, "on_part_data": on_part_data,
+    })
+    try:
+        for chunk in chunks:
+            parser.write(chunk)
+            if data:
+                yield b"".join(data)
+                data.clear()
+        parser.finalize()
+    except FormParserError as e:
+        raise UploadError(f"Malformed multipart body: {e}") from e
+    if not state["found"]:
+        raise UploadError(f"Multipart upload must include a '{field}' field")
+
+@metrics.timed("import_csv.import")
+def import_questions_from_rows(
+    db: Session,
+    rows: Iterable[dict],
+    batch_size: Optional[int] = None,
+    on_batch: Optional[Callable[[dict], None]] = None,
+):
+    """Upsert question rows, committing every `batch_size` rows (None: one transaction)."""
+    totals = {"inserted": 0, "updated": 0, "unchanged": 0}
+    rows = iter(rows)
+    batch_no = 0
+
+    try:
+        while True:
+            batch = list(islice(rows, batch_size)) if batch_size else list(rows)
+            if not batch:
+                break
+            batch_no += 1
+
+            inserted, updated, unchanged = crud.bulk_upsert_questions(db, batch)
+            # The stamp commits with the rows it covers, so every worker
+            # process reloads a consistent catalog after each batch
+            if inserted or updated:
+                version = catalog.bump_version(db)
+                # Earlier versions keep the revisions this batch replaces
+                crud.record_question_revisions(db, version, [row["question_id"] for row in batch])
+            db.commit()
+
+            totals["inserted"] += inserted
+            totals["updated"] += updated
+            totals["unchanged"] += unchanged
+            if on_batch:
+                on_batch({
+                    "batch": batch_no, "rows": len(batch),
+                    "inserted": inserted, "updated": updated, "unchanged": unchanged
+                })
+            if not batch_size:
+                break
+    except Exception:
+        db.rollback()
+        raise
+
+    return totals
+
+def import_questions_from_stream(
+    db: Session,
+    chunks: Iterable[bytes],
+    batch_size: int = settings.IMPORT_BATCH_SIZE,
+    on_batch: Optional[Callable[[dict], None]] = None,
+):
+    # Only the current chunk and batch are held in memory
+    rows = iter_question_rows(iter_text_lines(chunks))
+    return import_questions_from_rows(db, rows, batch_size=batch_size, on_batch=on_batch)
+
+def import_questions_from_csv(db: Session, csv_path: str = settings.CSV_PATH, batch_size: Optional[int] = None):
     with open(csv_path, mode='r', encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f)
-        
-        for row in reader:
-            # Extract basic fields
-            question_id = row.get("question_id")
-            if not question_id:
-                continue # Skip empty rows
-                
-            question_data = {
-                "question_id": question_id,
-                "section_id": row.get("section_id", ""),
-                "question_text": row.get("question_text", ""),
-                "iam_domain": row.get("iam_domain", ""),
-                "answer_type": row.get("answer_type", "yes_no_partial_with_text"),
-                "question_type": row.get("question_type", ""),
-                "iso_27001_2022": row.get("iso_27001_2022", ""),
-                "nist_800_53_rev5": row.get("nist_800_53_rev5", ""),
-                "soc_2_tsc": row.get("soc_2_tsc", ""),
-                "gdpr": row.get("gdpr", ""),
-                "pci_dss_4_0": row.get("pci_dss_4_0", ""),
-                "hipaa": row.get("hipaa", ""),
-                "cis_controls": row.get("cis_controls", ""),
-                "notes": row.get("notes", ""),
-                "meta": row # Store full row
-            }
-            
-            # Upsert
-            _, is_new = crud.upsert_question(db, question_data)
-            if is_new:
-                inserted_count += 1
-            else:
-                updated_count += 1
-                
-    return {"inserted": inserted_count, "updated": updated_count}
+        return import_questions_from_rows(db, iter_question_rows(f), batch_size=batch_size)
 
 if __name__ == "__main__":
+    from . import jobs
     from .db import SessionLocal, engine
     models.Base.metadata.create_all(bind=engine)
     db = SessionLocal()
     try:
+        before = catalog.get_catalog(db)
         stats = import_questions_from_csv(db)
+        # As the import endpoints do: record the change and re-score older submissions
+        rescore = jobs.queue_rescore(db, before)
         print(f"Import completed: {stats}")
+        if rescore:
+            print(f"Re-score queued: job {rescore.id}")
     finally:
         db.close()
@@ -1,8 +1,25 @@
-from .db import engine, Base
-from . import models
+from .db import engine, Base, SessionLocal
+from . import crud, migrations, models, rollups
 
 def init_db():
     Base.metadata.create_all(bind=engine)
+    migrations.migrate(engine)
+    db = SessionLocal()
+    try:
+        if db.query(models.QuestionControl).first() is None:
+            crud.rebuild_question_controls(db)
+        # Databases from before question history: the current rows stand in for every earlier version
+        if db.query(models.QuestionRevision).first() is None and db.query(models.Question).first() is not None:
+            crud.record_question_revisions(db, 0)
+            db.commit()
+        if db.query(models.ClientLatest).first() is None and db.query(models.Submission).first() is not None:
+            crud.rebuild_client_latest(db)
+        # Backfill for submissions stored before the rollup table existed
+        if db.query(models.ComplianceRollup).first() is None and db.query(models.Submission).first() is not None:
+            rollups.rebuild(db)
+            db.commit()
+    finally:
+        db.close()
 
 if __name__ == "__main__":
     print("Creating tables...")
@@ -0,0 +1,333 @@
+"""Durable background jobs, stored in the `jobs` table of the main database.
+
+Jobs are enqueued in the same transaction as the rows they refer to, so a
+committed submission always has its post-processing queued. Workers claim
+jobs with a conditional UPDATE, which works the same on SQLite and
+Postgres, and retry failures with exponential backoff.
+"""
+import logging
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+from sqlalchemy import and_, delete, func, insert, or_, select, update
+from sqlalchemy.orm import Session
+from . import catalog, crud, models, rollups
+from . import db as database
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+# Post-processing queued for every new submission. Reports are not
+# pre-rendered: the render cache is per process, so a job would rarely warm
+# the process that serves the GET.
+SUBMISSION_JOBS = ("control_breakdown",)
+
+HANDLERS: Dict[str, Callable[[Session, models.Job], Optional[dict]]] = {}
+
+def handler(kind: str):
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def job_values(kind: str, submission_id: Optional[str] = None, payload: Optional[dict] = None) -> dict:
+    now = utcnow()
+    return dict(
+        id=models.generate_uuid(), kind=kind, status=QUEUED, submission_id=submission_id,
+        payload=payload, attempts=0, max_attempts=settings.JOB_MAX_ATTEMPTS,
+        created_at=now, run_after=now
+    )
+
+def enqueue(
+    db, kind: str, submission_id: Optional[str] = None, payload: Optional[dict] = None, parent_id: Optional[str] = None
+) -> models.Job:
+    """Add a job to the session (sync or async); it is queued when the caller commits."""
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job = models.Job(**job_values(kind, submission_id, payload), parent_id=parent_id)
+    db.add(job)
+    return job
+
+def submission_job_rows(submission_ids: List[str]) -> List[dict]:
+    """Rows for insert(models.Job): the post-processing of many submissions."""
+    return [job_values(kind, sid) for sid in submission_ids for kind in SUBMISSION_JOBS]
+
+def enqueue_submission(db, submission_id: str) -> List[models.Job]:
+    return [enqueue(db, kind, submission_id) for kind in SUBMISSION_JOBS]
+
+def backoff(attempts: int) -> float:
+    return min(settings.JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.JOB_RETRY_MAX_SECONDS)
+
+def _runnable(now: datetime):
+    stale = now - timedelta(seconds=settings.JOB_TIMEOUT_SECONDS)
+    return or_(
+        and_(models.Job.status == QUEUED, models.Job.run_after <= now),
+        and_(models.Job.status == RUNNING, models.Job.started_at < stale),
+    )
+
+def claim(db: Session) -> Optional[models.Job]:
+    """Mark the next runnable job as running and return it (None if idle)."""
+    while True:
+        now = utcnow()
+        job_id = db.scalar(
+            select(models.Job.id).where(_runnable(now)).order_by(models.Job.run_after).limit(1)
+        )
+        if job_id is None:
+            db.rollback()
+            return None
+        # Only one worker's UPDATE matches; the others pick again
+        claimed = db.execute(
+            update(models.Job)
+            .where(models.Job.id == job_id, _runnable(now))
+            .values(status=RUNNING, started_at=now, attempts=models.Job.attempts + 1)
+        ).rowcount
+        db.commit()
+        if claimed:
+            return db.get(models.Job, job_id, populate_existing=True)
+
+def run(db: Session, job: models.Job):
+    try:
+        result = HANDLERS[job.kind](db, job)
+    except Exception as e:
+        db.rollback()
+        job = db.get(models.Job, job.id, populate_existing=True)
+        job.last_error = "".join(traceback.format_exception_only(type(e), e)).strip()
+        if job.attempts >= job.max_attempts:
+            job.status = FAILED
+            job.finished_at = utcnow()
+            logger.exception("Job %s (%s) failed permanently", job.id, job.kind)
+        else:
+            job.status = QUEUED
+            job.run_after = utcnow() + timedelta(seconds=backoff(job.attempts))
+            logger.warning("Job %s (%s) failed, retrying: %s", job.id, job.kind, job.last_error)
+    else:
+        job.status = SUCCEEDED
+        job.result = result
+        job.finished_at = utcnow()
+    db.commit()
+
+def run_pending(db: Session, limit: Optional[int] = None) -> int:
+    """Run runnable jobs in this thread until none are left; returns how many ran."""
+    ran = 0
+    while limit is None or ran < limit:
+        job = claim(db)
+        if job is None:
+            break
+        run(db, job)
+        ran += 1
+    return ran
+
+def purge_finished(db: Session, retention: float = settings.JOB_RETENTION_SECONDS) -> int:
+    """Delete jobs that succeeded or failed more than `retention` seconds ago; commits."""
+    cutoff = utcnow() - timedelta(seconds=retention)
+    deleted = db.execute(
+        delete(models.Job).where(models.Job.status.in_((SUCCEEDED, FAILED)), models.Job.finished_at < cutoff)
+    ).rowcount
+    db.commit()
+    return deleted
+
+def get_job(db: Session, job_id: str) -> Optional[models.Job]:
+    return db.get(models.Job, job_id)
+
+async def get_job_async(db, job_id: str) -> Optional[models.Job]:
+    return await db.get(models.Job, job_id)
+
+async def job_progress_async(db, job: models.Job) -> Optional[dict]:
+    """Status counts of the chunk jobs a coordinating job fanned out to."""
+    rows = (await db.execute(
+        select(models.Job.status, func.count())
+        .where(models.Job.parent_id == job.id)
+        .group_by(models.Job.status)
+    )).all()
+    if not rows:
+        return None
+    counts = dict(rows)
+    total = sum(counts.values())
+    done = counts.get(SUCCEEDED, 0) + counts.get(FAILED, 0)
+    return {"chunks": total, **counts, "done": done, "percent": round(100 * done / total, 1)}
+
+async def insert_submission_jobs_async(db, submission_ids: List[str]):
+    # No commit: queued in the caller's transaction with the submissions
+    rows = submission_job_rows(submission_ids)
+    if rows:
+        await db.execute(insert(models.Job), rows)
+
+class WorkerPool:
+    """Threads polling the jobs table; wake() skips the poll delay after an enqueue."""
+
+    def __init__(self, workers: int = settings.JOB_WORKERS, session_factory=None):
+        self.workers = workers
+        self.session_factory = session_factory or database.SessionLocal
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._purged_at = time.monotonic()
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._loop, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self, timeout: float = 10):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                with self.session_factory() as db:
+                    ran = run_pending(db)
+                    self._purge(db)
+            except Exception:
+                logger.exception("Job worker error")
+                ran = 0
+            if not ran:
+                self._wake.wait(settings.JOB_POLL_INTERVAL)
+                self._wake.clear()
+
+    def _purge(self, db: Session):
+        # Threads may race here; a second purge just deletes nothing
+        if not settings.JOB_RETENTION_SECONDS or time.monotonic() - self._purged_at < settings.JOB_PURGE_INTERVAL:
+            return
+        self._purged_at = time.monotonic()
+        deleted = purge_finished(db)
+        if deleted:
+            logger.info("Purged %d finished jobs", deleted)
+
+pool = WorkerPool()
+
+
+@handler("control_breakdown")
+def control_breakdown(db: Session, job: models.Job):
+    """Store the per-control breakdown served by /standards/controls."""
+    submission = crud.get_submission(db, job.submission_id)
+    if submission is None:
+        return None
+    questions = catalog.get_catalog_version(db, submission.catalog_version)
+    encoded = crud.encoded_submission_answers(submission, questions)
+    submission.controls_summary = questions.scoring.summarize_controls(encoded.codes, encoded.na_notes)
+    submission.controls_version = questions.version
+    return {"catalog_version": questions.version}
+
+def queue_rescore(db: Session, before: catalog.Catalog) -> Optional[models.Job]:
+    """Record what an import changed since `before` and queue the re-score; commits.
+
+    Every version bump is recorded, even with no standards changed (text-only
+    edits), so the history back to any submission's version stays
+    contiguous. Returns None when no standard's membership changed or no
+    stored submission predates the change.
+    """
+    after = catalog.get_catalog(db)
+    if after.version == before.version:
+        return None
+    standards, question_ids = catalog.diff(before, after)
+    db.add(models.CatalogChange(
+        from_version=before.version, to_version=after.version,
+        standards=standards, question_ids=question_ids
+    ))
+    if not standards:
+        db.commit()
+        return None
+    stale = db.scalar(select(models.Submission.submission_id).where(*_stale_submissions(after.version)).limit(1))
+    job = enqueue(db, "rescore", payload={"version": after.version, "standards": standards}) if stale else None
+    db.commit()
+    pool.wake()
+    return job
+
+def _stale_submissions(version: int):
+    return (
+        models.Submission.answers_packed.is_not(None),
+        or_(models.Submission.catalog_version < version, models.Submission.catalog_version.is_(None)),
+    )
+
+@handler("rescore")
+def rescore(db: Session, job: models.Job):
+    """Fan stale submissions out to rescore_chunk jobs of RESCORE_CHUNK_SIZE.
+
+    Chunks are submission_id ranges, so workers in every process can take
+    them in parallel.
+    """
+    version = job.payload["version"]
+    # Retried after a partial fan-out: start over
+    db.execute(delete(models.Job).where(models.Job.parent_id == job.id, models.Job.status == QUEUED))
+    ids = db.execute(
+        select(models.Submission.submission_id)
+        .where(*_stale_submissions(version))
+        .order_by(models.Submission.submission_id)
+        .execution_options(yield_per=settings.RESCORE_CHUNK_SIZE)
+    ).scalars()
+    chunks = 0
+    submissions = 0
+    for chunk in ids.partitions():
+        enqueue(db, "rescore_chunk", payload={"version": version, "first": chunk[0], "last": chunk[-1]}, parent_id=job.id)
+        chunks += 1
+        submissions += len(chunk)
+    return {"chunks": chunks, "submissions": submissions}
+
+def _changed_standards(changes: List[models.CatalogChange], version: Optional[int]) -> List[str]:
+    """Standards to recompute for a submission scored at catalog `version`."""
+    relevant = [c for c in changes if version is None or c.to_version > version]
+    if version is None or not relevant or min(c.from_version for c in relevant) > version:
+        # No recorded history back to its version: recompute everything
+        return list(models.STANDARD_COLS)
+    return sorted({std for c in relevant for std in c.standards})
+
+@handler("rescore_chunk")
+def rescore_chunk(db: Session, job: models.Job):
+    """Recompute only the changed standard entries of one range of submissions."""
+    questions = catalog.get_catalog(db)
+    changes = db.scalars(select(models.CatalogChange).where(models.CatalogChange.to_version <= questions.version)).all()
+    submissions = db.scalars(
+        select(models.Submission)
+        .where(
+            models.Submission.submission_id.between(job.payload["first"], job.payload["last"]),
+            *_stale_submissions(questions.version),
+        )
+    ).all()
+    deltas = {}
+    for submission in submissions:
+        standards = _changed_standards(changes, submission.catalog_version)
+        encoded = questions.scoring.unpack(submission.answers_packed)
+        old = submission.summary or {}
+        new = questions.scoring.summarize(encoded.codes, encoded.na_notes, standards=standards)
+        month = rollups.bucket(submission.created_at)
+        for std, entry in new.items():
+            if std in old:
+                rollups.add_entry(deltas, (submission.client_id, std, month), old[std], -1)
+            rollups.add_entry(deltas, (submission.client_id, std, month), entry)
+        # New dict: JSON columns only track reassignment
+        submission.summary = {**old, **new}
+        submission.catalog_version = questions.version
+    rollups.apply(db, deltas)
+    return {"rescored": len(submissions), "catalog_version": questions.version}
+
+@handler("rebuild_rollups")
+def rebuild_rollups(db: Session, job: models.Job):
+    return {"rows": rollups.rebuild(db)}
+
+if __name__ == "__main__":
+    # Standalone worker process: python -m app.jobs (set JOB_WORKERS=0 on the API)
+    logging.basicConfig(level=logging.INFO)
+    worker_pool = WorkerPool(max(settings.JOB_WORKERS, 1))
+    worker_pool.start()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        worker_pool.stop()
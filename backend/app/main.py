@@ -1,16 +1,63 @@
-from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+from datetime import date, datetime, timezone
+import anyio
+import csv
+import gc
+import hashlib
+import logging
+import os
 
-from . import models, schemas, crud, import_csv, reports, db
+from . import models, schemas, crud, import_csv, reports, db, catalog, responses, jobs, rollups, scoring, metrics, validation, export
+from .config import settings
+
+logger = logging.getLogger(__name__)
 
 # Create tables
 # models.Base.metadata.create_all(bind=db.engine)
 
 
-app = FastAPI(title="Vanta-like Questionnaire Backend")
+def warm_up(session: Session) -> dict:
+    """Load the catalog snapshot, scoring tables and search index and exercise the report template.
+
+    Runs once per worker process before it accepts traffic, so the first
+    requests after a deploy do not pay for it.
+    """
+    questions = catalog.get_catalog(session)
+    # Built on first use otherwise; the first search would pay for it
+    questions.search_index
+    # Touches every template code path (and the report helpers) once
+    sample = models.Submission(submission_id="warm-up", client_id="warm-up", created_at=datetime.now(timezone.utc))
+    reports.generate_html_report(sample, questions.scoring.score([]), questions, answers=[])
+    state = {"catalog_version": questions.version, "questions": len(questions)}
+    app.state.warm = state
+    return state
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.warm = None
+    # Refuse to start on a backend that cannot hold the JSON columns
+    await run_in_threadpool(db.check_database, db.engine)
+    with db.SessionLocal() as session:
+        await run_in_threadpool(warm_up, session)
+    # Long-lived snapshot objects: keep them out of the cyclic GC's scans
+    gc.freeze()
+    if settings.JOB_WORKERS > 0:
+        jobs.pool.start()
+    yield
+    jobs.pool.stop()
+
+app = FastAPI(title="Vanta-like Questionnaire Backend", lifespan=lifespan)
+
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
 
 # CORS
 app.add_middleware(
@@ -25,76 +72,677 @@ app.add_middleware(
 def health_check():
     return {"status": "ok"}
 
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    """Prometheus text exposition of this worker process's metrics."""
+    return Response(metrics.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/ready")
+def readiness_check():
+    """503 until this worker has warmed its catalog; /health only reports liveness."""
+    warm = getattr(app.state, "warm", None)
+    if warm is None:
+        return JSONResponse({"status": "starting"}, status_code=503)
+    return {"status": "ready", "pid": os.getpid(), **warm}
+
 @app.post("/import-csv", response_model=schemas.ImportStats)
 def import_csv_endpoint(db: Session = Depends(db.get_db)):
     try:
+        before = catalog.get_catalog(db)
         stats = import_csv.import_questions_from_csv(db)
-        return stats
+        responses.catalog_responses.clear()
+        rescore = jobs.queue_rescore(db, before)
+        return {**stats, "rescore_job": rescore.id if rescore else None}
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="CSV file not found at configured path")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def after_import(db: Session, before: catalog.Catalog) -> Optional[models.Job]:
+    """Drop cached catalog responses and queue the re-score for what an import committed."""
+    responses.catalog_responses.clear()
+    return await run_in_threadpool(jobs.queue_rescore, db, before)
+
+@app.post("/import-csv/upload", response_model=schemas.StreamImportStats)
+async def import_csv_upload(request: Request, batch_size: int = settings.IMPORT_BATCH_SIZE, db: Session = Depends(db.get_db)):
+    """Stream a CSV from a multipart `file` field or the raw (optionally chunked) request body.
+
+    Either way the body is parsed as it arrives: nothing is staged on disk,
+    and memory is bounded by the network chunk and the batch size.
+    """
+    if batch_size < 1:
+        raise HTTPException(status_code=400, detail="batch_size must be positive")
+
+    body = request.stream()
+
+    async def next_chunk():
+        async for chunk in body:
+            if chunk:
+                return chunk
+        return b""
+
+    # Pulled from the import thread, one network chunk at a time
+    chunks = iter(lambda: anyio.from_thread.run(next_chunk), b"")
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        chunks = import_csv.iter_multipart_file(chunks, content_type)
+
+    before = await run_in_threadpool(catalog.get_catalog, db)
+    batches = []
+    try:
+        stats = await run_in_threadpool(
+            import_csv.import_questions_from_stream, db, chunks, batch_size, batches.append
+        )
+    except Exception as e:
+        # Earlier batches may have committed before the failure. The import's
+        # own error is what the client gets, whatever happens here.
+        try:
+            await after_import(db, before)
+        except Exception:
+            logger.exception("Could not queue the re-score after a failed import")
+        if isinstance(e, import_csv.UploadError):
+            raise HTTPException(status_code=400, detail=str(e))
+        if isinstance(e, (UnicodeDecodeError, csv.Error)):
+            raise HTTPException(status_code=400, detail=f"Malformed CSV: {e}")
+        raise
+    rescore = await after_import(db, before)
+    return {**stats, "batches": batches, "rescore_job": rescore.id if rescore else None}
+
+QUESTION_FIELDS = list(schemas.QuestionOut.model_fields)
+
+def query_key(request: Request) -> str:
+    return "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+
+def catalog_etag(version: int, key: str) -> str:
+    # Strong validator: same catalog version + same query -> same bytes
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    return f'"q{version}-{digest}"'
+
+def matching_etag(request: Request, etag: str) -> Optional[str]:
+    """The If-None-Match tag that validates the client's copy: identity, or gzip if accepted."""
+    tags = {tag.strip() for tag in request.headers.get("if-none-match", "").split(",")}
+    if etag in tags:
+        return etag
+    gzipped = responses.gzip_etag(etag)
+    if gzipped in tags and responses.accepts_gzip(request):
+        return gzipped
+    return None
+
 @app.get("/questions", response_model=List[schemas.QuestionOut])
-def get_questions(skip: int = 0, limit: int = 1000, db: Session = Depends(db.get_db)):
-    questions = crud.get_questions(db, skip=skip, limit=limit)
-    return questions
+async def get_questions(
+    request: Request,
+    skip: int = 0,
+    limit: int = 1000,
+    after_id: Optional[int] = None,
+    fields: Optional[str] = None,
+    iam_domain: Optional[str] = None,
+    section_id: Optional[str] = None,
+    standard: Optional[str] = None,
+    control_id: Optional[str] = None,
+    db: AsyncSession = Depends(db.get_async_db),
+):
+    """List questions.
+
+    Page with `after_id` (the X-Next-Cursor header of the previous page)
+    rather than `skip`; `fields=question_id,question_text` returns only
+    those fields (plus `id`).
+    """
+    if standard is not None and standard not in reports.STANDARD_COLS:
+        raise HTTPException(status_code=400, detail=f"Unknown standard: {standard}")
+    if control_id is not None and standard is None:
+        raise HTTPException(status_code=400, detail="control_id requires standard")
+    columns = None
+    if fields:
+        names = ["id"] + [f.strip() for f in fields.split(",") if f.strip() and f.strip() != "id"]
+        unknown = [f for f in names if f not in QUESTION_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        columns = [getattr(models.Question, name) for name in dict.fromkeys(names)]
+
+    version = await catalog.get_version_async(db)
+    key = query_key(request)
+    etag = catalog_etag(version, key)
+    matched = matching_etag(request, etag)
+    if matched:
+        return Response(status_code=304, headers={"ETag": matched})
+
+    # The catalog only changes on import: encode each page once per version
+    body = responses.catalog_responses.get(version, ("list", key))
+    if body is None:
+        filters = dict(
+            after_id=after_id, iam_domain=iam_domain, section_id=section_id,
+            standard=standard, control_id=control_id
+        )
+        if columns is not None:
+            rows = await crud.get_question_rows_async(db, columns, limit=limit, skip=skip, **filters)
+        else:
+            questions = await crud.get_questions_async(db, skip=skip, limit=limit, **filters)
+            rows = [schemas.QuestionOut.model_validate(q).model_dump(mode="json") for q in questions]
+        headers = {}
+        if rows and len(rows) == limit:
+            headers["X-Next-Cursor"] = str(rows[-1]["id"])
+        body = responses.encode_body(rows, headers)
+        responses.catalog_responses.put(version, ("list", key), body)
+    return responses.body_response(request, body, {"ETag": etag})
+
+@app.get("/questions/search", response_model=schemas.SearchResults)
+async def search_questions(
+    request: Request,
+    q: str = "",
+    iam_domain: Optional[str] = None,
+    section_id: Optional[str] = None,
+    question_type: Optional[str] = None,
+    standard: Optional[str] = None,
+    control_id: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0,
+    version: Optional[int] = None,
+    db: AsyncSession = Depends(db.get_async_db),
+):
+    """Ranked full-text search over question IDs, text, notes and control mappings.
+
+    Every term in `q` must match. Facet counts (iam_domain, section_id,
+    question_type, standard, and control_id once a standard is chosen)
+    cover all matches, not just the returned page. `version` searches an
+    earlier catalog version.
+    """
+    if standard is not None and standard not in reports.STANDARD_COLS:
+        raise HTTPException(status_code=400, detail=f"Unknown standard: {standard}")
+    if control_id is not None and standard is None:
+        raise HTTPException(status_code=400, detail="control_id requires standard")
+    if not 1 <= limit <= 100:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 100")
+    if not 0 <= offset <= 1000:
+        raise HTTPException(status_code=400, detail="offset must be between 0 and 1000")
+    try:
+        questions = await catalog.get_catalog_version_async(db, version)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    key = query_key(request)
+    etag = catalog_etag(questions.version, f"search?{key}")
+    matched = matching_etag(request, etag)
+    if matched:
+        return Response(status_code=304, headers={"ETag": matched})
+
+    body = responses.catalog_responses.get(questions.version, ("search", key))
+    if body is None:
+        filters = dict(
+            iam_domain=iam_domain, section_id=section_id, question_type=question_type,
+            standard=standard, control_id=control_id
+        )
+        # CPU-bound, and the first search of a version builds its index
+        found = await run_in_threadpool(
+            lambda: questions.search_index.search(q, filters, limit=limit, offset=offset)
+        )
+        hits = [
+            {**schemas.QuestionOut.model_validate(questions.questions[pos]).model_dump(mode="json"), "score": score}
+            for pos, score in found.hits
+        ]
+        body = responses.encode_body({
+            "catalog_version": questions.version, "total": found.total, "hits": hits, "facets": found.facets
+        })
+        responses.catalog_responses.put(questions.version, ("search", key), body)
+    return responses.body_response(request, body, {"ETag": etag})
 
 @app.get("/questions/{question_id}", response_model=schemas.QuestionOut)
-def get_question(question_id: str, db: Session = Depends(db.get_db)):
-    question = crud.get_question_by_qid(db, question_id)
-    if not question:
-        raise HTTPException(status_code=404, detail="Question not found")
-    return question
-
-@app.post("/submit", response_model=schemas.SubmissionOut)
-def submit_answers(submission: schemas.SubmissionIn, db: Session = Depends(db.get_db)):
-    # Validate question_ids
-    all_questions = crud.get_questions(db, limit=10000)
-    valid_qids = {q.question_id for q in all_questions}
-    
-    for ans in submission.answers:
-        if ans.question_id not in valid_qids:
-            raise HTTPException(status_code=400, detail=f"Invalid question_id: {ans.question_id}")
-        if ans.answer.lower() not in ["yes", "no", "n/a", "na"]:
-            raise HTTPException(status_code=400, detail=f"Invalid answer for {ans.question_id}: {ans.answer}. Must be yes, no, or n/a")
-
-    # Compute summary
-    summary = reports.compute_summary(submission.answers, all_questions)
-    
-    # Generate UUID beforehand to include in report
-    new_id = models.generate_uuid()
-    
-    # Create submission object
-    db_submission = models.Submission(
-        submission_id=new_id,
-        client_id=submission.client_id,
-        answers=[a.model_dump() for a in submission.answers],
-        summary=summary,
-        report_html="" # Placeholder
-    )
-    
-    # Generate HTML report
-    report_html = reports.generate_html_report(db_submission, summary, all_questions)
-    db_submission.report_html = report_html
-    
-    # Save to DB
+async def get_question(request: Request, question_id: str, db: AsyncSession = Depends(db.get_async_db)):
+    version = await catalog.get_version_async(db)
+    etag = catalog_etag(version, f"question={question_id}")
+    matched = matching_etag(request, etag)
+    if matched:
+        return Response(status_code=304, headers={"ETag": matched})
+
+    body = responses.catalog_responses.get(version, ("question", question_id))
+    if body is None:
+        question = await crud.get_question_by_qid_async(db, question_id)
+        if not question:
+            raise HTTPException(status_code=404, detail="Question not found")
+        body = responses.encode_body(schemas.QuestionOut.model_validate(question).model_dump(mode="json"))
+        responses.catalog_responses.put(version, ("question", question_id), body)
+    return responses.body_response(request, body, {"ETag": etag})
+
+@app.get("/catalog/versions/{version}/questions", response_model=List[schemas.QuestionOut])
+async def get_catalog_version_questions(request: Request, version: int, db: AsyncSession = Depends(db.get_async_db)):
+    """Questions as they were at catalog `version`, e.g. the edition an older submission was scored against."""
+    try:
+        questions = await catalog.get_catalog_version_async(db, version)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    # A snapshot never changes, so neither does its ETag
+    etag = catalog_etag(version, "snapshot")
+    matched = matching_etag(request, etag)
+    if matched:
+        return Response(status_code=304, headers={"ETag": matched})
+    rows = [schemas.QuestionOut.model_validate(q).model_dump(mode="json") for q in questions]
+    return responses.body_response(request, responses.encode_body(rows), {"ETag": etag})
+
+@metrics.timed("scoring.summarize")
+def score_submission(submission: schemas.SubmissionIn, all_questions: catalog.Catalog):
+    # Encode once; the same code vector is scored and stored
+    encoded = all_questions.scoring.encode_answers(submission.answers)
+    summary = all_questions.scoring.summarize(encoded.codes, encoded.na_notes)
+    return encoded, summary
+
+@metrics.timed("validate")
+def validated(answers, all_questions: catalog.Catalog, **options) -> List[schemas.Answer]:
+    """Answers normalized against the catalog snapshot; raises validation.InvalidAnswers."""
+    return all_questions.validator.validate(answers, **options)
+
+def validated_submission(submission: schemas.SubmissionIn, all_questions: catalog.Catalog) -> schemas.SubmissionIn:
+    try:
+        answers = validated(submission.answers, all_questions)
+    except validation.InvalidAnswers as e:
+        raise HTTPException(status_code=400, detail=e.detail())
+    return schemas.SubmissionIn.model_construct(client_id=submission.client_id, answers=answers)
+
+def index_submissions(db: Session, submissions):
+    """Derived tables written in the same transaction as new submissions.
+
+    Sync, like stage_submission: async endpoints run it through
+    AsyncSession.run_sync.
+    """
+    with metrics.span("crud.index"):
+        rollups.apply(db, rollups.submission_deltas(submissions))
+        crud.update_client_latest(db, submissions)
+
+def stage_submission(db: Session, submission: schemas.SubmissionIn, summary: dict, all_questions: catalog.Catalog, encoded):
+    """Add a scored submission, its derived rows and its jobs to `db`, without committing.
+
+    Every write /submit makes, on a sync Session; the endpoint runs it with
+    AsyncSession.run_sync, and the sync baseline in benchmarks.async_vs_sync
+    calls it directly.
+    """
+    db_submission = crud.new_submission(submission, summary, all_questions, encoded)
     db.add(db_submission)
-    db.commit()
-    db.refresh(db_submission)
+    index_submissions(db, [db_submission])
+    # Control breakdown queued in the same transaction
+    queued = jobs.enqueue_submission(db, db_submission.submission_id)
+    return db_submission, queued
+
+@app.post("/submit", response_model=schemas.SubmissionAccepted, status_code=202)
+async def submit_answers(submission: schemas.SubmissionIn, db: AsyncSession = Depends(db.get_async_db)):
+    # Validated against the cached catalog, with no query
+    all_questions = await catalog.get_catalog_async(db)
+    submission = validated_submission(submission, all_questions)
+
+    # CPU-bound; keep it off the event loop
+    encoded, summary = await run_in_threadpool(score_submission, submission, all_questions)
     
-    return db_submission
+    db_submission, queued = await db.run_sync(stage_submission, submission, summary, all_questions, encoded)
+    with metrics.span("db.commit"):
+        await db.commit()
+    jobs.pool.wake()
+    accepted = schemas.SubmissionAccepted.model_validate(db_submission)
+    accepted.jobs = [job.id for job in queued]
+    return accepted
+
+NDJSON_TYPES = ("application/x-ndjson", "application/jsonl", "application/json-lines")
+
+async def iter_ndjson(request: Request):
+    """Decoded items of an NDJSON body as it arrives; a bad line yields its ValueError."""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                try:
+                    yield responses.loads(line)
+                except ValueError as e:
+                    yield e
+    if buffer.strip():
+        try:
+            yield responses.loads(buffer)
+        except ValueError as e:
+            yield e
+
+async def iter_json_array(request: Request):
+    try:
+        items = responses.loads(await request.body())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Malformed JSON: {e}")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of submissions")
+    for item in items:
+        yield item
+
+def score_batch(start: int, items: list, all_questions: catalog.Catalog):
+    """Validate and score raw items against one snapshot -> (rows to insert, per-item results)."""
+    rows = []
+    results = []
+    for index, item in enumerate(items, start):
+        if isinstance(item, Exception):
+            results.append({"index": index, "error": f"Malformed JSON: {item}"})
+            continue
+        try:
+            row = schemas.submission_row_adapter.validate_python(item)
+        except ValidationError as e:
+            err = e.errors()[0]
+            loc = ".".join(str(part) for part in err["loc"]) or "body"
+            results.append({"index": index, "error": f"{loc}: {err['msg']}"})
+            continue
+        try:
+            answers = validated(
+                [schemas.Answer(a["question_id"], a["answer"], a.get("notes")) for a in row["answers"]], all_questions
+            )
+        except validation.InvalidAnswers as e:
+            results.append({"index": index, "client_id": row["client_id"], "error": str(e), "errors": e.errors})
+            continue
+        submission = schemas.SubmissionIn.model_construct(client_id=row["client_id"], answers=answers)
+        encoded, summary = score_submission(submission, all_questions)
+        row = crud.submission_values(submission, summary, all_questions, encoded)
+        rows.append(row)
+        results.append({"index": index, "client_id": submission.client_id, "submission_id": row["submission_id"]})
+    return rows, results
+
+@app.post("/submit/batch", response_model=schemas.BatchSubmitResult)
+async def submit_batch(request: Request, db: AsyncSession = Depends(db.get_async_db)):
+    """Score many submissions against one catalog snapshot.
+
+    Accepts a JSON array, or NDJSON (one submission per line) with an
+    NDJSON content type. Invalid items are reported per index and do not
+    stop the rest; valid ones are inserted SUBMIT_BATCH_CHUNK_SIZE rows per
+    transaction.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    items = iter_ndjson(request) if content_type in NDJSON_TYPES else iter_json_array(request)
+    all_questions = await catalog.get_catalog_async(db)
+
+    results = []
+    accepted = 0
+
+    async def flush(chunk):
+        nonlocal accepted
+        rows, chunk_results = await run_in_threadpool(score_batch, len(results), chunk, all_questions)
+        await jobs.insert_submission_jobs_async(db, [row["submission_id"] for row in rows])
+        await db.run_sync(index_submissions, rows)
+        await crud.insert_submissions_async(db, rows)
+        accepted += len(rows)
+        results.extend(chunk_results)
+
+    chunk = []
+    async for item in items:
+        chunk.append(item)
+        if len(chunk) >= settings.SUBMIT_BATCH_CHUNK_SIZE:
+            await flush(chunk)
+            chunk = []
+    if chunk:
+        await flush(chunk)
+    jobs.pool.wake()
+    return {"accepted": accepted, "rejected": len(results) - accepted, "items": results}
+
+async def draft_out(db: AsyncSession, draft: models.Draft, questions: catalog.Catalog) -> schemas.DraftOut:
+    out = schemas.DraftOut.model_validate(draft)
+    if draft.status == "open":
+        counters = draft.counters
+        if counters is None or draft.catalog_version != questions.version:
+            counters, _ = await crud.draft_counters_async(db, draft.draft_id, questions)
+        out.summary = questions.scoring.summarize_counters(counters)
+    return out
+
+def validated_deltas(deltas, all_questions: catalog.Catalog) -> List[schemas.Answer]:
+    # Clearing (answer=None) is allowed; a repeated question_id keeps its last delta
+    try:
+        return validated(deltas, all_questions, allow_clear=True, allow_duplicates=True)
+    except validation.InvalidAnswers as e:
+        raise HTTPException(status_code=400, detail=e.detail())
+
+async def open_draft(db: AsyncSession, draft_id: str) -> models.Draft:
+    draft = await crud.get_draft_async(db, draft_id)
+    if not draft:
+        raise HTTPException(status_code=404, detail="Draft not found")
+    if draft.status != "open":
+        raise HTTPException(status_code=409, detail=f"Draft is {draft.status}")
+    return draft
+
+DRAFT_CONFLICT = "Draft was modified by another request; reload and retry"
+
+@app.post("/drafts", response_model=schemas.DraftOut, status_code=201)
+async def create_draft(payload: schemas.DraftCreate, db: AsyncSession = Depends(db.get_async_db)):
+    all_questions = await catalog.get_catalog_async(db)
+    deltas = validated_deltas(payload.answers, all_questions)
+    draft = crud.new_draft(payload.client_id, all_questions)
+    db.add(draft)
+    await db.flush()
+    if deltas:
+        await crud.update_draft_async(db, draft, deltas, all_questions)
+    await db.commit()
+    await db.refresh(draft)
+    return await draft_out(db, draft, all_questions)
+
+@app.get("/drafts/{draft_id}", response_model=schemas.DraftOut)
+async def get_draft(draft_id: str, db: AsyncSession = Depends(db.get_async_db)):
+    draft = await crud.get_draft_async(db, draft_id)
+    if not draft:
+        raise HTTPException(status_code=404, detail="Draft not found")
+    return await draft_out(db, draft, await catalog.get_catalog_async(db))
+
+@app.patch("/drafts/{draft_id}", response_model=schemas.DraftOut)
+async def patch_draft(draft_id: str, patch: schemas.DraftPatch, db: AsyncSession = Depends(db.get_async_db)):
+    """Save answer deltas; counters move by O(changed answers), not a full re-score."""
+    draft = await open_draft(db, draft_id)
+    all_questions = await catalog.get_catalog_async(db)
+    deltas = validated_deltas(patch.answers, all_questions)
+    if not await crud.update_draft_async(db, draft, deltas, all_questions):
+        await db.rollback()
+        raise HTTPException(status_code=409, detail=DRAFT_CONFLICT)
+    await db.commit()
+    await db.refresh(draft)
+    return await draft_out(db, draft, all_questions)
+
+@app.get("/drafts/{draft_id}/answers", response_model=List[schemas.AnswerIn])
+async def get_draft_answers(draft_id: str, db: AsyncSession = Depends(db.get_async_db)):
+    draft = await crud.get_draft_async(db, draft_id)
+    if not draft:
+        raise HTTPException(status_code=404, detail="Draft not found")
+    rows = await crud.get_draft_answers_async(db, draft_id)
+    return [{"question_id": r.question_id, "answer": r.answer, "notes": r.notes} for r in rows.values()]
+
+@app.post("/drafts/{draft_id}/finalize", response_model=schemas.SubmissionAccepted, status_code=202)
+async def finalize_draft(draft_id: str, db: AsyncSession = Depends(db.get_async_db)):
+    """Score the saved answers once, in full, and store them as a submission."""
+    draft = await open_draft(db, draft_id)
+    all_questions = await catalog.get_catalog_async(db)
+    rows = await crud.get_draft_answers_async(db, draft_id)
+    submission = schemas.SubmissionIn.model_construct(
+        client_id=draft.client_id,
+        answers=[schemas.Answer(r.question_id, r.answer, r.notes) for r in rows.values()]
+    )
+    encoded, summary = await run_in_threadpool(score_submission, submission, all_questions)
+    db_submission = crud.new_submission(submission, summary, all_questions, encoded)
+    if not await crud.finalize_draft_async(db, draft, db_submission):
+        await db.rollback()
+        raise HTTPException(status_code=409, detail=DRAFT_CONFLICT)
+    await db.run_sync(index_submissions, [db_submission])
+    queued = jobs.enqueue_submission(db, db_submission.submission_id)
+    with metrics.span("db.commit"):
+        await db.commit()
+    jobs.pool.wake()
+    accepted = schemas.SubmissionAccepted.model_validate(db_submission)
+    accepted.jobs = [job.id for job in queued]
+    return accepted
 
 @app.get("/report/{submission_id}", response_class=HTMLResponse)
-def get_report(submission_id: str, db: Session = Depends(db.get_db)):
-    submission = crud.get_submission(db, submission_id)
+async def get_report(submission_id: str, db: AsyncSession = Depends(db.get_async_db)):
+    submission = await crud.get_submission_async(db, submission_id)
     if not submission:
         raise HTTPException(status_code=404, detail="Submission not found")
-    return submission.report_html
+    # Reports stored by earlier versions are served as-is
+    if submission.report_html:
+        return HTMLResponse(submission.report_html)
+
+    # Rendered against the catalog version the submission was scored with
+    questions = await catalog.get_catalog_version_async(db, submission.catalog_version)
+    key = (submission.submission_id, questions.version)
+    report_html = reports.report_cache.get(key)
+    if report_html is not None:
+        return HTMLResponse(report_html)
+
+    def render():
+        # Iterated in the threadpool by StreamingResponse. The session is
+        # closed by then, but everything read here is already loaded.
+        answers = crud.submission_answers(submission, questions)
+        yield from metrics.timed_iter(
+            "reports.render", reports.iter_html_report(submission, submission.summary, questions, answers)
+        )
+
+    return StreamingResponse(reports.report_cache.tee(key, render()), media_type="text/html")
 
 @app.get("/standards/summary/{submission_id}")
-def get_summary(submission_id: str, db: Session = Depends(db.get_db)):
-    submission = crud.get_submission(db, submission_id)
+async def get_summary(submission_id: str, db: AsyncSession = Depends(db.get_async_db)):
+    submission = await crud.get_submission_async(db, submission_id)
     if not submission:
         raise HTTPException(status_code=404, detail="Submission not found")
     return submission.summary
+
+@app.get("/standards/controls/{submission_id}")
+async def get_control_summary(submission_id: str, standard: Optional[str] = None, db: AsyncSession = Depends(db.get_async_db)):
+    """Per-control breakdown of a submission, e.g. NIST AC-2 or ISO A.8.5."""
+    if standard is not None and standard not in reports.STANDARD_COLS:
+        raise HTTPException(status_code=400, detail=f"Unknown standard: {standard}")
+    submission = await crud.get_submission_async(db, submission_id)
+    if not submission:
+        raise HTTPException(status_code=404, detail="Submission not found")
+
+    questions = await catalog.get_catalog_version_async(db, submission.catalog_version)
+    if submission.controls_summary is not None and submission.controls_version == questions.version:
+        # Precomputed by the control_breakdown job
+        if standard:
+            return {standard: submission.controls_summary.get(standard, {})}
+        return submission.controls_summary
+
+    def breakdown():
+        encoded = crud.encoded_submission_answers(submission, questions)
+        return questions.scoring.summarize_controls(
+            encoded.codes, encoded.na_notes, standards=[standard] if standard else None
+        )
+
+    return await run_in_threadpool(breakdown)
+
+@app.get("/clients/{client_id}/submissions", response_model=List[schemas.SubmissionOut])
+async def get_client_submissions(
+    client_id: str,
+    response: Response,
+    limit: int = 50,
+    before: Optional[str] = None,
+    db: AsyncSession = Depends(db.get_async_db),
+):
+    """A client's submissions, newest first.
+
+    Pass the X-Next-Cursor header of the previous page as `before`.
+    """
+    if not 1 <= limit <= 1000:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 1000")
+    try:
+        submissions = await crud.get_client_submissions_async(db, client_id, limit=limit, before=before)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if len(submissions) == limit:
+        response.headers["X-Next-Cursor"] = submissions[-1].submission_id
+    return submissions
+
+@app.get("/clients/{client_id}/latest", response_model=schemas.SubmissionOut)
+async def get_latest_submission(client_id: str, db: AsyncSession = Depends(db.get_async_db)):
+    submission = await crud.get_latest_submission_async(db, client_id)
+    if not submission:
+        raise HTTPException(status_code=404, detail="No submissions for client")
+    return submission
+
+@app.get("/submissions/{base_id}/diff/{other_id}", response_model=schemas.SubmissionDiff)
+async def diff_submissions(base_id: str, other_id: str, db: AsyncSession = Depends(db.get_async_db)):
+    """Answers and standard statuses that differ from `base_id` to `other_id`."""
+    base = await crud.get_submission_async(db, base_id)
+    other = await crud.get_submission_async(db, other_id)
+    if not base or not other:
+        raise HTTPException(status_code=404, detail="Submission not found")
+    # Positions are append-only: the newer snapshot reads both code vectors
+    versions = (base.catalog_version, other.catalog_version)
+    questions = await catalog.get_catalog_version_async(db, None if None in versions else max(versions))
+
+    def diff():
+        # Compares the stored code vectors; nothing is rendered
+        answers = questions.scoring.diff_answers(
+            crud.encoded_submission_answers(base, questions), crud.encoded_submission_answers(other, questions)
+        )
+        return answers, scoring.diff_statuses(base.summary or {}, other.summary or {})
+
+    answers, standards = await run_in_threadpool(diff)
+    return {
+        "base_submission_id": base_id, "other_submission_id": other_id,
+        "answers_changed": answers, "standards_changed": standards,
+    }
+
+@app.get("/jobs/{job_id}", response_model=schemas.JobOut)
+async def get_job(job_id: str, db: AsyncSession = Depends(db.get_async_db)):
+    job = await jobs.get_job_async(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    out = schemas.JobOut.model_validate(job)
+    # Fan-out jobs (e.g. rescore) report the progress of their chunks
+    out.progress = await jobs.job_progress_async(db, job)
+    return out
+
+ANALYTICS_GROUPS = tuple(rollups.GROUP_COLUMNS)
+
+@app.get("/analytics/compliance", response_model=List[schemas.ComplianceRollupOut])
+async def get_compliance_analytics(
+    group_by: str = "client_id,standard,month",
+    client_id: Optional[str] = None,
+    standard: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncSession = Depends(db.get_async_db),
+):
+    """Status counts and compliance rate from the monthly rollups.
+
+    `group_by` is any of client_id, standard, month; other dimensions are
+    summed over. `start`/`end` select months (inclusive).
+    """
+    groups = [g.strip() for g in group_by.split(",") if g.strip()]
+    unknown = [g for g in groups if g not in ANALYTICS_GROUPS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown group_by: {', '.join(unknown)}")
+    if standard is not None and standard not in reports.STANDARD_COLS:
+        raise HTTPException(status_code=400, detail=f"Unknown standard: {standard}")
+    result = await db.execute(rollups.compliance_query(groups, client_id, standard, start, end))
+    # Without group_by, an empty range still yields one row of NULL sums
+    return [rollups.with_rates(dict(row)) for row in result.mappings() if row["assessments"] is not None]
+
+@app.post("/analytics/rebuild", response_model=schemas.JobOut, status_code=202)
+async def rebuild_analytics(db: AsyncSession = Depends(db.get_async_db)):
+    """Recompute the rollups from all stored submissions, as a background job."""
+    job = jobs.enqueue(db, "rebuild_rollups")
+    await db.commit()
+    jobs.pool.wake()
+    return job
+
+@app.get("/export/submissions")
+def export_submissions(
+    format: str = "csv",
+    kind: str = "submissions",
+    client_id: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    batch_size: int = settings.EXPORT_BATCH_SIZE,
+    session_factory=Depends(db.get_session_factory),
+):
+    """Stream submissions (or their answers) created in [start, end) as CSV, NDJSON, Arrow or Parquet."""
+    if not 1 <= batch_size <= 100_000:
+        raise HTTPException(status_code=400, detail="batch_size must be between 1 and 100000")
+    try:
+        writer = export.writer_for(format, kind)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def body():
+        # Own session: the request's is closed before a streamed body is sent
+        with session_factory() as session:
+            yield from export.iter_export(
+                session, writer, kind, batch_size, client_id=client_id, start=start, end=end
+            )
+
+    filename = f"{kind}.{writer.extension}"
+    return StreamingResponse(
+        body(), media_type=writer.media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
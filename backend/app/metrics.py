@@ -0,0 +1,344 @@
+"""Request metrics, timing spans and on-demand profiling.
+
+- MetricsMiddleware times every request into a per-route histogram and
+  counts the SQL statements it ran (via engine events, see instrument()).
+- span(name) / timed(name) time a stage of the work (catalog load,
+  scoring, rendering, commits) into a histogram and onto the current
+  request, reported back in its Server-Timing header.
+- registry.render() is the Prometheus text exposition served by /metrics.
+
+Everything is in-process and lock-protected: an observation is a bisect
+and a few additions, so it stays on in production. Each worker process
+keeps its own counters.
+"""
+import cProfile
+import io
+import marshal
+import pstats
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+from urllib.parse import parse_qs
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from .config import settings
+
+# Seconds; request latencies and stage timings
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+# Lines of pstats output returned for ?profile=1
+PROFILE_LINES = 60
+
+LabelValues = Tuple[str, ...]
+T = TypeVar("T")
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *values: str, amount: float = 1):
+        with self._lock:
+            self._values[values] = self._values.get(values, 0) + amount
+
+    def value(self, *values: str) -> float:
+        return self._values.get(values, 0)
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = sorted(self._values.items())
+        for values, total in items:
+            yield f"{self.name}{_labels(self.labels, values)} {total}"
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, in the Prometheus layout."""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [count per bucket (+Inf last), sum]
+        self._series: Dict[LabelValues, List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *values: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(values)
+            if series is None:
+                series = self._series[values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, *values: str) -> int:
+        series = self._series.get(values)
+        return sum(series[0]) if series else 0
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = sorted((values, (list(counts), total)) for values, (counts, total) in self._series.items())
+        for values, (counts, total) in items:
+            cumulative = 0
+            for bound, n in zip((*self.buckets, "+Inf"), counts):
+                cumulative += n
+                le = 'le="%s"' % (bound if bound == "+Inf" else float(bound))
+                yield f"{self.name}_bucket{_labels(self.labels, values, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, values)} {total}"
+            yield f"{self.name}_count{_labels(self.labels, values)} {cumulative}"
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, *args, **kwargs) -> Counter:
+        metric = Counter(*args, **kwargs)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        metric = Histogram(*args, **kwargs)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self.metrics for line in metric.render()) + "\n"
+
+registry = Registry()
+
+requests_total = registry.counter(
+    "http_requests_total", "HTTP requests by route and status.", ("method", "route", "status")
+)
+request_seconds = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency, until the response body is sent.", ("method", "route")
+)
+request_queries = registry.histogram(
+    "http_request_db_queries", "SQL statements executed per request.", ("method", "route"), QUERY_COUNT_BUCKETS
+)
+request_query_seconds = registry.histogram(
+    "http_request_db_seconds", "Time spent executing SQL per request.", ("method", "route")
+)
+span_seconds = registry.histogram("span_duration_seconds", "Time spent in a named stage.", ("span",))
+query_seconds = registry.histogram("db_query_duration_seconds", "SQL statement execution time.", ("operation",))
+
+class RequestStats:
+    """What one request spent, filled in by spans and engine events."""
+
+    __slots__ = ("queries", "query_seconds", "spans", "loop_thread", "profiles", "profiling_threads")
+
+    def __init__(self, profile: bool = False):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.spans: Dict[str, float] = {}
+        self.loop_thread = threading.get_ident()
+        # Per-thread profilers of a ?profile=1 request
+        self.profiles: Optional[List[cProfile.Profile]] = [] if profile else None
+        self.profiling_threads = set()
+
+    def server_timing(self) -> str:
+        entries = [f"db;dur={self.query_seconds * 1000:.2f};desc=\"{self.queries} queries\""]
+        entries.extend(f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.spans.items())
+        return ", ".join(entries)
+
+# Copied into threadpool calls, so spans and queries there count too
+_request: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+def current() -> Optional[RequestStats]:
+    return _request.get()
+
+@contextmanager
+def span(name: str):
+    """Time a stage into span_duration_seconds and the current request.
+
+    Off the event loop thread, a profiled request also profiles the stage:
+    cProfile only sees the thread that enabled it.
+    """
+    stats = _request.get()
+    profile = None
+    if stats is not None and stats.profiles is not None:
+        thread = threading.get_ident()
+        if thread != stats.loop_thread and thread not in stats.profiling_threads:
+            profile = cProfile.Profile()
+            stats.profiling_threads.add(thread)
+            stats.profiles.append(profile)
+            profile.enable()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if profile is not None:
+            profile.disable()
+            stats.profiling_threads.discard(threading.get_ident())
+        span_seconds.observe(elapsed, name)
+        if stats is not None:
+            stats.spans[name] = stats.spans.get(name, 0.0) + elapsed
+
+def timed(name: str):
+    """Decorator form of span() for plain functions."""
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def timed_iter(name: str, iterable: Iterable[T]) -> Iterator[T]:
+    """Yield from iterable, timing only the work of producing items (e.g. a
+    streamed render), not the time the consumer spends between them."""
+    stats = _request.get()
+    elapsed = 0.0
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            break
+        finally:
+            elapsed += time.perf_counter() - start
+        yield item
+    span_seconds.observe(elapsed, name)
+    if stats is not None:
+        stats.spans[name] = stats.spans.get(name, 0.0) + elapsed
+
+def instrument(engine: Engine):
+    """Count and time every statement the engine executes."""
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        query_seconds.observe(elapsed, statement.lstrip()[:6].upper())
+        stats = _request.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.query_seconds += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
+
+def route_name(scope) -> str:
+    # Route templates, not raw paths, keep the label set bounded
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+def profile_format(scope) -> Optional[str]:
+    """'text' or 'pstats' for a ?profile=1 / ?profile=pstats request, if enabled."""
+    if not settings.PROFILING_ENABLED or b"profile=" not in scope.get("query_string", b""):
+        return None
+    value = parse_qs(scope["query_string"].decode("latin-1")).get("profile", [""])[-1]
+    if value in ("1", "true"):
+        return "text"
+    if value == "pstats":
+        return "pstats"
+    return None
+
+def profile_report(profiles: List[cProfile.Profile], fmt: str) -> Tuple[bytes, str]:
+    """(body, content type) for the merged profiles of one request."""
+    stats = pstats.Stats(profiles[0], stream=io.StringIO())
+    for profile in profiles[1:]:
+        stats.add(profile)
+    if fmt == "pstats":
+        # The dump_stats() format: load with pstats.Stats(path) or snakeviz
+        return marshal.dumps(stats.stats), "application/octet-stream"
+    stats.strip_dirs().sort_stats("cumulative").print_stats(PROFILE_LINES)
+    return stats.stream.getvalue().encode("utf-8"), "text/plain; charset=utf-8"
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: latency, status and SQL counts per route.
+
+    With PROFILING_ENABLED, `?profile=1` runs the request under cProfile and
+    returns the pstats table instead of the response (`?profile=pstats`: the
+    binary dump). The event-loop profiler also sees concurrent requests, so
+    profile on a quiet instance.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        fmt = profile_format(scope)
+        if fmt is not None:
+            await self._profile(scope, receive, send, fmt)
+            return
+
+        stats = RequestStats()
+        token = _request.set(stats)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", ()), (b"server-timing", stats.server_timing().encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request.reset(token)
+            elapsed = time.perf_counter() - start
+            method, route = scope["method"], route_name(scope)
+            requests_total.inc(method, route, str(status))
+            request_seconds.observe(elapsed, method, route)
+            request_queries.observe(stats.queries, method, route)
+            request_query_seconds.observe(stats.query_seconds, method, route)
+
+    async def _profile(self, scope, receive, send, fmt: str):
+        stats = RequestStats(profile=True)
+        token = _request.set(stats)
+        status = 500
+
+        async def discard(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        profile = cProfile.Profile()
+        stats.profiles.append(profile)
+        profile.enable()
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            profile.disable()
+            _request.reset(token)
+        body, content_type = profile_report(stats.profiles, fmt)
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", content_type.encode("latin-1")),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"x-profiled-status", str(status).encode("latin-1")),
+                (b"server-timing", stats.server_timing().encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,66 @@
+from sqlalchemy import inspect, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from . import catalog, models, schemas, scoring
+from .db import Base
+
+MIGRATION_BATCH_SIZE = 500
+
+def add_missing_columns(engine: Engine):
+    """ALTER TABLE ... ADD COLUMN for model columns an existing table lacks.
+
+    create_all() only creates missing tables; new columns are all nullable.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+
+def create_missing_indexes(engine: Engine):
+    # create_all() skips indexes on tables that already exist
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+def pack_legacy_submissions(db: Session, batch_size: int = MIGRATION_BATCH_SIZE) -> int:
+    """Convert JSON answers to packed answers and drop stored report HTML.
+
+    Returns the number of converted submissions.
+    """
+    questions = catalog.get_catalog(db)
+    converted = 0
+    while True:
+        rows = db.execute(
+            select(models.Submission)
+            .where(models.Submission.answers_packed.is_(None), models.Submission.answers.is_not(None))
+            .limit(batch_size)
+        ).scalars().all()
+        if not rows:
+            return converted
+        for row in rows:
+            encoded = questions.scoring.encode_answers(schemas.AnswerIn(**a) for a in row.answers)
+            row.answers_packed = scoring.pack_answers(encoded)
+            row.catalog_version = questions.version
+            row.answers = None
+            # Rendered on demand from now on
+            row.report_html = None
+        db.commit()
+        converted += len(rows)
+
+def migrate(engine: Engine):
+    add_missing_columns(engine)
+    create_missing_indexes(engine)
+    with Session(engine) as db:
+        converted = pack_legacy_submissions(db)
+    if converted and engine.dialect.name == "sqlite":
+        # Return the space freed by the verbose JSON and HTML to the OS
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM"))
+    return converted
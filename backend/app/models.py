@@ -1,8 +1,14 @@
-from sqlalchemy import Column, Integer, String, Text, JSON, DateTime
+from sqlalchemy import Column, Date, Integer, String, Text, JSON, DateTime, Index, LargeBinary
 from sqlalchemy.sql import func
 from .db import Base
 import uuid
 
+# Standards columns mapping
+STANDARD_COLS = [
+    "iso_27001_2022", "nist_800_53_rev5", "soc_2_tsc",
+    "gdpr", "pci_dss_4_0", "hipaa", "cis_controls"
+]
+
 def generate_uuid():
     return str(uuid.uuid4())
 
@@ -11,9 +17,9 @@ class Question(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     question_id = Column(String, unique=True, index=True)
-    section_id = Column(String)
+    section_id = Column(String, index=True)
     question_text = Column(Text)
-    iam_domain = Column(String)
+    iam_domain = Column(String, index=True)
     answer_type = Column(String, default="yes_no_partial_with_text")
     question_type = Column(String)
     iso_27001_2022 = Column(String)
@@ -26,12 +32,176 @@ class Question(Base):
     notes = Column(Text)
     meta = Column(JSON)
 
+class QuestionRevision(Base):
+    __tablename__ = "question_revisions"
+
+    # Question contents per catalog version range [valid_from, valid_to);
+    # an import only adds revisions for the questions it changed, so every
+    # version's snapshot shares the rest. valid_to is NULL while current.
+    id = Column(Integer, primary_key=True)
+    question_id = Column(String, nullable=False)
+    valid_from = Column(Integer, nullable=False)
+    valid_to = Column(Integer)
+    section_id = Column(String)
+    question_text = Column(Text)
+    iam_domain = Column(String)
+    answer_type = Column(String)
+    question_type = Column(String)
+    iso_27001_2022 = Column(String)
+    nist_800_53_rev5 = Column(String)
+    soc_2_tsc = Column(String)
+    gdpr = Column(String)
+    pci_dss_4_0 = Column(String)
+    hipaa = Column(String)
+    cis_controls = Column(String)
+    notes = Column(Text)
+
+    __table_args__ = (
+        # Closing a question's open revision on import
+        Index("ix_question_revisions_question_valid_to", "question_id", "valid_to"),
+        # Snapshot reads: revisions in effect at one version
+        Index("ix_question_revisions_valid_from", "valid_from"),
+    )
+
+class QuestionControl(Base):
+    __tablename__ = "question_controls"
+
+    # One row per (question, standard, control id) parsed from the
+    # pipe-delimited standard columns, e.g. "A.8.2|A.8.3"
+    id = Column(Integer, primary_key=True)
+    question_id = Column(String, index=True, nullable=False)
+    standard = Column(String, nullable=False)
+    control_id = Column(String, nullable=False)
+
+    __table_args__ = (
+        Index("ix_question_controls_standard_control", "standard", "control_id"),
+    )
+
 class Submission(Base):
     __tablename__ = "submissions"
 
     submission_id = Column(String, primary_key=True, default=generate_uuid)
     client_id = Column(String)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Legacy verbose storage; new rows use answers_packed (see scoring.pack_answers)
     answers = Column(JSON)
+    # zlib-compressed code vector keyed by catalog position
+    answers_packed = Column(LargeBinary)
+    catalog_version = Column(Integer, index=True)
     summary = Column(JSON)
+    # Legacy stored report; reports are now rendered on demand
     report_html = Column(Text)
+    # Per-control breakdown, written by the control_breakdown job
+    controls_summary = Column(JSON)
+    controls_version = Column(Integer)
+
+    __table_args__ = (
+        # Per-client history and time-range scans
+        Index("ix_submissions_client_created", "client_id", "created_at"),
+        # Time-range exports across all clients
+        Index("ix_submissions_created", "created_at"),
+    )
+
+class ClientLatest(Base):
+    __tablename__ = "client_latest"
+
+    # Most recent submission per client, kept current on every insert
+    client_id = Column(String, primary_key=True)
+    submission_id = Column(String, nullable=False)
+    created_at = Column(DateTime(timezone=True))
+
+class ComplianceRollup(Base):
+    __tablename__ = "compliance_rollups"
+
+    # Submission summaries aggregated per client, standard and month;
+    # maintained on every write to Submission.summary (see app/rollups.py)
+    client_id = Column(String, primary_key=True)
+    standard = Column(String, primary_key=True)
+    bucket = Column(Date, primary_key=True) # First day of the month (UTC)
+    submissions = Column(Integer, nullable=False, default=0)
+    compliant = Column(Integer, nullable=False, default=0)
+    partial = Column(Integer, nullable=False, default=0)
+    non_compliant = Column(Integer, nullable=False, default=0)
+    unknown = Column(Integer, nullable=False, default=0)
+    not_applicable = Column(Integer, nullable=False, default=0)
+    # Answer-level sums over the same submissions
+    yes = Column(Integer, nullable=False, default=0)
+    no = Column(Integer, nullable=False, default=0)
+    na = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_compliance_rollups_bucket", "bucket"),
+        Index("ix_compliance_rollups_standard_bucket", "standard", "bucket"),
+    )
+
+class Draft(Base):
+    __tablename__ = "drafts"
+
+    draft_id = Column(String, primary_key=True, default=generate_uuid)
+    client_id = Column(String, index=True)
+    status = Column(String, nullable=False, default="open") # open, finalized
+    # Catalog version the counters were computed against
+    catalog_version = Column(Integer)
+    # {standard: {"yes": n, "no": n, "na": n}}, maintained per answer delta
+    counters = Column(JSON)
+    answered = Column(Integer, nullable=False, default=0)
+    # Optimistic concurrency: every write bumps it
+    revision = Column(Integer, nullable=False, default=0)
+    submission_id = Column(String)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class DraftAnswer(Base):
+    __tablename__ = "draft_answers"
+
+    draft_id = Column(String, primary_key=True)
+    question_id = Column(String, primary_key=True)
+    answer = Column(String, nullable=False)
+    notes = Column(Text)
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(String, primary_key=True, default=generate_uuid)
+    kind = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="queued") # queued, running, succeeded, failed
+    # Set on the chunk jobs a coordinating job fans out to
+    parent_id = Column(String, index=True)
+    submission_id = Column(String, index=True)
+    payload = Column(JSON)
+    result = Column(JSON)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    last_error = Column(Text)
+    # Naive UTC throughout, so comparisons behave the same on every backend
+    created_at = Column(DateTime)
+    run_after = Column(DateTime)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+    __table_args__ = (
+        # Worker poll: next runnable job
+        Index("ix_jobs_status_run_after", "status", "run_after"),
+    )
+
+class CatalogChange(Base):
+    __tablename__ = "catalog_changes"
+
+    # Standards whose question membership changed between two catalog
+    # versions; drives incremental re-scoring of stored submissions
+    id = Column(Integer, primary_key=True, index=True)
+    from_version = Column(Integer, nullable=False)
+    to_version = Column(Integer, nullable=False, index=True)
+    standards = Column(JSON, nullable=False)
+    question_ids = Column(JSON)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class CatalogState(Base):
+    __tablename__ = "catalog_state"
+
+    # Single row (id=1) holding the catalog version stamp. Bumped in the same
+    # transaction as every import that changes the questions table so all
+    # worker processes can detect a stale in-memory catalog.
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
@@ -1,23 +1,28 @@
-from typing import List, Dict, Any
-from jinja2 import Template
-from . import schemas, models
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Hashable, Iterator, Optional
+from jinja2 import Environment
+from . import metrics, schemas, models, scoring
+from .config import settings
 
-STANDARD_COLS = [
-    "iso_27001_2022", "nist_800_53_rev5", "soc_2_tsc", 
-    "gdpr", "pci_dss_4_0", "hipaa", "cis_controls"
-]
+STANDARD_COLS = models.STANDARD_COLS
 
+# Characters per chunk when streaming a rendered report
+STREAM_CHUNK_SIZE = 16 * 1024
+
+@metrics.timed("reports.compute_summary")
 def compute_summary(answers: List[schemas.AnswerIn], questions: List[models.Question]) -> Dict[str, Any]:
+    # A catalog.Catalog carries a precomputed scoring engine
+    engine = getattr(questions, "scoring", None)
+    if engine is not None:
+        return engine.score(answers)
+
     # Map question_id to answer
     answer_map = {a.question_id: a for a in answers}
     
-    # Map question_id to question object
-    question_map = {q.question_id: q for q in questions}
-    
     summary = {}
     
     for std in STANDARD_COLS:
-        total_questions = 0
         yes_count = 0
         no_count = 0
         na_count = 0
@@ -29,16 +34,6 @@ def compute_summary(answers: List[schemas.AnswerIn], questions: List[models.Ques
         relevant_questions = [q for q in questions if getattr(q, std) and getattr(q, std).strip()]
         
         total_questions = len(relevant_questions)
-        
-        if total_questions == 0:
-            summary[std] = {
-                "status": "not_applicable",
-                "counts": {
-                    "total": 0, "yes": 0, "no": 0, "na": 0, "unanswered": 0
-                },
-                "na_notes": []
-            }
-            continue
             
         for q in relevant_questions:
             ans_obj = answer_map.get(q.question_id)
@@ -56,26 +51,11 @@ def compute_summary(answers: List[schemas.AnswerIn], questions: List[models.Ques
                 if ans_obj.notes:
                     na_notes.append(f"{q.question_id}: {ans_obj.notes}")
             else:
-                # Treat unknown/other as unanswered or handle? 
-                # Requirement says "yes"|"no"|"n/a"
+                # Treat unknown/other as unanswered
                 unanswered_count += 1
 
-        # Determine status
-        status = "unknown"
-        if no_count > 0:
-            status = "non_compliant"
-        elif na_count > 0 and yes_count == (total_questions - na_count):
-            status = "partial" # or needs_review per requirement
-        elif yes_count == total_questions:
-            status = "compliant"
-        else:
-            # If there are unanswered questions, it might be unknown or partial.
-            # Requirement: "Else -> unknown" covers cases not matched above.
-            # If yes_count + na_count < total (meaning some unanswered), it falls here.
-            status = "unknown"
-            
         summary[std] = {
-            "status": status,
+            "status": scoring.summary_status(total_questions, yes_count, no_count, na_count),
             "counts": {
                 "total": total_questions,
                 "yes": yes_count,
@@ -178,13 +158,9 @@ REPORT_TEMPLATE = """
 </html>
 """
 
-def generate_html_report(submission: models.Submission, summary: Dict[str, Any], questions: List[models.Question]) -> str:
-    # Prepare details list
-    question_map = {q.question_id: q for q in questions}
-    details = []
-    
+def iter_report_details(answers: List[Dict[str, Any]], questions: List[models.Question]) -> Iterator[Dict[str, Any]]:
     # Create a map of answers
-    answers_map = {a['question_id']: a for a in submission.answers}
+    answers_map = {a['question_id']: a for a in answers}
     
     for q in questions:
         ans = answers_map.get(q.question_id)
@@ -196,13 +172,102 @@ def generate_html_report(submission: models.Submission, summary: Dict[str, Any],
             if val and val.strip():
                 q_standards.append(f"{std}: {val}")
         
-        details.append({
+        yield {
             "question_id": q.question_id,
             "question_text": q.question_text,
             "standards": ", ".join(q_standards),
             "answer": ans['answer'] if ans else "-",
             "notes": ans['notes'] if ans and ans.get('notes') else ""
-        })
-        
-    template = Template(REPORT_TEMPLATE)
-    return template.render(submission=submission, summary=summary, details=details)
+        }
+
+def iter_html_report(
+    submission: models.Submission,
+    summary: Dict[str, Any],
+    questions: List[models.Question],
+    answers: Optional[List[Dict[str, Any]]] = None,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+) -> Iterator[str]:
+    """Render the report incrementally, in chunks of about `chunk_size` characters.
+
+    `answers` defaults to the submission's legacy JSON answers.
+    """
+    if answers is None:
+        answers = submission.answers
+    parts = report_template.generate(
+        submission=submission, summary=summary, details=iter_report_details(answers, questions)
+    )
+    buffer = []
+    buffered = 0
+    for part in parts:
+        buffer.append(part)
+        buffered += len(part)
+        if buffered >= chunk_size:
+            yield "".join(buffer)
+            buffer = []
+            buffered = 0
+    if buffer:
+        yield "".join(buffer)
+
+@metrics.timed("reports.render")
+def generate_html_report(
+    submission: models.Submission,
+    summary: Dict[str, Any],
+    questions: List[models.Question],
+    answers: Optional[List[Dict[str, Any]]] = None,
+) -> str:
+    return "".join(iter_html_report(submission, summary, questions, answers))
+
+class ReportCache:
+    """Thread-safe LRU of rendered reports, bounded by total characters."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.size = 0
+        self._items: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[str]:
+        with self._lock:
+            html = self._items.get(key)
+            if html is not None:
+                self._items.move_to_end(key)
+            return html
+
+    def put(self, key: Hashable, html: str):
+        if len(html) > self.max_size:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._items[key] = html
+            self.size += len(html)
+            while self.size > self.max_size:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted)
+
+    def tee(self, key: Hashable, chunks: Iterator[str]) -> Iterator[str]:
+        """Pass chunks through, caching the full text only if it fits."""
+        parts = []
+        size = 0
+        for chunk in chunks:
+            if parts is not None:
+                size += len(chunk)
+                if size > self.max_size:
+                    parts = None # Too big to cache; stop buffering
+                else:
+                    parts.append(chunk)
+            yield chunk
+        if parts is not None:
+            self.put(key, "".join(parts))
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+# Compiled once per process and shared by every render
+_env = Environment()
+report_template = _env.from_string(REPORT_TEMPLATE)
+
+report_cache = ReportCache(settings.REPORT_CACHE_MAX_BYTES)
@@ -0,0 +1,112 @@
+import gzip
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, NamedTuple, Optional
+from fastapi import Request
+from fastapi.responses import Response
+from .config import settings
+
+try:
+    import orjson
+except ImportError: # Optional; the stdlib encoder produces the same JSON, slower
+    orjson = None
+
+# Bodies smaller than this are not worth a gzip variant
+GZIP_MIN_SIZE = 1024
+
+def dumps(obj: Any) -> bytes:
+    """Compact UTF-8 JSON, via orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+def loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+class EncodedBody(NamedTuple):
+    raw: bytes
+    gzip: Optional[bytes]
+    headers: Dict[str, str] # Response headers that belong to the body (e.g. X-Next-Cursor)
+
+    @property
+    def size(self) -> int:
+        return len(self.raw) + len(self.gzip or b"")
+
+def encode_body(payload: Any, headers: Optional[Dict[str, str]] = None) -> EncodedBody:
+    raw = dumps(payload)
+    compressed = gzip.compress(raw, compresslevel=6, mtime=0) if len(raw) >= GZIP_MIN_SIZE else None
+    return EncodedBody(raw, compressed, headers or {})
+
+def accepts_gzip(request: Request) -> bool:
+    return "gzip" in request.headers.get("accept-encoding", "").lower()
+
+def gzip_etag(etag: str) -> str:
+    """The strong ETag of a body's gzip variant: '"q2-ab"' -> '"q2-ab-gz"'."""
+    return f'{etag[:-1]}-gz"'
+
+def body_response(request: Request, body: EncodedBody, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Serve pre-encoded JSON as-is, gzipped when the client accepts it."""
+    out = {**body.headers, **(headers or {}), "Vary": "Accept-Encoding"}
+    if body.gzip is not None and accepts_gzip(request):
+        out["Content-Encoding"] = "gzip"
+        # Strong validators differ per content-coding
+        if "ETag" in out:
+            out["ETag"] = gzip_etag(out["ETag"])
+        return Response(body.gzip, media_type="application/json", headers=out)
+    return Response(body.raw, media_type="application/json", headers=out)
+
+class ResponseCache:
+    """Thread-safe LRU of encoded bodies for the current catalog version.
+
+    Entries are keyed by query shape; a lookup or store under a newer
+    version drops everything cached for the older one.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.size = 0
+        self.version: Optional[int] = None
+        self._items: "OrderedDict[Hashable, EncodedBody]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _switch(self, version: int):
+        if version != self.version:
+            self._items.clear()
+            self.size = 0
+            self.version = version
+
+    def get(self, version: int, key: Hashable) -> Optional[EncodedBody]:
+        with self._lock:
+            if version != self.version:
+                return None
+            body = self._items.get(key)
+            if body is not None:
+                self._items.move_to_end(key)
+            return body
+
+    def put(self, version: int, key: Hashable, body: EncodedBody):
+        if body.size > self.max_size:
+            return
+        with self._lock:
+            if self.version is not None and version < self.version:
+                return # Built from a stale snapshot
+            self._switch(version)
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= old.size
+            self._items[key] = body
+            self.size += body.size
+            while self.size > self.max_size:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= evicted.size
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+            self.version = None
+
+catalog_responses = ResponseCache(settings.CATALOG_RESPONSE_CACHE_MAX_BYTES)
@@ -0,0 +1,129 @@
+"""Pre-aggregated compliance per (client_id, standard, month).
+
+Every write to Submission.summary applies its delta here in the same
+transaction: +1 for new submissions, old entry out / new entry in for a
+re-score. rebuild() recomputes the table from the submissions.
+"""
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterable, Optional, Tuple
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+from . import models
+from .db import upsert_insert
+
+STATUSES = ("compliant", "partial", "non_compliant", "unknown", "not_applicable")
+COUNTS = ("yes", "no", "na", "total")
+COUNTERS = ("submissions",) + STATUSES + COUNTS
+
+Key = Tuple[str, str, date]
+
+def bucket(created_at: Optional[datetime]) -> date:
+    created_at = created_at or datetime.now(timezone.utc)
+    return date(created_at.year, created_at.month, 1)
+
+def add_entry(deltas: Dict[Key, Dict[str, int]], key: Key, entry: Dict[str, Any], sign: int = 1):
+    counters = deltas.setdefault(key, dict.fromkeys(COUNTERS, 0))
+    counters["submissions"] += sign
+    if entry.get("status") in STATUSES:
+        counters[entry["status"]] += sign
+    counts = entry.get("counts") or {}
+    for name in COUNTS:
+        counters[name] += sign * counts.get(name, 0)
+
+def submission_deltas(submissions: Iterable[Any], sign: int = 1) -> Dict[Key, Dict[str, int]]:
+    """Deltas for submissions (ORM rows or submission_values() dicts), merged by key."""
+    deltas = {}
+    for sub in submissions:
+        if isinstance(sub, dict):
+            client_id, created_at, summary = sub["client_id"], sub["created_at"], sub["summary"]
+        else:
+            client_id, created_at, summary = sub.client_id, sub.created_at, sub.summary
+        month = bucket(created_at)
+        for std, entry in (summary or {}).items():
+            add_entry(deltas, (client_id, std, month), entry, sign)
+    return deltas
+
+def _rows(deltas: Dict[Key, Dict[str, int]]) -> list:
+    return [
+        {"client_id": client_id, "standard": std, "bucket": month, **counters}
+        for (client_id, std, month), counters in deltas.items()
+        if any(counters.values())
+    ]
+
+def _upsert(dialect: str):
+    """INSERT ... ON CONFLICT DO UPDATE adding the incoming counters."""
+    stmt = upsert_insert(dialect)(models.ComplianceRollup)
+    return stmt.on_conflict_do_update(
+        index_elements=["client_id", "standard", "bucket"],
+        set_={name: getattr(models.ComplianceRollup, name) + stmt.excluded[name] for name in COUNTERS},
+    )
+
+def apply(db: Session, deltas: Dict[Key, Dict[str, int]]):
+    # No commit: applied in the caller's transaction
+    rows = _rows(deltas)
+    if rows:
+        db.execute(_upsert(db.get_bind().dialect.name), rows)
+
+def rebuild(db: Session, batch_size: int = 5000) -> int:
+    """Recompute the whole table from Submission.summary, without committing.
+
+    Returns the number of rollup rows written.
+    """
+    db.execute(delete(models.ComplianceRollup))
+    deltas = {}
+    result = db.execute(
+        select(models.Submission.client_id, models.Submission.created_at, models.Submission.summary)
+        .execution_options(yield_per=batch_size)
+    )
+    for rows in result.partitions():
+        for std_key, counters in submission_deltas(rows).items():
+            merged = deltas.setdefault(std_key, dict.fromkeys(COUNTERS, 0))
+            for name, value in counters.items():
+                merged[name] += value
+    rows = _rows(deltas)
+    if rows:
+        db.execute(insert(models.ComplianceRollup), rows)
+    return len(rows)
+
+GROUP_COLUMNS = {
+    "client_id": models.ComplianceRollup.client_id,
+    "standard": models.ComplianceRollup.standard,
+    "month": models.ComplianceRollup.bucket,
+}
+
+def compliance_query(
+    group_by: Iterable[str] = ("client_id", "standard", "month"),
+    client_id: Optional[str] = None,
+    standard: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+):
+    """Summed counters grouped by `group_by`, over buckets in [start, end].
+
+    A rollup row counts submissions for one standard, so summed across
+    standards the count is of assessments (submission x standard), not of
+    distinct submissions; it is labelled `assessments`.
+    """
+    columns = [GROUP_COLUMNS[name].label(name) for name in group_by]
+    sums = [
+        func.sum(getattr(models.ComplianceRollup, name)).label("assessments" if name == "submissions" else name)
+        for name in COUNTERS
+    ]
+    stmt = select(*columns, *sums)
+    if client_id is not None:
+        stmt = stmt.where(models.ComplianceRollup.client_id == client_id)
+    if standard is not None:
+        stmt = stmt.where(models.ComplianceRollup.standard == standard)
+    if start is not None:
+        stmt = stmt.where(models.ComplianceRollup.bucket >= date(start.year, start.month, 1))
+    if end is not None:
+        stmt = stmt.where(models.ComplianceRollup.bucket <= end)
+    if columns:
+        stmt = stmt.group_by(*columns).order_by(*columns)
+    return stmt
+
+def with_rates(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Add compliance_rate: compliant share of the assessments where the standard applies."""
+    applicable = row["assessments"] - row["not_applicable"]
+    row["compliance_rate"] = round(row["compliant"] / applicable, 4) if applicable else None
+    return row
@@ -1,6 +1,7 @@
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
-from datetime import datetime
+from pydantic import BaseModel, TypeAdapter, computed_field
+from typing import List, NamedTuple, Optional, Dict, Any
+from typing_extensions import NotRequired, TypedDict
+from datetime import date, datetime
 
 class QuestionBase(BaseModel):
     question_id: str
@@ -25,6 +26,17 @@ class QuestionOut(QuestionBase):
     class Config:
         from_attributes = True
 
+class SearchHit(QuestionOut):
+    # BM25 relevance; None for a search without query terms
+    score: Optional[float] = None
+
+class SearchResults(BaseModel):
+    catalog_version: int
+    total: int
+    hits: List[SearchHit]
+    # facet -> value -> matching questions, with every filter but that facet's own
+    facets: Dict[str, Dict[str, int]]
+
 class AnswerIn(BaseModel):
     question_id: str
     answer: str
@@ -34,16 +46,163 @@ class SubmissionIn(BaseModel):
     client_id: str
     answers: List[AnswerIn]
 
+# Bulk ingestion shapes: validating into TypedDicts skips building a
+# model instance per answer, which dominates batch scoring otherwise
+class AnswerRow(TypedDict):
+    question_id: str
+    answer: str
+    notes: NotRequired[Optional[str]]
+
+class SubmissionRow(TypedDict):
+    client_id: str
+    answers: List[AnswerRow]
+
+submission_row_adapter = TypeAdapter(SubmissionRow)
+
+class Answer(NamedTuple):
+    """Validated answer with AnswerIn's attributes, for scoring."""
+    question_id: str
+    answer: str
+    notes: Optional[str] = None
+
+class AnswerDelta(BaseModel):
+    question_id: str
+    # None clears the answer
+    answer: Optional[str] = None
+    notes: Optional[str] = None
+
+class DraftCreate(BaseModel):
+    client_id: str
+    answers: List[AnswerDelta] = []
+
+class DraftPatch(BaseModel):
+    answers: List[AnswerDelta]
+
+class DraftOut(BaseModel):
+    draft_id: str
+    client_id: str
+    status: str
+    catalog_version: Optional[int] = None
+    revision: int
+    answered: int
+    submission_id: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    # Provisional per-standard status from the draft counters
+    summary: Dict[str, Any] = {}
+
+    class Config:
+        from_attributes = True
+
 class SubmissionOut(BaseModel):
     submission_id: str
     client_id: str
     created_at: datetime
     summary: Dict[str, Any]
-    report_html: str
+    # Only set for submissions stored before reports were rendered on demand
+    report_html: Optional[str] = None
+
+    @computed_field
+    @property
+    def report_url(self) -> str:
+        return f"/report/{self.submission_id}"
+
+    class Config:
+        from_attributes = True
+
+class SubmissionAccepted(SubmissionOut):
+    # Background jobs queued for the submission; poll GET /jobs/{id}
+    jobs: List[str] = []
+
+class JobOut(BaseModel):
+    id: str
+    kind: str
+    status: str
+    submission_id: Optional[str] = None
+    parent_id: Optional[str] = None
+    attempts: int
+    max_attempts: int
+    last_error: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    created_at: Optional[datetime] = None
+    run_after: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    progress: Optional[Dict[str, Any]] = None
 
     class Config:
         from_attributes = True
 
+class AnswerError(BaseModel):
+    index: int # Position in the submitted answers
+    question_id: str
+    code: str # unknown_question, duplicate, invalid_answer, notes_required
+    message: str
+
+class BatchItemResult(BaseModel):
+    index: int
+    submission_id: Optional[str] = None
+    client_id: Optional[str] = None
+    error: Optional[str] = None
+    # Every invalid answer, when the item failed answer validation
+    errors: Optional[List[AnswerError]] = None
+
+class BatchSubmitResult(BaseModel):
+    accepted: int
+    rejected: int
+    items: List[BatchItemResult]
+
+class AnswerState(BaseModel):
+    answer: str
+    notes: Optional[str] = None
+
+class AnswerChange(BaseModel):
+    question_id: str
+    before: Optional[AnswerState] = None # None: unanswered
+    after: Optional[AnswerState] = None
+
+class StatusChange(BaseModel):
+    standard: str
+    before: Optional[str] = None
+    after: Optional[str] = None
+
+class SubmissionDiff(BaseModel):
+    base_submission_id: str
+    other_submission_id: str
+    answers_changed: List[AnswerChange]
+    standards_changed: List[StatusChange]
+
+class ComplianceRollupOut(BaseModel):
+    client_id: Optional[str] = None
+    standard: Optional[str] = None
+    month: Optional[date] = None
+    # Submissions counted once per standard: equal to the submission count only
+    # when grouped by (or filtered to) one standard
+    assessments: int
+    compliant: int
+    partial: int
+    non_compliant: int
+    unknown: int
+    not_applicable: int
+    yes: int
+    no: int
+    na: int
+    total: int
+    compliance_rate: Optional[float] = None
+
 class ImportStats(BaseModel):
     inserted: int
     updated: int
+    unchanged: int = 0
+    # Queued when the import changed which questions map to a standard
+    rescore_job: Optional[str] = None
+
+class ImportBatch(BaseModel):
+    batch: int
+    rows: int
+    inserted: int
+    updated: int
+    unchanged: int
+
+class StreamImportStats(ImportStats):
+    batches: List[ImportBatch] = []
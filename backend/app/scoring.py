@@ -0,0 +1,337 @@
+import json
+import struct
+import zlib
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+from . import models
+
+STANDARD_COLS = models.STANDARD_COLS
+
+# Per-question answer codes (one byte per catalog position)
+UNANSWERED = 0
+YES = 1
+NO = 2
+NA = 3
+OTHER = 4 # Answered, but not yes/no/n/a; scored as unanswered
+
+ANSWER_CODES = {"yes": YES, "no": NO, "n/a": NA, "na": NA}
+# Canonical answer text when decoding stored codes
+ANSWER_TEXT = {YES: "yes", NO: "no", NA: "n/a"}
+
+# Answer codes counted per standard by draft counters
+COUNTER_KEYS = {YES: "yes", NO: "no", NA: "na"}
+
+# Packed answers: zlib(<format byte><uint32 size><one code byte per position><JSON extras>)
+PACK_FORMAT = 1
+_PACK_HEADER = struct.Struct("<BI")
+
+class EncodedAnswers(NamedTuple):
+    codes: bytearray
+    notes: Dict[int, str] # Any answer's notes, by position
+    other: Dict[int, str] # Raw text of OTHER answers, by position
+
+    @property
+    def na_notes(self) -> Dict[int, str]:
+        return {pos: note for pos, note in self.notes.items() if self.codes[pos] == NA}
+
+def pack_answers(encoded: EncodedAnswers) -> bytes:
+    extras = {}
+    if encoded.notes:
+        extras["notes"] = encoded.notes
+    if encoded.other:
+        extras["other"] = encoded.other
+    raw = _PACK_HEADER.pack(PACK_FORMAT, len(encoded.codes)) + bytes(encoded.codes)
+    if extras:
+        raw += json.dumps(extras, separators=(",", ":")).encode("utf-8")
+    return zlib.compress(raw)
+
+def unpack_answers(data: bytes, size: Optional[int] = None) -> EncodedAnswers:
+    """Inverse of pack_answers; pads the code vector to `size` positions if given."""
+    raw = zlib.decompress(data)
+    fmt, n = _PACK_HEADER.unpack_from(raw)
+    if fmt != PACK_FORMAT:
+        raise ValueError(f"Unsupported packed answers format: {fmt}")
+    start = _PACK_HEADER.size
+    codes = bytearray(raw[start:start + n])
+    if size is not None and size > n:
+        codes.extend(bytes(size - n))
+    extras = json.loads(raw[start + n:]) if len(raw) > start + n else {}
+    # JSON object keys are strings
+    notes = {int(pos): note for pos, note in extras.get("notes", {}).items()}
+    other = {int(pos): text for pos, text in extras.get("other", {}).items()}
+    return EncodedAnswers(codes, notes, other)
+
+def answer_code(value: str) -> int:
+    return ANSWER_CODES.get(value.lower(), OTHER)
+
+def summary_status(total: int, yes: int, no: int, na: int) -> str:
+    if total == 0:
+        return "not_applicable"
+    if no > 0:
+        return "non_compliant"
+    if na > 0 and yes == (total - na):
+        return "partial" # or needs_review per requirement
+    if yes == total:
+        return "compliant"
+    # Anything else, including unanswered questions, is unknown
+    return "unknown"
+
+def _translation(*codes: int) -> bytes:
+    # Maps a code vector to ASCII '1'/'0' so int(..., 2) packs it into a bitset
+    return bytes(0x31 if c in codes else 0x30 for c in range(256))
+
+_MASK_TABLES = {code: _translation(code) for code in (YES, NO, NA)}
+_MEMBER_TABLE = _translation(1)
+
+def to_bitset(flags: bytes, table: bytes) -> int:
+    """Pack a per-position byte vector into an int; bit i is position i."""
+    if not flags:
+        return 0
+    return int(flags.translate(table)[::-1], 2)
+
+def positions_to_bitset(positions: Iterable[int]) -> int:
+    positions = tuple(positions)
+    if not positions:
+        return 0
+    bits = bytearray(max(positions) // 8 + 1)
+    for pos in positions:
+        bits[pos >> 3] |= 1 << (pos & 7)
+    return int.from_bytes(bits, "little")
+
+def diff_statuses(old: Dict[str, Any], new: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Standards whose summary status moved: [{standard, before, after}]."""
+    changed = []
+    for std in dict.fromkeys([*old, *new]):
+        before = (old.get(std) or {}).get("status")
+        after = (new.get(std) or {}).get("status")
+        if before != after:
+            changed.append({"standard": std, "before": before, "after": after})
+    return changed
+
+def _entry(total: int, yes: int, no: int, na: int, na_notes: List[str]) -> Dict[str, Any]:
+    return {
+        "status": summary_status(total, yes, no, na),
+        "counts": {
+            "total": total,
+            "yes": yes,
+            "no": no,
+            "na": na,
+            "unanswered": total - yes - no - na
+        },
+        "na_notes": na_notes
+    }
+
+class ScoringEngine:
+    """Question-by-standard membership bitsets for one catalog version.
+
+    Scoring a submission is a handful of AND + popcount operations per
+    standard, independent of how many questions map to it.
+    """
+
+    __slots__ = (
+        "size", "question_ids", "positions", "standards", "members", "totals", "standards_of",
+        "control_members", "controls_of"
+    )
+
+    def __init__(
+        self,
+        questions: Tuple[Any, ...],
+        standards: Iterable[str] = STANDARD_COLS,
+        controls: Optional[Mapping[Tuple[str, str], Tuple[int, ...]]] = None,
+    ):
+        self.size = len(questions)
+        self.question_ids = tuple(q.question_id for q in questions)
+        self.positions = {qid: pos for pos, qid in enumerate(self.question_ids)}
+        self.standards = tuple(standards)
+        self.members = {}
+        self.totals = {}
+        for std in self.standards:
+            flags = bytes(1 if getattr(q, std) and getattr(q, std).strip() else 0 for q in questions)
+            mask = to_bitset(flags, _MEMBER_TABLE)
+            self.members[std] = mask
+            self.totals[std] = mask.bit_count()
+        # Reverse membership, for the sparse per-answer work (n/a notes)
+        self.standards_of = tuple(
+            tuple(std for std in self.standards if getattr(q, std) and getattr(q, std).strip())
+            for q in questions
+        )
+        # standard -> control_id -> (bitset, total), from the catalog's control index
+        self.control_members = {std: {} for std in self.standards}
+        controls_of = [[] for _ in questions]
+        for (std, control_id), positions in (controls or {}).items():
+            if std not in self.control_members:
+                continue
+            self.control_members[std][control_id] = (positions_to_bitset(positions), len(positions))
+            for pos in positions:
+                controls_of[pos].append((std, control_id))
+        self.controls_of = tuple(tuple(c) for c in controls_of)
+
+    def encode_answers(self, answers: Iterable[Any]) -> EncodedAnswers:
+        """Answers -> code per catalog position, plus sparse notes and raw OTHER text.
+
+        Unknown question_ids are ignored; a repeated question_id keeps its last answer.
+        """
+        codes = bytearray(self.size)
+        notes = {}
+        other = {}
+        positions = self.positions
+        for ans in answers:
+            pos = positions.get(ans.question_id)
+            if pos is None:
+                continue
+            code = answer_code(ans.answer)
+            codes[pos] = code
+            if ans.notes:
+                notes[pos] = ans.notes
+            else:
+                notes.pop(pos, None)
+            if code == OTHER:
+                other[pos] = ans.answer
+            else:
+                other.pop(pos, None)
+        return EncodedAnswers(codes, notes, other)
+
+    def encode(self, answers: Iterable[Any]) -> Tuple[bytearray, Dict[int, str]]:
+        """Answers -> (code per catalog position, notes of n/a answers by position)."""
+        encoded = self.encode_answers(answers)
+        return encoded.codes, encoded.na_notes
+
+    def unpack(self, data: bytes) -> EncodedAnswers:
+        # Catalog positions are append-only, so vectors packed against an
+        # older version are a prefix of this one
+        encoded = unpack_answers(data, size=self.size)
+        if len(encoded.codes) > self.size:
+            raise ValueError("Packed answers are longer than the catalog")
+        return encoded
+
+    def decode_answers(self, encoded: EncodedAnswers) -> List[Dict[str, Any]]:
+        """Code vector -> API answer dicts ({question_id, answer, notes}), in catalog order."""
+        answers = []
+        for pos, code in enumerate(encoded.codes):
+            if code == UNANSWERED:
+                continue
+            answers.append({
+                "question_id": self.question_ids[pos],
+                "answer": encoded.other.get(pos, "") if code == OTHER else ANSWER_TEXT[code],
+                "notes": encoded.notes.get(pos)
+            })
+        return answers
+
+    def answer_at(self, encoded: EncodedAnswers, pos: int) -> Optional[Dict[str, Any]]:
+        code = encoded.codes[pos]
+        if code == UNANSWERED:
+            return None
+        answer = encoded.other.get(pos, "") if code == OTHER else ANSWER_TEXT[code]
+        return {"answer": answer, "notes": encoded.notes.get(pos)}
+
+    def diff_answers(self, old: EncodedAnswers, new: EncodedAnswers) -> List[Dict[str, Any]]:
+        """Questions whose answer or notes differ: [{question_id, before, after}], in catalog order."""
+        positions = {pos for pos, (a, b) in enumerate(zip(old.codes, new.codes)) if a != b}
+        for pos in old.notes.keys() | new.notes.keys() | old.other.keys() | new.other.keys():
+            if old.notes.get(pos) != new.notes.get(pos) or old.other.get(pos) != new.other.get(pos):
+                positions.add(pos)
+        return [
+            {
+                "question_id": self.question_ids[pos],
+                "before": self.answer_at(old, pos),
+                "after": self.answer_at(new, pos),
+            }
+            for pos in sorted(positions)
+        ]
+
+    def summarize(
+        self,
+        codes: bytes,
+        na_notes: Dict[int, str],
+        standards: Optional[Iterable[str]] = None,
+    ) -> Dict[str, Any]:
+        codes = bytes(codes)
+        yes_mask = to_bitset(codes, _MASK_TABLES[YES])
+        no_mask = to_bitset(codes, _MASK_TABLES[NO])
+        na_mask = to_bitset(codes, _MASK_TABLES[NA])
+        standards = self.standards if standards is None else tuple(standards)
+        notes_by_std = {std: [] for std in standards}
+        for pos in sorted(na_notes):
+            note = f"{self.question_ids[pos]}: {na_notes[pos]}"
+            for std in self.standards_of[pos]:
+                if std in notes_by_std:
+                    notes_by_std[std].append(note)
+
+        summary = {}
+        for std in standards:
+            member = self.members[std]
+            summary[std] = _entry(
+                self.totals[std],
+                (member & yes_mask).bit_count(),
+                (member & no_mask).bit_count(),
+                (member & na_mask).bit_count(),
+                notes_by_std[std]
+            )
+        return summary
+
+    def summarize_controls(
+        self,
+        codes: bytes,
+        na_notes: Dict[int, str],
+        standards: Optional[Iterable[str]] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """Per-control breakdown: {standard: {control_id: summary entry}}."""
+        codes = bytes(codes)
+        yes_mask = to_bitset(codes, _MASK_TABLES[YES])
+        no_mask = to_bitset(codes, _MASK_TABLES[NO])
+        na_mask = to_bitset(codes, _MASK_TABLES[NA])
+
+        standards = self.standards if standards is None else tuple(standards)
+        notes_by_control = {}
+        for pos in sorted(na_notes):
+            note = f"{self.question_ids[pos]}: {na_notes[pos]}"
+            for key in self.controls_of[pos]:
+                notes_by_control.setdefault(key, []).append(note)
+
+        breakdown = {}
+        for std in standards:
+            breakdown[std] = {
+                control_id: _entry(
+                    total,
+                    (member & yes_mask).bit_count(),
+                    (member & no_mask).bit_count(),
+                    (member & na_mask).bit_count(),
+                    notes_by_control.get((std, control_id), [])
+                )
+                for control_id, (member, total) in self.control_members[std].items()
+            }
+        return breakdown
+
+    def empty_counters(self) -> Dict[str, Dict[str, int]]:
+        return {std: {"yes": 0, "no": 0, "na": 0} for std in self.standards}
+
+    def count(self, codes: bytes) -> Dict[str, Dict[str, int]]:
+        """Per-standard yes/no/na counters for a full code vector."""
+        codes = bytes(codes)
+        masks = {key: to_bitset(codes, _MASK_TABLES[code]) for code, key in COUNTER_KEYS.items()}
+        return {
+            std: {key: (self.members[std] & mask).bit_count() for key, mask in masks.items()}
+            for std in self.standards
+        }
+
+    def apply_delta(self, counters: Dict[str, Dict[str, int]], pos: int, old: int, new: int):
+        """Move one answer from code `old` to `new` in place; O(standards it maps to)."""
+        if old == new:
+            return
+        old_key = COUNTER_KEYS.get(old)
+        new_key = COUNTER_KEYS.get(new)
+        for std in self.standards_of[pos]:
+            if old_key:
+                counters[std][old_key] -= 1
+            if new_key:
+                counters[std][new_key] += 1
+
+    def summarize_counters(self, counters: Dict[str, Dict[str, int]]) -> Dict[str, Any]:
+        """Provisional summary from counters; n/a notes are only collected by summarize()."""
+        return {
+            std: _entry(self.totals[std], counters[std]["yes"], counters[std]["no"], counters[std]["na"], [])
+            for std in self.standards
+        }
+
+    def score(self, answers: Iterable[Any]) -> Dict[str, Any]:
+        codes, na_notes = self.encode(answers)
+        return self.summarize(codes, na_notes)
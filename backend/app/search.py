@@ -0,0 +1,285 @@
+"""Ranked full-text and faceted search over one catalog snapshot.
+
+Every worker already holds each catalog version in memory (see
+catalog.Catalog), so its search index lives there too: built on the first
+search of a version, replaced with the snapshot by the next import. Query
+terms are matched as whole tokens, all of them must match, and hits are
+ranked by BM25 over question_id, question_text, notes and the standard
+columns (so "AC-2" or "A.8.5" finds the questions mapped to that control).
+
+Facet counts use bitsets, like the scoring engine: common tokens and every
+facet value keep one, so counting a facet value is an AND and a popcount.
+A query with a rare token walks only that token's postings.
+"""
+import heapq
+import math
+import re
+from collections import Counter
+from itertools import chain
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple
+from . import metrics, models, scoring
+
+TOKEN = re.compile(r"\w+(?:[.\-]\w+)*")
+
+# Per-field term weights
+FIELD_WEIGHTS = {
+    "question_id": 3.0, "question_text": 2.0, "notes": 1.0,
+    **{std: 1.5 for std in models.STANDARD_COLS},
+}
+# Facets read straight off a question column
+FIELD_FACETS = ("iam_domain", "section_id", "question_type")
+FACETS = (*FIELD_FACETS, "standard", "control_id")
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# A token in at least 1/DENSE_FRACTION of the questions also keeps a bitset
+DENSE_FRACTION = 64
+# Up to this many matches are all scored; past it, only until the top hits are settled
+FULL_SCORE_LIMIT = 2048
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """'Is MFA enforced (IA-2)?' -> ['is', 'mfa', 'enforced', 'ia-2']"""
+    return TOKEN.findall(text.lower()) if text else []
+
+_NONZERO = re.compile(rb"[^\x00]")
+_BYTE_BITS = tuple(tuple(i for i in range(8) if byte >> i & 1) for byte in range(256))
+
+def bit_positions(bits: int) -> Iterator[int]:
+    """Set bit positions of `bits`, ascending."""
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    # Zero bytes are skipped by the regex engine, not a Python loop
+    for match in _NONZERO.finditer(data):
+        offset = match.start()
+        for i in _BYTE_BITS[data[offset]]:
+            yield offset * 8 + i
+
+class SearchResult(NamedTuple):
+    total: int
+    hits: List[Tuple[int, Optional[float]]] # (position, score); no score without query terms
+    facets: Dict[str, Dict[str, int]]
+
+class SearchIndex:
+    """Inverted index and facet bitsets for one catalog version."""
+
+    __slots__ = ("size", "engine", "postings", "dense", "ranked", "values", "facet_bits", "controls")
+
+    @metrics.timed("search.build")
+    def __init__(self, questions: Tuple[Any, ...], engine: scoring.ScoringEngine):
+        self.size = len(questions)
+        # Standard and control membership come from the scoring engine
+        self.engine = engine
+
+        # token -> {position: weighted term frequency}, then BM25 weight
+        frequencies: Dict[str, Dict[int, float]] = {}
+        lengths = []
+        fields = tuple(FIELD_WEIGHTS.items())
+        # Control columns repeat across questions; tokenize each distinct value once
+        tokenized = {}
+        for pos, q in enumerate(questions):
+            weights = {}
+            for field, weight in fields:
+                text = getattr(q, field)
+                if not text:
+                    continue
+                tokens = tokenized.get(text)
+                if tokens is None:
+                    tokens = TOKEN.findall(text.lower())
+                    if field in models.STANDARD_COLS:
+                        tokenized[text] = tokens
+                for token in tokens:
+                    weights[token] = weights.get(token, 0.0) + weight
+            lengths.append(sum(weights.values()))
+            for token, tf in weights.items():
+                docs = frequencies.get(token)
+                if docs is None:
+                    frequencies[token] = {pos: tf}
+                else:
+                    docs[pos] = tf
+        average = (sum(lengths) / len(lengths) if lengths else 0.0) or 1.0
+        # The length part of BM25's denominator, per question
+        norms = [K1 * (1 - B + B * length / average) for length in lengths]
+        self.postings = {}
+        for token, docs in frequencies.items():
+            idf = math.log(1 + (self.size - len(docs) + 0.5) / (len(docs) + 0.5))
+            boost = idf * (K1 + 1)
+            self.postings[token] = {pos: boost * tf / (tf + norms[pos]) for pos, tf in docs.items()}
+        postings = self.postings
+        self.dense = {
+            token: scoring.positions_to_bitset(docs)
+            for token, docs in postings.items() if len(docs) * DENSE_FRACTION >= self.size
+        }
+        # token -> positions by descending weight, sorted on first use
+        self.ranked: Dict[str, Tuple[int, ...]] = {}
+
+        self.values = {facet: tuple(getattr(q, facet) or None for q in questions) for facet in FIELD_FACETS}
+        self.facet_bits = {}
+        for facet, values in self.values.items():
+            positions = {}
+            for pos, value in enumerate(values):
+                if value is not None:
+                    positions.setdefault(value, []).append(pos)
+            self.facet_bits[facet] = {value: scoring.positions_to_bitset(p) for value, p in positions.items()}
+        # standard -> control IDs per position
+        self.controls = {std: [[] for _ in questions] for std in engine.standards}
+        for pos, keys in enumerate(engine.controls_of):
+            for std, control_id in keys:
+                self.controls[std][pos].append(control_id)
+        self.controls = {std: tuple(map(tuple, per_position)) for std, per_position in self.controls.items()}
+
+    def _ranked(self, token: str) -> Tuple[int, ...]:
+        ranked = self.ranked.get(token)
+        if ranked is None:
+            weights = self.postings[token]
+            # Stable: equal weights stay in catalog order
+            ranked = self.ranked[token] = tuple(sorted(weights, key=weights.__getitem__, reverse=True))
+        return ranked
+
+    def _facet_bitsets(self, facet: str, standard: Optional[str]) -> Mapping[str, int]:
+        if facet in self.facet_bits:
+            return self.facet_bits[facet]
+        if facet == "standard":
+            return self.engine.members
+        return {control_id: bits for control_id, (bits, _) in self.engine.control_members.get(standard, {}).items()}
+
+    def _check(self, facet: str, value: str, standard: Optional[str]) -> Callable[[int], bool]:
+        """Per-position test for one filter, for matches walked one by one."""
+        if facet in self.values:
+            values = self.values[facet]
+            return lambda pos: values[pos] == value
+        if facet == "standard":
+            standards_of = self.engine.standards_of
+            return lambda pos: value in standards_of[pos]
+        controls = self.controls.get(standard)
+        if controls is None:
+            return lambda pos: False
+        return lambda pos: value in controls[pos]
+
+    def _count_positions(self, positions: Iterable[int], facet: str, standard: Optional[str]) -> Dict[str, int]:
+        # Counted with map(): no Python-level loop per position
+        if facet in self.values:
+            counts = Counter(map(self.values[facet].__getitem__, positions))
+            counts.pop(None, None)
+        elif facet == "standard":
+            counts = Counter(chain.from_iterable(map(self.engine.standards_of.__getitem__, positions)))
+        elif standard in self.controls:
+            counts = Counter(chain.from_iterable(map(self.controls[standard].__getitem__, positions)))
+        else:
+            counts = {}
+        return dict(counts)
+
+    def _count(self, base: int, facet: str, standard: Optional[str]) -> Dict[str, int]:
+        bitsets = self._facet_bitsets(facet, standard)
+        if base.bit_count() <= 8 * len(bitsets):
+            # Few matches: cheaper to look each one up than to AND every value
+            return self._count_positions(bit_positions(base), facet, standard)
+        counts = {value: (base & bits).bit_count() for value, bits in bitsets.items()}
+        return {value: count for value, count in counts.items() if count}
+
+    @metrics.timed("search.query")
+    def search(self, query: str = "", filters: Optional[Mapping[str, str]] = None, limit: int = 20, offset: int = 0) -> SearchResult:
+        """Matches of every query term that pass every filter, best first.
+
+        `filters` maps facet names (FACETS) to one value each; control_id
+        needs standard. Facet counts apply every filter but the facet's own,
+        so a UI can offer the alternatives. Without query terms the matches
+        come back in catalog order.
+        """
+        filters = {facet: value for facet, value in (filters or {}).items() if value is not None}
+        unknown = set(filters) - set(FACETS)
+        if unknown:
+            raise ValueError(f"Unknown facets: {', '.join(sorted(unknown))}")
+        standard = filters.get("standard")
+        if "control_id" in filters and standard is None:
+            raise ValueError("control_id requires standard")
+        facets = [facet for facet in FACETS if facet != "control_id" or standard is not None]
+
+        terms = list(dict.fromkeys(tokenize(query)))
+        postings = [self.postings.get(term) for term in terms]
+        if any(p is None for p in postings):
+            return SearchResult(0, [], {facet: {} for facet in facets})
+        wanted = offset + limit
+
+        checks = {facet: self._check(facet, value, standard) for facet, value in filters.items()}
+        if postings and min(len(p) for p in postings) * DENSE_FRACTION < self.size:
+            return self._search_sparse(postings, checks, facets, standard, wanted, offset)
+
+        text = (1 << self.size) - 1
+        for term in terms:
+            text &= self.dense[term]
+        masks = {facet: self._facet_bitsets(facet, standard).get(value, 0) for facet, value in filters.items()}
+        matches = text
+        for mask in masks.values():
+            matches &= mask
+        counts = {}
+        for facet in facets:
+            base = text
+            for other, mask in masks.items():
+                if other != facet:
+                    base &= mask
+            counts[facet] = self._count(base, facet, standard)
+
+        total = matches.bit_count()
+        if not terms:
+            positions = bit_positions(matches)
+            hits = [(pos, None) for _, pos in zip(range(wanted), positions)]
+        elif total <= FULL_SCORE_LIMIT:
+            hits = self._best_of(((pos, sum(p[pos] for p in postings)) for pos in bit_positions(matches)), wanted)
+        else:
+            hits = self._threshold_top(terms, postings, checks, wanted)
+        return SearchResult(total, hits[offset:], counts)
+
+    def _search_sparse(self, postings, checks, facets, standard, wanted, offset) -> SearchResult:
+        # The rarest term bounds the matches: check each of its positions
+        postings = sorted(postings, key=len)
+        rarest, rest = postings[0], postings[1:]
+        text = [pos for pos in rarest if all(pos in p for p in rest)]
+        matches = []
+        # Positions failing only that facet's filter, counted under it alone
+        near = {facet: [] for facet in checks}
+        for pos in text:
+            failed = [facet for facet, check in checks.items() if not check(pos)]
+            if not failed:
+                matches.append(pos)
+            elif len(failed) == 1:
+                near[failed[0]].append(pos)
+        counts = {facet: self._count_positions(matches + near.get(facet, []), facet, standard) for facet in facets}
+        hits = self._best_of(((pos, sum(p[pos] for p in postings)) for pos in matches), wanted)
+        return SearchResult(len(matches), hits[offset:], counts)
+
+    def _threshold_top(self, terms, postings, checks, wanted) -> List[Tuple[int, float]]:
+        """Top `wanted` hits without scoring every match (Fagin's threshold algorithm).
+
+        Walks each term's positions by descending weight, one rank at a
+        time; no unseen position can score more than the weights at the
+        current rank, so the walk stops once the top hits beat that sum.
+        """
+        lists = [self._ranked(term) for term in terms]
+        heap = []
+        seen = set()
+        for rank in range(min(len(ranked) for ranked in lists)):
+            threshold = 0.0
+            for ranked, weights in zip(lists, postings):
+                pos = ranked[rank]
+                threshold += weights[pos]
+                if pos in seen:
+                    continue
+                seen.add(pos)
+                if not all(pos in p for p in postings):
+                    continue
+                if not all(check(pos) for check in checks.values()):
+                    continue
+                hit = (sum(p[pos] for p in postings), -pos)
+                if len(heap) < wanted:
+                    heapq.heappush(heap, hit)
+                elif hit > heap[0]:
+                    heapq.heapreplace(heap, hit)
+            if len(heap) >= wanted and heap[0][0] > threshold:
+                break
+        return [(-neg, score) for score, neg in sorted(heap, reverse=True)]
+
+    @staticmethod
+    def _best_of(scored: Iterable[Tuple[int, float]], wanted: int) -> List[Tuple[int, float]]:
+        # Highest score first; nlargest is stable, so ties stay in catalog order
+        return heapq.nlargest(wanted, scored, key=itemgetter(1))
@@ -0,0 +1,46 @@
+"""Production entry point: N uvicorn worker processes, tuned from settings.
+
+    python -m app.server [--workers N] [--port 8000]
+
+The schema is created and migrated (init_db) once, before the workers
+fork; --skip-init-db leaves that to a separate deploy step. Each worker then
+runs the app lifespan before accepting connections, which loads the catalog
+and exercises the report template (see main.warm_up); GET /ready turns 200
+once that is done.
+"""
+import argparse
+import uvicorn
+from .config import settings
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the questionnaire API")
+    parser.add_argument("--host", default=settings.HOST)
+    parser.add_argument("--port", type=int, default=settings.PORT)
+    parser.add_argument("--workers", type=int, default=settings.WEB_CONCURRENCY)
+    parser.add_argument("--log-level", default=settings.LOG_LEVEL)
+    parser.add_argument("--skip-init-db", action="store_true", help="do not create or migrate the schema first")
+    args = parser.parse_args(argv)
+
+    if not args.skip_init_db:
+        # Workers read tables an older database may lack (e.g. catalog_state)
+        from .init_db import init_db
+        init_db()
+
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=max(args.workers, 1),
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEPALIVE,
+        limit_concurrency=settings.SERVER_LIMIT_CONCURRENCY or None,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT,
+        proxy_headers=True,
+        forwarded_allow_ips=settings.FORWARDED_ALLOW_IPS,
+        log_level=args.log_level,
+        # Startup failures (e.g. an unsupported database) must stop the worker
+        lifespan="on",
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Answer validation against a catalog snapshot.
+
+Each answer_type maps to an AnswerRule: the accepted answers (normalized
+input -> canonical text) and which of them need explanatory notes. A
+CatalogValidator is compiled once per catalog version (see catalog.Catalog),
+so checking an answer is a couple of dict lookups with no database access.
+Every problem in a payload is collected, not just the first.
+"""
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, NamedTuple, Optional
+from . import schemas
+
+class AnswerRule(NamedTuple):
+    accepted: Mapping[str, str]
+    notes_required: FrozenSet[str] = frozenset()
+
+    def describe(self) -> str:
+        return ", ".join(dict.fromkeys(self.accepted.values()))
+
+YES_NO_NA = {"yes": "yes", "no": "no", "n/a": "n/a", "na": "n/a"}
+
+RULES: Dict[str, AnswerRule] = {
+    "yes_no_na": AnswerRule(MappingProxyType(YES_NO_NA)),
+    # A partial answer is scored like an unanswered one, so it must say what is missing
+    "yes_no_partial_with_text": AnswerRule(
+        MappingProxyType({**YES_NO_NA, "partial": "partial"}), frozenset({"partial"})
+    ),
+}
+# Questions with a missing or unknown answer_type
+DEFAULT_RULE = RULES["yes_no_na"]
+
+def rule_for(answer_type: Optional[str]) -> AnswerRule:
+    return RULES.get((answer_type or "").strip().lower(), DEFAULT_RULE)
+
+def answer_error(index: int, question_id: str, code: str, message: str) -> Dict[str, Any]:
+    return {"index": index, "question_id": question_id, "code": code, "message": message}
+
+class InvalidAnswers(ValueError):
+    """All the problems found in one list of answers."""
+
+    def __init__(self, errors: List[Dict[str, Any]]):
+        self.errors = errors
+        super().__init__("; ".join(e["message"] for e in errors))
+
+    def detail(self) -> Dict[str, Any]:
+        # HTTPException detail for a 400
+        count = len(self.errors)
+        return {"message": f"{count} invalid answer{'s' if count != 1 else ''}", "errors": self.errors}
+
+class CatalogValidator:
+    """question_id -> AnswerRule for one catalog version."""
+
+    __slots__ = ("rules",)
+
+    def __init__(self, questions: Iterable[Any]):
+        self.rules = MappingProxyType({q.question_id: rule_for(q.answer_type) for q in questions})
+
+    def validate(self, answers: Iterable[Any], allow_clear: bool = False, allow_duplicates: bool = False) -> List[schemas.Answer]:
+        """Normalized answers, in order; raises InvalidAnswers listing every problem.
+
+        Answers are trimmed and case-folded onto the rule's canonical text
+        and blank notes become None. With `allow_clear`, answer None is kept
+        (a draft delta clearing the question); with `allow_duplicates`, a
+        repeated question_id is not an error.
+        """
+        rules = self.rules
+        normalized = []
+        errors = []
+        seen = {}
+        for index, ans in enumerate(answers):
+            qid = ans.question_id
+            rule = rules.get(qid)
+            if rule is None:
+                errors.append(answer_error(index, qid, "unknown_question", f"Invalid question_id: {qid}"))
+                continue
+            if not allow_duplicates:
+                first = seen.setdefault(qid, index)
+                if first != index:
+                    errors.append(answer_error(
+                        index, qid, "duplicate", f"Duplicate answer for {qid} (first at index {first})"
+                    ))
+                    continue
+            notes = (ans.notes.strip() or None) if ans.notes else None
+            if ans.answer is None:
+                if not allow_clear:
+                    errors.append(answer_error(index, qid, "invalid_answer", f"Missing answer for {qid}"))
+                    continue
+                normalized.append(schemas.Answer(qid, None, notes))
+                continue
+            answer = rule.accepted.get(ans.answer.strip().lower())
+            if answer is None:
+                errors.append(answer_error(
+                    index, qid, "invalid_answer",
+                    f"Invalid answer for {qid}: {ans.answer}. Must be one of {rule.describe()}"
+                ))
+                continue
+            if notes is None and answer in rule.notes_required:
+                errors.append(answer_error(index, qid, "notes_required", f"Answer '{answer}' for {qid} requires notes"))
+                continue
+            normalized.append(schemas.Answer(qid, answer, notes))
+        if errors:
+            raise InvalidAnswers(errors)
+        return normalized
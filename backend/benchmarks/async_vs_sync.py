@@ -0,0 +1,79 @@
+"""Throughput of the async endpoints vs. the same handlers as sync `def` routes.
+
+Sync routes hold an AnyIO threadpool worker (40 by default) for the whole
+request; the async routes only leave the event loop for the scoring step.
+
+    cd backend
+    python -m benchmarks.async_vs_sync --requests 2000 --concurrency 200
+"""
+import argparse
+import asyncio
+
+from benchmarks import common
+
+from fastapi import Depends, FastAPI, HTTPException
+from sqlalchemy.orm import Session
+
+from app import catalog, crud, db, import_csv, jobs, schemas
+from app.config import settings
+from app.init_db import init_db
+from app.main import app as async_app, score_submission, stage_submission, validated_submission
+
+sync_app = FastAPI()
+
+@sync_app.get("/standards/summary/{submission_id}")
+def sync_get_summary(submission_id: str, session: Session = Depends(db.get_db)):
+    submission = crud.get_submission(session, submission_id)
+    if not submission:
+        raise HTTPException(status_code=404, detail="Submission not found")
+    return submission.summary
+
+@sync_app.post("/submit", response_model=schemas.SubmissionAccepted, status_code=202)
+def sync_submit(submission: schemas.SubmissionIn, session: Session = Depends(db.get_db)):
+    # The same validation, scoring and writes as the async endpoint
+    questions = catalog.get_catalog(session)
+    submission = validated_submission(submission, questions)
+    encoded, summary = score_submission(submission, questions)
+    db_submission, queued = stage_submission(session, submission, summary, questions, encoded)
+    session.commit()
+    accepted = schemas.SubmissionAccepted.model_validate(db_submission)
+    accepted.jobs = [job.id for job in queued]
+    return accepted
+
+def seed(csv_path: str):
+    init_db()
+    session = db.SessionLocal()
+    try:
+        before = catalog.get_catalog(session)
+        import_csv.import_questions_from_csv(session, csv_path=csv_path)
+        jobs.queue_rescore(session, before)
+        questions = catalog.get_catalog(session)
+        payload = schemas.SubmissionIn(
+            client_id="bench",
+            answers=[{"question_id": q.question_id, "answer": "yes"} for q in questions]
+        )
+        encoded, summary = score_submission(payload, questions)
+        submission = crud.create_submission(session, payload, summary, questions, encoded)
+        return submission.submission_id, payload.model_dump()
+    finally:
+        session.close()
+
+async def main(args):
+    submission_id, payload = seed(args.csv)
+    results = {}
+    for name, app in (("sync", sync_app), ("async", async_app)):
+        results[f"{name} GET /standards/summary"] = await common.drive(
+            app, lambda i: ("GET", f"/standards/summary/{submission_id}", {}), args.requests, args.concurrency
+        )
+        results[f"{name} POST /submit"] = await common.drive(
+            app, lambda i: ("POST", "/submit", {"json": payload}), args.requests // 4, args.concurrency
+        )
+    common.write_results("async_vs_sync", vars(args), results, args.out)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--csv", default=settings.CSV_PATH)
+    parser.add_argument("--out", help="write the results JSON here")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,130 @@
+"""Shared benchmark plumbing: scratch database, timing, ASGI driver, JSON output.
+
+Import this module before anything from `app`, so the settings pick up the
+scratch DATABASE_URL instead of the configured database.
+"""
+import asyncio
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Benchmark against a scratch database, never the configured one
+SCRATCH_DIR = tempfile.mkdtemp(prefix="bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(SCRATCH_DIR, 'bench.db')}"
+# Submissions queue post-processing jobs; keep worker threads out of the timings
+os.environ.setdefault("JOB_WORKERS", "0")
+
+import httpx
+
+PERCENTILES = (50, 90, 95, 99)
+
+# (method, url, httpx request kwargs)
+Request = Tuple[str, str, Dict[str, Any]]
+
+def percentile(ordered: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+def latency_stats(latencies: List[float]) -> Dict[str, float]:
+    """Milliseconds: mean, the PERCENTILES and max."""
+    ordered = sorted(latencies)
+    stats = {"mean_ms": round(statistics.fmean(ordered) * 1000, 3)}
+    for pct in PERCENTILES:
+        stats[f"p{pct}_ms"] = round(percentile(ordered, pct) * 1000, 3)
+    stats["max_ms"] = round(ordered[-1] * 1000, 3)
+    return stats
+
+def measure(func: Callable[[], Any], repeat: int = 5, number: int = 10, setup: Optional[Callable[[], Any]] = None) -> Dict[str, Any]:
+    """Time `number` calls of func, `repeat` times; per-call figures in ms.
+
+    `setup` runs untimed before every call (e.g. emptying a table).
+    """
+    func()  # Warm caches and lazy imports
+    per_call = []
+    for _ in range(repeat):
+        elapsed = 0.0
+        for _ in range(number):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            func()
+            elapsed += time.perf_counter() - start
+        per_call.append(elapsed / number)
+    return {
+        "repeat": repeat,
+        "number": number,
+        "best_ms": round(min(per_call) * 1000, 3),
+        "median_ms": round(statistics.median(per_call) * 1000, 3),
+        "stdev_ms": round(statistics.stdev(per_call) * 1000, 3) if repeat > 1 else 0.0,
+    }
+
+async def drive(app, make_request: Callable[[int], Request], total: int, concurrency: int) -> Dict[str, Any]:
+    """Send `total` requests through the ASGI app, at most `concurrency` in flight.
+
+    make_request(i) returns the i-th request, so runs can vary URLs and bodies.
+    """
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(i: int):
+            nonlocal errors
+            method, url, kwargs = make_request(i)
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await client.request(method, url, **kwargs)
+                    response.raise_for_status()
+                    await response.aread()
+                except Exception:
+                    # e.g. SQLite "database is locked" under concurrent writes
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": round(total / elapsed, 1),
+        **latency_stats(latencies),
+    }
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def environment() -> Dict[str, Any]:
+    return {
+        "git_revision": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+def write_results(name: str, params: Dict[str, Any], results: Dict[str, Any], out: Optional[str] = None):
+    """Print the results and, with `out`, save them for benchmarks.compare."""
+    document = {"benchmark": name, "environment": environment(), "params": params, "results": results}
+    text = json.dumps(document, indent=2)
+    print(text)
+    if out:
+        with open(out, "w") as f:
+            f.write(text + "\n")
@@ -0,0 +1,62 @@
+"""Compare two saved benchmark results and flag regressions.
+
+    cd backend
+    python -m benchmarks.micro --out before.json
+    git checkout my-branch
+    python -m benchmarks.micro --out after.json
+    python -m benchmarks.compare before.json after.json --threshold 10
+
+Changes are printed as % worse (negative: better). Exits with status 1
+when any metric got worse by more than the threshold.
+"""
+import argparse
+import json
+import sys
+from typing import Dict, List, Tuple
+
+# Metrics where higher is better; every other *_ms figure is a latency
+HIGHER_IS_BETTER = {"throughput_rps"}
+# The figures compared per entry; the others are too noisy to gate on
+COMPARED = ("best_ms", "median_ms", "p50_ms", "p99_ms", "throughput_rps")
+
+def changes(before: Dict, after: Dict) -> List[Tuple[str, str, float, float, float]]:
+    """(entry, metric, before, after, % worse) for the metrics both runs have."""
+    rows = []
+    for name, old in before["results"].items():
+        new = after["results"].get(name)
+        if new is None:
+            continue
+        for metric in COMPARED:
+            if metric not in old or metric not in new or not old[metric]:
+                continue
+            change = (new[metric] - old[metric]) / old[metric] * 100
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            rows.append((name, metric, old[metric], new[metric], worse))
+    return rows
+
+def main(args) -> int:
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    if before.get("params") != after.get("params"):
+        print("warning: the runs used different parameters", file=sys.stderr)
+
+    regressed = False
+    width = max((len(name) for name in after["results"]), default=0)
+    for name, metric, old, new, worse in changes(before, after):
+        flag = ""
+        if worse > args.threshold:
+            flag = "  REGRESSION"
+            regressed = True
+        elif worse < -args.threshold:
+            flag = "  improved"
+        print(f"{name:<{width}}  {metric:<15} {old:>12} -> {new:<12} {worse:+7.1f}%{flag}")
+    return 1 if regressed else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent change to flag")
+    sys.exit(main(parser.parse_args()))
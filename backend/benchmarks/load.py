@@ -0,0 +1,82 @@
+"""In-process load test of POST /submit, GET /questions and GET /report.
+
+Requests go through httpx's ASGI transport to the real app, against a
+scratch SQLite database holding a synthetic catalog:
+
+    cd backend
+    python -m benchmarks.load --requests 2000 --concurrency 50 --out load.json
+"""
+import argparse
+import asyncio
+import os
+
+from benchmarks import common, synthetic
+
+from sqlalchemy import select
+
+from app import catalog, jobs, models, reports, responses
+from app.db import SessionLocal
+from app.import_csv import import_questions_from_csv
+from app.init_db import init_db
+from app.main import app
+
+def seed(args):
+    init_db()
+    csv_path = synthetic.write_catalog(
+        os.path.join(common.SCRATCH_DIR, "catalog.csv"), args.questions, args.standards, seed=args.seed
+    )
+    with SessionLocal() as db:
+        before = catalog.get_catalog(db)
+        import_questions_from_csv(db, csv_path=csv_path)
+        jobs.queue_rescore(db, before)
+        questions = catalog.get_catalog(db)
+        return [q.question_id for q in questions], sorted({q.iam_domain for q in questions})
+
+def submission_ids():
+    with SessionLocal() as db:
+        return db.scalars(select(models.Submission.submission_id).order_by(models.Submission.created_at)).all()
+
+async def main(args):
+    question_ids, domains = seed(args)
+    payloads = synthetic.submissions(question_ids, args.submissions, answered=args.answered, seed=args.seed)
+    # The query shapes a client mixes: full catalog, pages, filters, field projection
+    question_urls = [
+        "/questions",
+        "/questions?limit=100",
+        "/questions?fields=question_id,question_text",
+        *(f"/questions?iam_domain={domain}" for domain in domains),
+    ]
+    gzip = {"headers": {"Accept-Encoding": "gzip"}}
+
+    results = {}
+    results["POST /submit"] = await common.drive(
+        app, lambda i: ("POST", "/submit", {"json": payloads[i]}), args.submissions, args.concurrency
+    )
+
+    responses.catalog_responses.clear()
+    results["GET /questions"] = await common.drive(
+        app, lambda i: ("GET", question_urls[i % len(question_urls)], gzip), args.requests, args.concurrency
+    )
+
+    ids = submission_ids()
+    # Each report once with an empty cache (rendered), then repeatedly (cached)
+    reports.report_cache.clear()
+    results["GET /report (render)"] = await common.drive(
+        app, lambda i: ("GET", f"/report/{ids[i]}", {}), len(ids), args.concurrency
+    )
+    results["GET /report (cached)"] = await common.drive(
+        app, lambda i: ("GET", f"/report/{ids[i % len(ids)]}", {}), args.requests, args.concurrency
+    )
+    common.write_results("load", vars(args), results, args.out)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000, help="GET requests per read endpoint")
+    parser.add_argument("--submissions", type=int, default=500, help="POST /submit requests (and reports rendered)")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--questions", type=int, default=800)
+    parser.add_argument("--standards", type=int, default=len(models.STANDARD_COLS))
+    parser.add_argument("--answered", type=float, default=0.9)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the results JSON here")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,111 @@
+"""Microbenchmarks for compute_summary, generate_html_report, CSV import and catalog search.
+
+Runs on a synthetic catalog (see benchmarks.synthetic) in a scratch database:
+
+    cd backend
+    python -m benchmarks.micro --questions 800 --standards 7 --out micro.json
+"""
+import argparse
+import os
+import random
+from datetime import datetime, timezone
+
+from benchmarks import common, synthetic
+
+from sqlalchemy import delete
+
+from app import catalog, models, reports, schemas, search
+from app.db import SessionLocal
+from app.import_csv import import_questions_from_csv
+from app.init_db import init_db
+
+def bench_scoring(questions: catalog.Catalog, answers, args):
+    answer_models = [schemas.AnswerIn(**a) for a in answers]
+    # A plain list takes the reference path, without the catalog's scoring engine
+    rows = list(questions)
+    return {
+        "compute_summary": common.measure(
+            lambda: reports.compute_summary(answer_models, questions), args.repeat, args.number * 10
+        ),
+        "compute_summary_reference": common.measure(
+            lambda: reports.compute_summary(answer_models, rows), args.repeat, args.number
+        ),
+    }
+
+def bench_report(questions: catalog.Catalog, answers, args):
+    answer_models = [schemas.AnswerIn(**a) for a in answers]
+    summary = reports.compute_summary(answer_models, questions)
+    submission = models.Submission(
+        submission_id=models.generate_uuid(), client_id="bench", created_at=datetime.now(timezone.utc)
+    )
+    # Answers as rendered for a stored submission: decoded from the packed form
+    encoded = questions.scoring.encode_answers(answer_models)
+    decoded = questions.scoring.decode_answers(encoded)
+    html = reports.generate_html_report(submission, summary, questions, decoded)
+    return {
+        "generate_html_report": {
+            **common.measure(lambda: reports.generate_html_report(submission, summary, questions, decoded), args.repeat, args.number),
+            "html_chars": len(html),
+        },
+    }
+
+# Query shapes of the assessors' UI: a broad term, a rare one, a control ID, and facet-only browsing
+SEARCH_QUERIES = {
+    "search_broad": ("control question", {}),
+    "search_broad_filtered": ("safeguard reviewed", {"iam_domain": "Privileged Access", "question_type": "follow_up"}),
+    "search_rare": ("question 7", {}),
+    "search_control": ("ac-2", {"standard": "nist_800_53_rev5"}),
+    "search_facets_only": ("", {"standard": "nist_800_53_rev5", "control_id": "AC-2"}),
+}
+
+def bench_search(questions: catalog.Catalog, args):
+    build = common.measure(lambda: search.SearchIndex(questions.questions, questions.scoring), 1, 1)
+    index = questions.search_index
+    results = {"search_index_build": build}
+    for name, (query, filters) in SEARCH_QUERIES.items():
+        results[name] = {
+            **common.measure(lambda: index.search(query, filters), args.repeat, args.number * 10),
+            "total": index.search(query, filters).total,
+        }
+    return results
+
+def bench_import(db, csv_path: str, args):
+    def empty():
+        db.execute(delete(models.QuestionControl))
+        db.execute(delete(models.Question))
+        db.commit()
+        catalog.invalidate()
+
+    fresh = common.measure(lambda: import_questions_from_csv(db, csv_path=csv_path), args.repeat, 1, setup=empty)
+    # Unchanged rows are compared and skipped, not rewritten
+    unchanged = common.measure(lambda: import_questions_from_csv(db, csv_path=csv_path), args.repeat, 1)
+    return {"import_csv_fresh": fresh, "import_csv_unchanged": unchanged}
+
+def main(args):
+    init_db()
+    csv_path = synthetic.write_catalog(
+        os.path.join(common.SCRATCH_DIR, "catalog.csv"), args.questions, args.standards, args.coverage, args.seed
+    )
+    results = {}
+    with SessionLocal() as db:
+        results.update(bench_import(db, csv_path, args))
+        questions = catalog.get_catalog(db)
+        answers = synthetic.answer_set(
+            [q.question_id for q in questions], args.answered, rng=random.Random(args.seed)
+        )
+        results.update(bench_scoring(questions, answers, args))
+        results.update(bench_report(questions, answers, args))
+        results.update(bench_search(questions, args))
+    common.write_results("micro", vars(args), results, args.out)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=800)
+    parser.add_argument("--standards", type=int, default=len(models.STANDARD_COLS))
+    parser.add_argument("--coverage", type=float, default=0.8, help="odds a question maps to each standard")
+    parser.add_argument("--answered", type=float, default=0.9, help="share of questions answered")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=10, help="calls per repeat")
+    parser.add_argument("--out", help="write the results JSON here")
+    main(parser.parse_args())
@@ -0,0 +1,101 @@
+"""Synthetic catalogs and answer sets shaped like question.csv.
+
+Everything is seeded, so the same arguments produce the same data across
+commits and the timings stay comparable.
+"""
+import csv
+import random
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.import_csv import QUESTION_COLUMNS
+from app.models import STANDARD_COLS
+
+# question.csv column order (its trailing `notes` column stays empty)
+CSV_COLUMNS = [
+    "iam_domain", "question_id", "section_id", "question_text", "answer_type",
+    "question_type", *STANDARD_COLS, "notes",
+]
+assert set(CSV_COLUMNS) == set(QUESTION_COLUMNS)
+
+DOMAINS = [
+    "User Authentication", "Access Management", "Privileged Access",
+    "Identity Lifecycle", "Logging & Monitoring", "Data Protection",
+]
+# Control identifiers in each standard's own notation
+CONTROL_FORMATS = {
+    "iso_27001_2022": lambda n: f"A.{5 + n % 4}.{1 + n % 37}",
+    "nist_800_53_rev5": lambda n: f"{['AC', 'IA', 'AU', 'SC', 'CM'][n % 5]}-{1 + n % 24}",
+    "soc_2_tsc": lambda n: f"CC{1 + n % 9}.{1 + n % 8}",
+    "gdpr": lambda n: f"Art.{5 + n % 45}",
+    "pci_dss_4_0": lambda n: f"{1 + n % 12}.{1 + n % 6}.{1 + n % 5}",
+    "hipaa": lambda n: f"164.{308 + n % 5}(a)({1 + n % 8})",
+    "cis_controls": lambda n: f"{1 + n % 18}.{1 + n % 14}",
+}
+ANSWERS = ("yes", "no", "n/a")
+
+def question_id(n: int) -> str:
+    return f"Q_{n:04d}"
+
+def catalog_rows(questions: int, standards: int = len(STANDARD_COLS), coverage: float = 0.8, seed: int = 0) -> List[Dict[str, str]]:
+    """`questions` rows mapping into the first `standards` standard columns.
+
+    Each question maps to a given standard with probability `coverage`,
+    with one to three controls; half the questions are core, half follow-ups.
+    """
+    if not 1 <= standards <= len(STANDARD_COLS):
+        raise ValueError(f"standards must be between 1 and {len(STANDARD_COLS)}")
+    rng = random.Random(seed)
+    rows = []
+    for n in range(1, questions + 1):
+        domain = DOMAINS[n % len(DOMAINS)]
+        row = {
+            "iam_domain": domain,
+            "question_id": question_id(n),
+            "section_id": domain.split()[0][:3].upper(),
+            "question_text": f"Synthetic control question {n}: is the {domain.lower()} safeguard in place and reviewed?",
+            "answer_type": "yes_no_partial_with_text",
+            "question_type": "core" if n % 2 else "follow_up",
+            "notes": "",
+        }
+        for i, std in enumerate(STANDARD_COLS):
+            if i < standards and rng.random() < coverage:
+                fmt = CONTROL_FORMATS[std]
+                row[std] = "|".join(fmt(rng.randrange(1000)) for _ in range(rng.randint(1, 3)))
+            else:
+                row[std] = ""
+        rows.append(row)
+    return rows
+
+def write_catalog(path: str, questions: int, standards: int = len(STANDARD_COLS), coverage: float = 0.8, seed: int = 0) -> str:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS)
+        writer.writeheader()
+        writer.writerows(catalog_rows(questions, standards, coverage, seed))
+    return path
+
+def answer_set(
+    question_ids: Sequence[str], answered: float = 1.0, weights: Sequence[float] = (0.7, 0.2, 0.1),
+    rng: Optional[random.Random] = None,
+) -> List[Dict[str, Any]]:
+    """Answers (API dicts) to a random `answered` share of the questions.
+
+    `weights` are the yes/no/n-a odds; every n/a carries a note.
+    """
+    rng = rng or random.Random(0)
+    answers = []
+    for qid in question_ids:
+        if rng.random() >= answered:
+            continue
+        answer = rng.choices(ANSWERS, weights)[0]
+        answers.append({"question_id": qid, "answer": answer, "notes": "Not in scope" if answer == "n/a" else None})
+    return answers
+
+def submissions(
+    question_ids: Sequence[str], count: int, clients: int = 10, answered: float = 1.0, seed: int = 0
+) -> List[Dict[str, Any]]:
+    """`count` /submit payloads spread over `clients` client ids."""
+    rng = random.Random(seed)
+    return [
+        {"client_id": f"client-{i % clients:03d}", "answers": answer_set(question_ids, answered, rng=rng)}
+        for i in range(count)
+    ]
@@ -1,31 +1,44 @@
 import pytest
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool
 from fastapi.testclient import TestClient
 import os
 import sys
+import tempfile
 
 # Add app to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.db import Base, get_db
+from app.db import Base, get_db, get_async_db, get_session_factory
 from app.main import app
 from app.config import settings
+from app import catalog, metrics, models, responses
 
-# Use in-memory SQLite for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# Temporary SQLite file, shared by the sync session and the async endpoints
+# (an in-memory database is private to a single connection)
+TEST_DB_PATH = os.path.join(tempfile.mkdtemp(), "test.db")
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{TEST_DB_PATH}"
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, 
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool
+    connect_args={"check_same_thread": False}
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# TestClient runs each request on a fresh event loop; don't pool connections across them
+async_engine = create_async_engine(f"sqlite+aiosqlite:///{TEST_DB_PATH}", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+# Counted into request metrics like the app's own engines
+metrics.instrument(engine)
+metrics.instrument(async_engine.sync_engine)
+
 @pytest.fixture(scope="function")
 def db():
     Base.metadata.create_all(bind=engine)
+    catalog.invalidate()
+    responses.catalog_responses.clear()
     db = TestingSessionLocal()
     try:
         yield db
@@ -33,6 +46,27 @@ def db():
         db.close()
         Base.metadata.drop_all(bind=engine)
 
+# Two questions inserted directly, without an import or a catalog version bump
+@pytest.fixture
+def seed_questions(db):
+    q1 = models.Question(
+        question_id="Q-001",
+        question_text="Do you have MFA?",
+        iso_27001_2022="A.9.4.1",
+        answer_type="yes_no_na",
+        meta={}
+    )
+    q2 = models.Question(
+        question_id="Q-002",
+        question_text="Is data encrypted?",
+        iso_27001_2022="A.10.1.1",
+        answer_type="yes_no_na",
+        meta={}
+    )
+    db.add(q1)
+    db.add(q2)
+    db.commit()
+
 @pytest.fixture(scope="function")
 def client(db):
     def override_get_db():
@@ -41,6 +75,14 @@ def client(db):
         finally:
             pass
     
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as async_db:
+            yield async_db
+    
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_session_factory] = lambda: TestingSessionLocal
     yield TestClient(app)
     del app.dependency_overrides[get_db]
+    del app.dependency_overrides[get_async_db]
+    del app.dependency_overrides[get_session_factory]
@@ -0,0 +1,135 @@
+import pytest
+from app import catalog, models
+from app.import_csv import import_questions_from_csv
+from tests.test_import import CATALOG_CSV_CONTENT
+from tests.test_rollups import submit, upload
+
+MOCK_CSV_CONTENT = """iam_domain,question_id,section_id,question_text,answer_type,question_type,iso_27001_2022,nist_800_53_rev5,soc_2_tsc,gdpr,pci_dss_4_0,hipaa,cis_controls
+User Authentication,Q_001,IDP,Do you use a centralized IdP?,yes_no_partial_with_text,core,A.8.5,IA-2,CC6.1,,8.3.1,,6.4|6.5
+User Authentication,Q_002,IDP,Are accounts created in the IdP?,yes_no_partial_with_text,core,A.8.2|A.8.3,AC-2,,,,,
+"""
+
+@pytest.fixture
+def csv_file(tmp_path):
+    p = tmp_path / "question.csv"
+    p.write_text(MOCK_CSV_CONTENT, encoding="utf-8-sig")
+    return str(p)
+
+def test_catalog_is_cached_per_version(db, csv_file):
+    import_questions_from_csv(db, csv_path=csv_file)
+
+    first = catalog.get_catalog(db)
+    assert first.version == 1
+    assert len(first) == 2
+    assert "Q_001" in first
+    assert first.get("Q_002").question_text == "Are accounts created in the IdP?"
+    assert [q.question_id for q in first.by_standard["nist_800_53_rev5"]] == ["Q_001", "Q_002"]
+    assert [q.question_id for q in first.by_standard["soc_2_tsc"]] == ["Q_001"]
+    assert first.by_standard["gdpr"] == ()
+
+    # Same version -> same object, no reload
+    assert catalog.get_catalog(db) is first
+
+def test_catalog_rebuilt_after_import(db, csv_file, tmp_path):
+    import_questions_from_csv(db, csv_path=csv_file)
+    before = catalog.get_catalog(db)
+
+    # Simulate another process importing: only the DB stamp changes
+    updated = tmp_path / "updated.csv"
+    updated.write_text(MOCK_CSV_CONTENT.replace("AC-2,,,,,", "AC-2,,Art.32,,,"), encoding="utf-8-sig")
+    import_questions_from_csv(db, csv_path=str(updated))
+
+    after = catalog.get_catalog(db)
+    assert after is not before
+    assert after.version == before.version + 1
+    assert [q.question_id for q in after.by_standard["gdpr"]] == ["Q_002"]
+
+def test_catalog_questions_are_frozen(db, csv_file):
+    import_questions_from_csv(db, csv_path=csv_file)
+    q = catalog.get_catalog(db).get("Q_001")
+    with pytest.raises(AttributeError):
+        q.question_text = "changed"
+
+def test_catalog_diff_reports_membership_changes(db, csv_file, tmp_path):
+    import_questions_from_csv(db, csv_path=csv_file)
+    before = catalog.get_catalog(db)
+
+    updated = tmp_path / "updated.csv"
+    # Control-ID edit (ISO stays mapped), plus a new GDPR mapping
+    updated.write_text(
+        MOCK_CSV_CONTENT.replace("A.8.2|A.8.3", "A.8.2").replace("AC-2,,,,,", "AC-2,,Art.32,,,"),
+        encoding="utf-8-sig"
+    )
+    import_questions_from_csv(db, csv_path=str(updated))
+    assert catalog.diff(before, catalog.get_catalog(db)) == (["gdpr"], ["Q_002"])
+
+def test_import_records_revisions_only_for_changed_questions(db, csv_file, tmp_path):
+    import_questions_from_csv(db, csv_path=csv_file)
+    updated = tmp_path / "updated.csv"
+    updated.write_text(MOCK_CSV_CONTENT.replace("Are accounts created", "Are all accounts created"), encoding="utf-8-sig")
+    import_questions_from_csv(db, csv_path=str(updated))
+
+    revisions = db.query(models.QuestionRevision).order_by(models.QuestionRevision.id).all()
+    assert [(r.question_id, r.valid_from, r.valid_to) for r in revisions] == [
+        ("Q_001", 1, None), ("Q_002", 1, 2), ("Q_002", 2, None)
+    ]
+
+def test_earlier_versions_are_snapshots_sharing_unchanged_questions(db, csv_file, tmp_path):
+    import_questions_from_csv(db, csv_path=csv_file)
+    first = catalog.get_catalog(db)
+    updated = tmp_path / "updated.csv"
+    updated.write_text(
+        MOCK_CSV_CONTENT.replace("Are accounts created", "Are all accounts created").replace("AC-2,,,,,", "AC-2,,Art.32,,,")
+        + "Access,Q_003,IDP,Is MFA enforced?,yes_no_na,core,,IA-2,,,,,\n",
+        encoding="utf-8-sig"
+    )
+    import_questions_from_csv(db, csv_path=str(updated))
+    current = catalog.get_catalog(db)
+
+    # Rebuilt from the revision history, with no cached copy to fall back on
+    catalog.invalidate()
+    old = catalog.get_catalog_version(db, first.version)
+    assert old.version == 1
+    assert [q.question_id for q in old] == ["Q_001", "Q_002"]
+    assert old.get("Q_002").question_text == "Are accounts created in the IdP?"
+    assert old.by_standard["gdpr"] == ()
+    assert catalog.get_catalog_version(db, 1) is old
+
+    latest = catalog.get_catalog(db)
+    assert latest.version == current.version == 2
+    assert latest.get("Q_002").question_text == "Are all accounts created in the IdP?"
+    # The unchanged question is one object in both snapshots
+    assert latest.get("Q_001") is old.get("Q_001")
+
+    with pytest.raises(LookupError):
+        catalog.get_catalog_version(db, 3)
+
+def test_catalog_version_cache_is_bounded(db, csv_file, tmp_path, monkeypatch):
+    monkeypatch.setattr(catalog.settings, "CATALOG_CACHE_VERSIONS", 2)
+    import_questions_from_csv(db, csv_path=csv_file)
+    for i in range(3):
+        updated = tmp_path / f"v{i}.csv"
+        updated.write_text(MOCK_CSV_CONTENT.replace("IdP?", f"IdP ({i})?"), encoding="utf-8-sig")
+        import_questions_from_csv(db, csv_path=str(updated))
+        catalog.get_catalog(db)
+    assert catalog.cached_version(4) is not None
+    assert catalog.cached_version(1) is None
+    assert catalog.get_catalog_version(db, 1).get("Q_001").question_text == "Do you use a centralized IdP?"
+
+def test_reports_resolve_against_the_submission_catalog_version(client, db):
+    upload(client, CATALOG_CSV_CONTENT)
+    submission = submit(client, "acme", ("Q_001", "yes"))
+    # Text-only edit: no re-score, so the submission stays on version 1
+    assert upload(client, CATALOG_CSV_CONTENT.replace("centralized IdP", "single IdP"))["rescore_job"] is None
+    catalog.invalidate()
+
+    report = client.get(f"/report/{submission['submission_id']}").text
+    assert "Do you use a centralized IdP?" in report
+    assert "single IdP" not in report
+
+    old = client.get("/catalog/versions/1/questions")
+    assert old.status_code == 200
+    assert old.json()[0]["question_text"] == "Do you use a centralized IdP?"
+    assert client.get("/catalog/versions/1/questions", headers={"If-None-Match": old.headers["ETag"]}).status_code == 304
+    assert client.get("/catalog/versions/2/questions").json()[0]["question_text"] == "Do you use a single IdP?"
+    assert client.get("/catalog/versions/3/questions").status_code == 404
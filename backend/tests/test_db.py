@@ -0,0 +1,53 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app import config, models
+from app.db import SUPPORTED_DIALECTS, apply_sqlite_pragmas, async_database_url, check_database, engine_options, upsert_insert
+
+def test_async_database_url():
+    assert async_database_url("sqlite:///./db/questions.db") == "sqlite+aiosqlite:///./db/questions.db"
+    assert async_database_url("postgresql://u:p@db/vanta") == "postgresql+asyncpg://u:p@db/vanta"
+    assert async_database_url("postgres://u:p@db/vanta") == "postgresql+asyncpg://u:p@db/vanta"
+    # An explicit driver is left alone
+    assert async_database_url("postgresql+psycopg://u:p@db/vanta") == "postgresql+psycopg://u:p@db/vanta"
+
+def test_engine_options_per_backend():
+    assert engine_options("sqlite:///:memory:") == {"connect_args": {"check_same_thread": False}}
+
+    file_options = engine_options("sqlite:///./db/questions.db")
+    assert file_options["connect_args"] == {"check_same_thread": False}
+    assert "pool_size" in file_options
+
+    async_options = engine_options("sqlite+aiosqlite:///./db/questions.db")
+    assert "connect_args" not in async_options
+    assert async_options["poolclass"] is AsyncAdaptedQueuePool
+
+    pg_options = engine_options("postgresql://u:p@db/vanta")
+    assert "connect_args" not in pg_options
+    assert pg_options["pool_pre_ping"] is True
+
+def test_sqlite_pragmas_and_json_check(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'tuned.db'}", **engine_options(f"sqlite:///{tmp_path / 'tuned.db'}"))
+    apply_sqlite_pragmas(engine)
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1 # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+    check_database(engine)
+    engine.dispose()
+
+def test_check_database_rejects_other_backends():
+    engine = create_engine("sqlite://")
+    engine.dialect.name = "mysql"
+    with pytest.raises(RuntimeError, match="Unsupported database backend: mysql"):
+        check_database(engine)
+    # Every backend that passes the check can run the submit path's upserts
+    for dialect in SUPPORTED_DIALECTS:
+        assert hasattr(upsert_insert(dialect)(models.ComplianceRollup), "on_conflict_do_update")
+
+def test_relative_paths_resolve_from_package_dir():
+    assert config.resolve_sqlite_url("sqlite:///db/questions.db") == f"sqlite:///{config.BASE_DIR / 'db' / 'questions.db'}"
+    assert config.resolve_sqlite_url("sqlite:////var/lib/q.db") == "sqlite:////var/lib/q.db"
+    assert config.resolve_sqlite_url("sqlite:///:memory:") == "sqlite:///:memory:"
+    assert config.resolve_sqlite_url("postgresql://u@h/db") == "postgresql://u@h/db"
+    assert config.resolve_path("/mnt/data/questions.csv") == "/mnt/data/questions.csv"
@@ -0,0 +1,67 @@
+from app import crud, models
+
+def statuses(summary):
+    return {std: (entry["status"], entry["counts"]) for std, entry in summary.items()}
+
+def test_draft_deltas_and_finalize(client, db, seed_questions):
+    response = client.post("/drafts", json={
+        "client_id": "acme", "answers": [{"question_id": "Q-001", "answer": "yes"}]
+    })
+    assert response.status_code == 201
+    draft = response.json()
+    draft_id = draft["draft_id"]
+    assert draft["answered"] == 1
+    assert draft["summary"]["iso_27001_2022"]["counts"]["yes"] == 1
+
+    draft = client.patch(f"/drafts/{draft_id}", json={"answers": [
+        {"question_id": "Q-002", "answer": "n/a", "notes": "Not stored"},
+        {"question_id": "Q-001", "answer": "no"},
+    ]}).json()
+    assert draft["answered"] == 2
+    assert draft["revision"] == 2
+    iso = draft["summary"]["iso_27001_2022"]
+    assert (iso["status"], iso["counts"]["no"], iso["counts"]["na"]) == ("non_compliant", 1, 1)
+
+    # Clearing an answer
+    draft = client.patch(f"/drafts/{draft_id}", json={"answers": [{"question_id": "Q-001"}]}).json()
+    assert draft["answered"] == 1
+    assert draft["summary"]["iso_27001_2022"]["status"] == "unknown"
+    assert client.get(f"/drafts/{draft_id}/answers").json() == [
+        {"question_id": "Q-002", "answer": "n/a", "notes": "Not stored"}
+    ]
+
+    client.patch(f"/drafts/{draft_id}", json={"answers": [{"question_id": "Q-001", "answer": "yes"}]})
+    provisional = client.get(f"/drafts/{draft_id}").json()["summary"]
+    response = client.post(f"/drafts/{draft_id}/finalize")
+    assert response.status_code == 202
+    data = response.json()
+    # Incremental counters agree with the full re-score done at finalize
+    assert statuses(data["summary"]) == statuses(provisional)
+    assert data["summary"]["iso_27001_2022"]["na_notes"] == ["Q-002: Not stored"]
+
+    draft = client.get(f"/drafts/{draft_id}").json()
+    assert (draft["status"], draft["submission_id"]) == ("finalized", data["submission_id"])
+    assert db.query(models.DraftAnswer).count() == 0
+    assert client.patch(f"/drafts/{draft_id}", json={"answers": []}).status_code == 409
+
+def test_draft_rejects_invalid_and_concurrent_updates(client, db, seed_questions, monkeypatch):
+    draft_id = client.post("/drafts", json={"client_id": "acme"}).json()["draft_id"]
+    response = client.patch(f"/drafts/{draft_id}", json={"answers": [{"question_id": "Q-404", "answer": "yes"}]})
+    assert response.status_code == 400
+    response = client.patch(f"/drafts/{draft_id}", json={"answers": [{"question_id": "Q-001", "answer": "maybe"}]})
+    assert response.status_code == 400
+    assert client.patch("/drafts/missing", json={"answers": []}).status_code == 404
+
+    # Another writer got in between this request's read and its write
+    original = crud.get_draft_async
+
+    async def stale_read(session, did):
+        draft = await original(session, did)
+        db.query(models.Draft).filter_by(draft_id=did).update({"revision": models.Draft.revision + 1})
+        db.commit()
+        return draft
+
+    monkeypatch.setattr(crud, "get_draft_async", stale_read)
+    response = client.patch(f"/drafts/{draft_id}", json={"answers": [{"question_id": "Q-001", "answer": "yes"}]})
+    assert response.status_code == 409
+    assert db.query(models.DraftAnswer).count() == 0
@@ -1,26 +1,4 @@
-import pytest
-from app import models
-
-# Reuse mock CSV fixture logic or just insert data directly
-@pytest.fixture
-def seed_questions(db):
-    q1 = models.Question(
-        question_id="Q-001",
-        question_text="Do you have MFA?",
-        iso_27001_2022="A.9.4.1",
-        answer_type="yes_no_na",
-        meta={}
-    )
-    q2 = models.Question(
-        question_id="Q-002",
-        question_text="Is data encrypted?",
-        iso_27001_2022="A.10.1.1",
-        answer_type="yes_no_na",
-        meta={}
-    )
-    db.add(q1)
-    db.add(q2)
-    db.commit()
+from app import models, reports
 
 def test_get_questions(client, seed_questions):
     response = client.get("/questions")
@@ -29,6 +7,38 @@ def test_get_questions(client, seed_questions):
     assert len(data) == 2
     assert data[0]["question_id"] == "Q-001"
 
+def test_get_questions_keyset_pages(client, seed_questions):
+    first = client.get("/questions", params={"limit": 1})
+    assert [q["question_id"] for q in first.json()] == ["Q-001"]
+    cursor = first.headers["X-Next-Cursor"]
+
+    second = client.get("/questions", params={"limit": 1, "after_id": cursor})
+    assert [q["question_id"] for q in second.json()] == ["Q-002"]
+
+    last = client.get("/questions", params={"limit": 1, "after_id": second.headers["X-Next-Cursor"]})
+    assert last.json() == []
+    assert "X-Next-Cursor" not in last.headers
+
+def test_get_questions_fields(client, seed_questions):
+    response = client.get("/questions", params={"fields": "question_id,answer_type"})
+    assert response.status_code == 200
+    assert response.json()[0] == {"id": 1, "question_id": "Q-001", "answer_type": "yes_no_na"}
+
+    response = client.get("/questions", params={"fields": "question_id,secret"})
+    assert response.status_code == 400
+
+def test_get_questions_etag(client, seed_questions):
+    response = client.get("/questions", params={"limit": 10})
+    etag = response.headers["ETag"]
+
+    cached = client.get("/questions", params={"limit": 10}, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+
+    # A different query is a different representation
+    other = client.get("/questions", params={"limit": 1}, headers={"If-None-Match": etag})
+    assert other.status_code == 200
+    assert other.headers["ETag"] != etag
+
 def test_submit_answers(client, seed_questions):
     payload = {
         "client_id": "test-client",
@@ -38,16 +48,18 @@ def test_submit_answers(client, seed_questions):
         ]
     }
     response = client.post("/submit", json=payload)
-    assert response.status_code == 200
+    assert response.status_code == 202
     data = response.json()
     
     assert "submission_id" in data
+    assert len(data["jobs"]) == 1
     assert data["summary"]["iso_27001_2022"]["status"] == "partial"
     
     # Here: total=2, yes=1, na=1. yes == 2-1 (1). So "partial".
     
     assert data["summary"]["iso_27001_2022"]["status"] == "partial"
-    assert data["report_html"] is not None
+    # Reports are rendered on demand rather than returned by /submit
+    assert data["report_url"] == f"/report/{data['submission_id']}"
 
 def test_submit_invalid_question(client, seed_questions):
     payload = {
@@ -59,7 +71,43 @@ def test_submit_invalid_question(client, seed_questions):
     response = client.post("/submit", json=payload)
     assert response.status_code == 400
 
-def test_get_report(client, seed_questions):
+def test_submit_batch(client, seed_questions):
+    payload = [
+        {"client_id": "c1", "answers": [{"question_id": "Q-001", "answer": "yes"}, {"question_id": "Q-002", "answer": "yes"}]},
+        {"client_id": "c2", "answers": [{"question_id": "Q-999", "answer": "yes"}]},
+        {"answers": []},
+        {"client_id": "c3", "answers": [{"question_id": "Q-001", "answer": "no"}]},
+    ]
+    response = client.post("/submit/batch", json=payload)
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["accepted"], data["rejected"]) == (2, 2)
+
+    items = data["items"]
+    assert [item["index"] for item in items] == [0, 1, 2, 3]
+    assert items[1]["error"] == "Invalid question_id: Q-999"
+    assert items[2]["error"] == "client_id: Field required"
+    summary = client.get(f"/standards/summary/{items[0]['submission_id']}").json()
+    assert summary["iso_27001_2022"]["status"] == "compliant"
+    summary = client.get(f"/standards/summary/{items[3]['submission_id']}").json()
+    assert summary["iso_27001_2022"]["status"] == "non_compliant"
+
+def test_submit_batch_ndjson(client, seed_questions):
+    body = (
+        '{"client_id": "c1", "answers": [{"question_id": "Q-001", "answer": "yes"}]}\n'
+        'not json\n'
+        '\n'
+        '{"client_id": "c2", "answers": [{"question_id": "Q-002", "answer": "n/a"}]}'
+    )
+    response = client.post("/submit/batch", content=body, headers={"Content-Type": "application/x-ndjson"})
+    data = response.json()
+    assert (data["accepted"], data["rejected"]) == (2, 1)
+    assert data["items"][1]["error"].startswith("Malformed JSON")
+    assert data["items"][2]["client_id"] == "c2"
+
+    assert client.post("/submit/batch", json={"client_id": "c1"}).status_code == 400
+
+def test_get_report(client, db, seed_questions):
     # Submit first
     payload = {
         "client_id": "test-client",
@@ -69,8 +117,54 @@ def test_get_report(client, seed_questions):
     }
     res = client.post("/submit", json=payload)
     sub_id = res.json()["submission_id"]
+    key = (sub_id, db.get(models.Submission, sub_id).catalog_version)
+    reports.report_cache.clear()
     
     # Get report
     response = client.get(f"/report/{sub_id}")
     assert response.status_code == 200
     assert "Compliance Report" in response.text
+    assert sub_id in response.text
+    # The streamed render is kept once the response is complete
+    assert reports.report_cache.get(key) == response.text
+
+    # Second request is served from the render cache
+    reports.report_cache.put(key, "<p>cached</p>")
+    assert client.get(f"/report/{sub_id}").text == "<p>cached</p>"
+
+def test_oversized_report_is_streamed_not_cached(client, db, seed_questions, monkeypatch):
+    sub_id = client.post("/submit", json={
+        "client_id": "test-client", "answers": [{"question_id": "Q-001", "answer": "yes"}]
+    }).json()["submission_id"]
+    monkeypatch.setattr(reports, "report_cache", reports.ReportCache(max_size=1024))
+
+    response = client.get(f"/report/{sub_id}")
+    assert response.status_code == 200
+    assert len(response.text) > 1024
+    assert response.text.rstrip().endswith("</html>")
+    assert reports.report_cache.size == 0
+
+def test_get_control_summary(client, seed_questions):
+    payload = {
+        "client_id": "test-client",
+        "answers": [{"question_id": "Q-001", "answer": "no"}]
+    }
+    sub_id = client.post("/submit", json=payload).json()["submission_id"]
+
+    response = client.get(f"/standards/controls/{sub_id}?standard=iso_27001_2022")
+    assert response.status_code == 200
+    data = response.json()
+    assert list(data) == ["iso_27001_2022"]
+    assert data["iso_27001_2022"]["A.9.4.1"]["status"] == "non_compliant"
+    assert data["iso_27001_2022"]["A.10.1.1"]["counts"]["unanswered"] == 1
+
+def test_ready_after_warm_up(client, db, seed_questions, monkeypatch):
+    from app import main
+    monkeypatch.setattr(main.app.state, "warm", None, raising=False)
+    assert client.get("/ready").status_code == 503
+    assert client.get("/health").status_code == 200
+
+    main.warm_up(db)
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["questions"] == 2
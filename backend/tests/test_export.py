@@ -0,0 +1,56 @@
+import csv
+import io
+import json
+import pytest
+from app import export
+from tests.test_import import CATALOG_CSV_CONTENT
+from tests.test_rollups import submit, upload
+
+@pytest.fixture
+def submissions(client, db):
+    upload(client, CATALOG_CSV_CONTENT)
+    return [
+        submit(client, "acme", ("Q_001", "yes"), ("Q_002", "no")),
+        submit(client, "acme", ("Q_001", "n/a")),
+        submit(client, "globex", ("Q_001", "yes")),
+    ]
+
+def test_export_csv(client, submissions):
+    response = client.get("/export/submissions", params={"format": "csv", "batch_size": 2})
+    assert response.status_code == 200
+    assert response.headers["content-disposition"] == 'attachment; filename="submissions.csv"'
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [r["submission_id"] for r in rows] == [s["submission_id"] for s in submissions]
+    assert rows[0]["iso_27001_2022_status"] == "non_compliant"
+    assert (rows[0]["iso_27001_2022_yes"], rows[0]["iso_27001_2022_no"]) == ("1", "1")
+
+def test_export_answers_ndjson_filtered(client, submissions):
+    response = client.get("/export/submissions", params={"format": "ndjson", "kind": "answers", "client_id": "acme"})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [(r["question_id"], r["answer"]) for r in lines] == [("Q_001", "yes"), ("Q_002", "no"), ("Q_001", "n/a")]
+    assert {r["client_id"] for r in lines} == {"acme"}
+
+def test_export_time_range(client, submissions):
+    assert client.get("/export/submissions", params={"format": "ndjson", "end": "2000-01-01T00:00:00Z"}).text == ""
+    response = client.get("/export/submissions", params={"format": "ndjson", "start": "2000-01-01T00:00:00+02:00"})
+    assert len(response.text.splitlines()) == 3
+
+def test_export_rejects_unknown_format(client, db):
+    assert client.get("/export/submissions", params={"format": "xlsx"}).status_code == 400
+    assert client.get("/export/submissions", params={"kind": "reports"}).status_code == 400
+
+def test_export_parquet(client, submissions):
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+
+    response = client.get("/export/submissions", params={"format": "parquet", "batch_size": 2})
+    table = pyarrow.parquet.read_table(io.BytesIO(response.content))
+    assert table.num_rows == 3
+    assert table.column("soc_2_tsc_status").to_pylist()[2] == "compliant"
+
+def test_export_cli(db, submissions, tmp_path, monkeypatch):
+    monkeypatch.setattr("app.db.SessionLocal", lambda: db)
+    out = tmp_path / "answers.csv"
+    export.main(["--kind", "answers", "--client-id", "globex", "--out", str(out)])
+    rows = list(csv.DictReader(out.open()))
+    assert [(r["client_id"], r["question_id"]) for r in rows] == [("globex", "Q_001")]
@@ -0,0 +1,54 @@
+from app import crud, models
+from tests.test_import import CATALOG_CSV_CONTENT
+from tests.test_rollups import submit, upload
+
+def test_client_history_pages_newest_first(client, db):
+    upload(client, CATALOG_CSV_CONTENT)
+    ids = [submit(client, "acme", ("Q_001", "yes"))["submission_id"] for _ in range(5)]
+    submit(client, "globex", ("Q_001", "no"))
+
+    first = client.get("/clients/acme/submissions", params={"limit": 2})
+    assert [s["submission_id"] for s in first.json()] == ids[::-1][:2]
+    cursor = first.headers["X-Next-Cursor"]
+    second = client.get("/clients/acme/submissions", params={"limit": 2, "before": cursor})
+    third = client.get("/clients/acme/submissions", params={"limit": 2, "before": second.headers["X-Next-Cursor"]})
+    assert [s["submission_id"] for s in second.json() + third.json()] == ids[::-1][2:]
+    assert "X-Next-Cursor" not in third.headers
+
+    assert client.get("/clients/globex/submissions", params={"before": ids[0]}).status_code == 400
+    assert client.get("/clients/nobody/submissions").json() == []
+
+def test_latest_pointer(client, db):
+    upload(client, CATALOG_CSV_CONTENT)
+    assert client.get("/clients/acme/latest").status_code == 404
+    submit(client, "acme", ("Q_001", "yes"))
+    batch = client.post("/submit/batch", json=[
+        {"client_id": "acme", "answers": [{"question_id": "Q_001", "answer": "no"}]}
+    ]).json()
+    latest = client.get("/clients/acme/latest").json()
+    assert latest["submission_id"] == batch["items"][0]["submission_id"]
+
+    db.query(models.ClientLatest).delete()
+    db.commit()
+    assert crud.rebuild_client_latest(db) == 1
+    assert client.get("/clients/acme/latest").json()["submission_id"] == latest["submission_id"]
+
+def test_submission_diff(client, db):
+    upload(client, CATALOG_CSV_CONTENT)
+    base = submit(client, "acme", ("Q_001", "yes"), ("Q_002", "yes"), ("Q_003", "yes"))
+    other = client.post("/submit", json={"client_id": "acme", "answers": [
+        {"question_id": "Q_001", "answer": "yes", "notes": "reviewed"},
+        {"question_id": "Q_002", "answer": "no"},
+    ]}).json()
+
+    diff = client.get(f"/submissions/{base['submission_id']}/diff/{other['submission_id']}").json()
+    assert diff["answers_changed"] == [
+        {"question_id": "Q_001", "before": {"answer": "yes", "notes": None}, "after": {"answer": "yes", "notes": "reviewed"}},
+        {"question_id": "Q_002", "before": {"answer": "yes", "notes": None}, "after": {"answer": "no", "notes": None}},
+        {"question_id": "Q_003", "before": {"answer": "yes", "notes": None}, "after": None},
+    ]
+    assert {"standard": "iso_27001_2022", "before": "compliant", "after": "non_compliant"} in diff["standards_changed"]
+
+    same = client.get(f"/submissions/{base['submission_id']}/diff/{base['submission_id']}").json()
+    assert same["answers_changed"] == [] and same["standards_changed"] == []
+    assert client.get(f"/submissions/{base['submission_id']}/diff/missing").status_code == 404
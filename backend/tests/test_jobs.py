@@ -0,0 +1,124 @@
+from datetime import timedelta
+import pytest
+from app import jobs, models
+
+PAYLOAD = {
+    "client_id": "test-client",
+    "answers": [{"question_id": "Q-001", "answer": "no"}]
+}
+
+@pytest.fixture
+def failing_job(monkeypatch):
+    calls = []
+
+    def fail(db, job):
+        calls.append(job.attempts)
+        raise RuntimeError("renderer unavailable")
+
+    monkeypatch.setitem(jobs.HANDLERS, "always_fails", fail)
+    return calls
+
+def test_submit_queues_post_processing(client, db, seed_questions):
+    data = client.post("/submit", json=PAYLOAD).json()
+    sub_id = data["submission_id"]
+    assert client.get(f"/jobs/{data['jobs'][0]}").json()["status"] == "queued"
+
+    assert jobs.run_pending(db) == 1
+
+    for job_id in data["jobs"]:
+        job = client.get(f"/jobs/{job_id}").json()
+        assert job["status"] == "succeeded"
+        assert job["attempts"] == 1
+
+    submission = db.get(models.Submission, sub_id)
+    db.refresh(submission)
+    assert submission.controls_summary["iso_27001_2022"]["A.9.4.1"]["status"] == "non_compliant"
+    assert client.get(f"/standards/controls/{sub_id}").json() == submission.controls_summary
+
+    assert client.get("/jobs/missing").status_code == 404
+
+def test_failed_job_retries_with_backoff(db, failing_job):
+    job = jobs.enqueue(db, "always_fails")
+    job.max_attempts = 2
+    db.commit()
+
+    assert jobs.run_pending(db) == 1
+    db.refresh(job)
+    assert job.status == jobs.QUEUED
+    assert job.last_error == "RuntimeError: renderer unavailable"
+    # Not runnable again until the backoff has passed
+    assert job.run_after > jobs.utcnow()
+    assert jobs.run_pending(db) == 0
+
+    job.run_after = jobs.utcnow() - timedelta(seconds=1)
+    db.commit()
+    assert jobs.run_pending(db) == 1
+    db.refresh(job)
+    assert job.status == jobs.FAILED
+    assert failing_job == [1, 2]
+
+def test_lost_running_job_is_reclaimed(db, seed_questions):
+    job = jobs.enqueue(db, "control_breakdown", submission_id="gone")
+    job.status = jobs.RUNNING
+    job.started_at = jobs.utcnow() - timedelta(hours=1)
+    db.commit()
+
+    assert jobs.run_pending(db) == 1
+    db.refresh(job)
+    assert job.status == jobs.SUCCEEDED
+
+def test_enqueue_rejects_unknown_kind(db):
+    with pytest.raises(ValueError):
+        jobs.enqueue(db, "no_such_job")
+
+def test_catalog_change_rescores_affected_standards(client, db):
+    from tests.test_import import CATALOG_CSV_CONTENT
+
+    def upload(content):
+        return client.post("/import-csv/upload", files={"file": ("question.csv", content.encode(), "text/csv")}).json()
+
+    assert upload(CATALOG_CSV_CONTENT)["rescore_job"] is None # Nothing stored yet to re-score
+    answers = [{"question_id": "Q_002", "answer": "yes"}]
+    sub_ids = [
+        client.post("/submit", json={"client_id": f"c{i}", "answers": answers}).json()["submission_id"]
+        for i in range(3)
+    ]
+    jobs.run_pending(db)
+    before = {sid: client.get(f"/standards/summary/{sid}").json() for sid in sub_ids}
+    assert before[sub_ids[0]]["gdpr"]["status"] == "not_applicable"
+
+    # Text-only edits do not touch any summary
+    assert upload(CATALOG_CSV_CONTENT.replace("Is MFA enforced?", "Is MFA on?"))["rescore_job"] is None
+
+    # Map Q_002 to GDPR
+    job_id = upload(CATALOG_CSV_CONTENT.replace("A.8.2,AC-2,,", "A.8.2,AC-2,,Art.32"))["rescore_job"]
+    changes = db.query(models.CatalogChange).order_by(models.CatalogChange.id).all()
+    assert [c.standards for c in changes[1:]] == [[], ["gdpr"]]
+    assert changes[-1].question_ids == ["Q_002"]
+    # The text-only edit keeps the history contiguous: only gdpr is recomputed
+    scored_at = db.get(models.Submission, sub_ids[0]).catalog_version
+    assert jobs._changed_standards(changes, scored_at) == ["gdpr"]
+
+    assert jobs.run_pending(db) == 2 # Coordinator + one chunk
+    job = client.get(f"/jobs/{job_id}").json()
+    assert job["result"] == {"chunks": 1, "submissions": 3}
+    assert job["progress"]["succeeded"] == 1
+    assert job["progress"]["percent"] == 100.0
+
+    version = db.query(models.CatalogState).one().version
+    for sid in sub_ids:
+        after = client.get(f"/standards/summary/{sid}").json()
+        assert after["gdpr"]["status"] == "compliant"
+        assert after["gdpr"]["counts"]["total"] == 1
+        assert {k: v for k, v in after.items() if k != "gdpr"} == {k: v for k, v in before[sid].items() if k != "gdpr"}
+        assert db.get(models.Submission, sid).catalog_version == version
+
+def test_purge_finished_jobs(db):
+    old, recent, queued = (jobs.enqueue(db, "control_breakdown") for _ in range(3))
+    old.status = recent.status = jobs.SUCCEEDED
+    old.finished_at = jobs.utcnow() - timedelta(days=8)
+    recent.finished_at = jobs.utcnow()
+    db.commit()
+
+    assert jobs.purge_finished(db, retention=timedelta(days=7).total_seconds()) == 1
+    assert {job.id for job in db.query(models.Job)} == {recent.id, queued.id}
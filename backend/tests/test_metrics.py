@@ -0,0 +1,44 @@
+import marshal
+from app import metrics
+from app.config import settings
+
+def test_histogram_renders_cumulative_buckets():
+    hist = metrics.Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3):
+        hist.observe(value, "/a")
+    assert list(hist.render())[2:] == [
+        'latency_seconds_bucket{route="/a",le="0.1"} 2',
+        'latency_seconds_bucket{route="/a",le="1.0"} 3',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 4',
+        'latency_seconds_sum{route="/a"} 3.65',
+        'latency_seconds_count{route="/a"} 4',
+    ]
+
+def test_requests_are_timed_per_route(client, db, seed_questions):
+    before = metrics.request_seconds.count("POST", "/submit")
+    response = client.post("/submit", json={"client_id": "acme", "answers": [{"question_id": "Q-001", "answer": "yes"}]})
+    assert response.status_code == 202
+    timing = response.headers["Server-Timing"]
+    assert "scoring.summarize;dur=" in timing and "db.commit;dur=" in timing
+    assert metrics.request_seconds.count("POST", "/submit") == before + 1
+    assert metrics.requests_total.value("POST", "/submit", "202") >= 1
+
+    # Route templates, not raw paths
+    client.get("/report/missing")
+    body = client.get("/metrics").text
+    assert 'http_requests_total{method="GET",route="/report/{submission_id}",status="404"}' in body
+    assert 'http_request_db_queries_count{method="POST",route="/submit"}' in body
+    assert 'span_duration_seconds_count{span="validate"}' in body
+
+def test_profile_requires_setting(client, db, seed_questions, monkeypatch):
+    response = client.get("/questions?profile=1")
+    assert response.headers["content-type"] == "application/json"
+
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+    response = client.get("/questions?profile=1")
+    assert response.headers["content-type"].startswith("text/plain")
+    assert response.headers["X-Profiled-Status"] == "200"
+    assert "function calls" in response.text
+
+    stats = marshal.loads(client.get("/questions?profile=pstats").content)
+    assert any(func == "get_questions" for _, _, func in stats)
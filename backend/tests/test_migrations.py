@@ -0,0 +1,25 @@
+from app import migrations, models
+
+def test_pack_legacy_submissions(db, client):
+    db.add(models.Question(question_id="Q-001", question_text="Do you have MFA?", iso_27001_2022="A.9.4.1", meta={}))
+    db.add(models.Submission(
+        submission_id="legacy-1",
+        client_id="acme",
+        answers=[{"question_id": "Q-001", "answer": "no", "notes": "rollout pending"}],
+        summary={},
+        report_html="<html>stale</html>"
+    ))
+    db.commit()
+
+    assert migrations.pack_legacy_submissions(db) == 1
+    assert migrations.pack_legacy_submissions(db) == 0
+
+    row = db.get(models.Submission, "legacy-1")
+    assert row.answers_packed is not None
+    assert row.report_html is None
+
+    # Reads still return the same answers, now rendered on demand
+    response = client.get("/report/legacy-1")
+    assert response.status_code == 200
+    assert "rollout pending" in response.text
+    assert "stale" not in response.text
@@ -0,0 +1,44 @@
+from app import catalog, models, reports
+from app.reports import ReportCache
+from tests.test_scoring import make_question
+
+def test_report_cache_evicts_least_recently_used():
+    cache = ReportCache(max_size=10)
+    cache.put("a", "aaaa")
+    cache.put("b", "bbbb")
+    assert cache.get("a") == "aaaa" # "b" is now least recently used
+    cache.put("c", "cccc")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "aaaa"
+    assert cache.get("c") == "cccc"
+    assert cache.size == 8
+
+def test_report_cache_skips_oversized_entries():
+    cache = ReportCache(max_size=4)
+    cache.put("a", "too long")
+    assert cache.get("a") is None
+    assert cache.size == 0
+
+def test_report_cache_tee_caches_small_renders():
+    cache = ReportCache(max_size=10)
+    assert list(cache.tee("a", iter(["ab", "cd"]))) == ["ab", "cd"]
+    assert cache.get("a") == "abcd"
+
+    assert list(cache.tee("b", iter(["abcdef", "ghijkl"]))) == ["abcdef", "ghijkl"]
+    assert cache.get("b") is None
+
+def test_streamed_report_is_chunked():
+    questions = catalog.Catalog(1, tuple(make_question(i, iso_27001_2022="A.5.1") for i in range(300)))
+    submission = models.Submission(
+        submission_id="sub-1", client_id="acme",
+        answers=[{"question_id": "Q_001", "answer": "yes", "notes": None}]
+    )
+    summary = reports.compute_summary([], questions)
+
+    chunks = list(reports.iter_html_report(submission, summary, questions, chunk_size=4096))
+    assert len(chunks) > 1
+    assert all(len(c) >= 4096 for c in chunks[:-1])
+    html = "".join(chunks)
+    assert html == reports.generate_html_report(submission, summary, questions)
+    assert html.count("<td>Q_") == 300
@@ -0,0 +1,61 @@
+import gzip
+import json
+from app import models, responses
+from app.responses import ResponseCache
+
+def test_encode_body_matches_json():
+    payload = [{"id": 1, "question_text": "Ünïcode?", "meta": {"a": None}}]
+    body = responses.encode_body(payload)
+    assert json.loads(body.raw) == payload
+    assert body.gzip is None # Too small to compress
+
+    big = [{"id": i, "question_text": "x" * 50} for i in range(100)]
+    body = responses.encode_body(big, {"X-Next-Cursor": "99"})
+    assert json.loads(gzip.decompress(body.gzip)) == big
+    assert body.headers == {"X-Next-Cursor": "99"}
+
+def test_response_cache_drops_older_versions():
+    cache = ResponseCache(max_size=1024)
+    cache.put(1, "a", responses.encode_body([1]))
+    assert cache.get(1, "a").raw == b"[1]"
+    assert cache.get(2, "a") is None
+
+    cache.put(2, "b", responses.encode_body([2]))
+    assert cache.get(1, "a") is None
+    # A slow request finishing after an import must not re-add stale bytes
+    cache.put(1, "a", responses.encode_body([1]))
+    assert cache.get(2, "a") is None
+    assert cache.size == 3
+
+def test_questions_served_gzipped(client, db):
+    db.add_all(
+        models.Question(question_id=f"Q-{i:03d}", question_text="Do you rotate credentials? " * 4, meta={})
+        for i in range(20)
+    )
+    db.commit()
+
+    plain = client.get("/questions", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers
+    zipped = client.get("/questions", headers={"Accept-Encoding": "gzip"})
+    assert zipped.headers["Content-Encoding"] == "gzip"
+    # httpx decodes transparently; both representations carry the same JSON
+    assert zipped.json() == plain.json()
+    assert len(plain.json()) == 20
+
+def test_gzip_variant_has_its_own_etag(client, db):
+    db.add_all(
+        models.Question(question_id=f"Q-{i:03d}", question_text="Do you rotate credentials? " * 4, meta={})
+        for i in range(20)
+    )
+    db.commit()
+
+    plain = client.get("/questions", headers={"Accept-Encoding": "identity"}).headers["ETag"]
+    zipped = client.get("/questions", headers={"Accept-Encoding": "gzip"}).headers["ETag"]
+    assert zipped == responses.gzip_etag(plain) != plain
+
+    # Each tag revalidates only the representation it was issued for
+    response = client.get("/questions", headers={"Accept-Encoding": "gzip", "If-None-Match": zipped})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == zipped
+    assert client.get("/questions", headers={"Accept-Encoding": "identity", "If-None-Match": zipped}).status_code == 200
+    assert client.get("/questions", headers={"Accept-Encoding": "identity", "If-None-Match": plain}).status_code == 304
@@ -0,0 +1,58 @@
+from datetime import date
+from app import jobs
+from tests.test_import import CATALOG_CSV_CONTENT
+
+def upload(client, content):
+    return client.post("/import-csv/upload", files={"file": ("question.csv", content.encode(), "text/csv")}).json()
+
+def submit(client, client_id, *answers):
+    payload = {"client_id": client_id, "answers": [{"question_id": q, "answer": a} for q, a in answers]}
+    return client.post("/submit", json=payload).json()
+
+def test_rollups_follow_submissions(client, db):
+    upload(client, CATALOG_CSV_CONTENT)
+    submit(client, "acme", ("Q_001", "yes"), ("Q_002", "yes"), ("Q_003", "yes"))
+    submit(client, "acme", ("Q_001", "no"))
+    client.post("/submit/batch", json=[
+        {"client_id": "globex", "answers": [{"question_id": "Q_001", "answer": "yes"}]}
+    ])
+
+    rows = client.get("/analytics/compliance", params={"group_by": "client_id", "standard": "soc_2_tsc"}).json()
+    assert [(r["client_id"], r["assessments"], r["compliant"], r["non_compliant"]) for r in rows] == [
+        ("acme", 2, 1, 1), ("globex", 1, 1, 0)
+    ]
+    assert rows[0]["compliance_rate"] == 0.5
+
+    month = date.today().replace(day=1).isoformat()
+    rows = client.get("/analytics/compliance", params={"client_id": "acme", "standard": "iso_27001_2022"}).json()
+    assert [(r["month"], r["yes"], r["no"], r["total"]) for r in rows] == [(month, 3, 1, 6)]
+
+    assert client.get("/analytics/compliance", params={"start": "2999-01-01"}).json() == []
+    assert client.get("/analytics/compliance", params={"group_by": "day"}).status_code == 400
+
+def test_rollup_rebuild_matches_incremental(client, db):
+    upload(client, CATALOG_CSV_CONTENT)
+    for i in range(3):
+        submit(client, f"c{i % 2}", ("Q_001", "yes"), ("Q_002", ["yes", "no", "n/a"][i]))
+    # A mapping change re-scores stored submissions, moving their rollups too
+    upload(client, CATALOG_CSV_CONTENT.replace("A.8.2,AC-2,,", "A.8.2,AC-2,,Art.32"))
+    jobs.run_pending(db)
+    incremental = client.get("/analytics/compliance").json()
+    assert any(r["standard"] == "gdpr" and r["assessments"] for r in incremental)
+
+    job = client.post("/analytics/rebuild").json()
+    assert job["kind"] == "rebuild_rollups"
+    jobs.run_pending(db)
+    assert client.get(f"/jobs/{job['id']}").json()["status"] == "succeeded"
+    assert client.get("/analytics/compliance").json() == incremental
+
+def test_rollups_summed_over_standards_count_assessments(client, db):
+    upload(client, CATALOG_CSV_CONTENT)
+    submit(client, "acme", ("Q_001", "yes"))
+    submit(client, "acme", ("Q_002", "no"))
+
+    rows = client.get("/analytics/compliance", params={"group_by": "client_id"}).json()
+    per_standard = client.get("/analytics/compliance", params={"group_by": "standard"}).json()
+    # Two submissions, each assessed against every standard
+    assert rows[0]["assessments"] == 2 * len(per_standard)
+    assert all(r["assessments"] == 2 for r in per_standard)
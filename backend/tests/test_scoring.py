@@ -0,0 +1,100 @@
+import random
+from app import catalog, reports, schemas, scoring
+from app.catalog import CatalogQuestion
+
+def make_question(pos, rng=None, **mapping):
+    if rng is not None:
+        mapping = {
+            std: rng.choice(["", "", "X.1", "X.1|X.2", "  "])
+            for std in reports.STANDARD_COLS
+        }
+    return CatalogQuestion(
+        id=pos + 1, question_id=f"Q_{pos:03d}", section_id="S", question_text=f"Question {pos}",
+        iam_domain="D", answer_type="yes_no_partial_with_text", question_type="core",
+        notes="", **{std: mapping.get(std, "") for std in reports.STANDARD_COLS}
+    )
+
+def test_engine_matches_reference_summary():
+    rng = random.Random(42)
+    for _ in range(50):
+        questions = tuple(make_question(i, rng) for i in range(rng.randint(0, 60)))
+        cat = catalog.Catalog(1, questions)
+        answers = [
+            schemas.AnswerIn(
+                question_id=q.question_id,
+                answer=rng.choice(["yes", "Yes", "no", "n/a", "NA", "partial"]),
+                notes=rng.choice([None, "", "outsourced"])
+            )
+            for q in questions if rng.random() < 0.8
+        ]
+        # Repeated answers: the last one wins in both implementations
+        if answers:
+            answers.append(answers[0].model_copy(update={"answer": "n/a", "notes": "late"}))
+        answers.append(schemas.AnswerIn(question_id="UNKNOWN", answer="yes"))
+
+        assert reports.compute_summary(answers, cat) == reports.compute_summary(answers, list(questions))
+
+def test_engine_standard_subset():
+    rng = random.Random(7)
+    questions = tuple(make_question(i, rng) for i in range(20))
+    engine = catalog.Catalog(1, questions).scoring
+    codes, notes = engine.encode([schemas.AnswerIn(question_id="Q_001", answer="no")])
+    summary = engine.summarize(codes, notes, standards=["gdpr"])
+    assert list(summary) == ["gdpr"]
+
+def test_control_breakdown():
+    questions = tuple(
+        make_question(pos, nist_800_53_rev5=nist)
+        for pos, nist in enumerate(["AC-2|IA-2", "AC-2", "IA-5"])
+    )
+    cat = catalog.Catalog(1, questions)
+    assert cat.controls[("nist_800_53_rev5", "AC-2")] == (0, 1)
+
+    answers = [
+        schemas.AnswerIn(question_id="Q_000", answer="yes"),
+        schemas.AnswerIn(question_id="Q_001", answer="n/a", notes="no local accounts"),
+    ]
+    codes, notes = cat.scoring.encode(answers)
+    breakdown = cat.scoring.summarize_controls(codes, notes)
+
+    nist = breakdown["nist_800_53_rev5"]
+    assert list(nist) == ["AC-2", "IA-2", "IA-5"]
+    assert nist["AC-2"]["status"] == "partial"
+    assert nist["AC-2"]["na_notes"] == ["Q_001: no local accounts"]
+    assert nist["IA-2"]["status"] == "compliant"
+    assert nist["IA-5"]["counts"]["unanswered"] == 1
+    assert breakdown["gdpr"] == {}
+
+def test_packed_answers_roundtrip():
+    questions = tuple(make_question(i, iso_27001_2022="A.5.1") for i in range(10))
+    engine = catalog.Catalog(1, questions).scoring
+    answers = [
+        schemas.AnswerIn(question_id="Q_002", answer="Yes", notes="SSO everywhere"),
+        schemas.AnswerIn(question_id="Q_005", answer="na", notes="outsourced"),
+        schemas.AnswerIn(question_id="Q_007", answer="partial"),
+    ]
+    packed = scoring.pack_answers(engine.encode_answers(answers))
+
+    # A later catalog version may have appended questions
+    grown = catalog.Catalog(2, questions + (make_question(10),)).scoring
+    decoded = grown.unpack(packed)
+    assert len(decoded.codes) == 11
+    assert decoded.na_notes == {5: "outsourced"}
+    assert grown.decode_answers(decoded) == [
+        {"question_id": "Q_002", "answer": "yes", "notes": "SSO everywhere"},
+        {"question_id": "Q_005", "answer": "n/a", "notes": "outsourced"},
+        {"question_id": "Q_007", "answer": "partial", "notes": None},
+    ]
+
+def test_counter_deltas_match_full_count():
+    rng = random.Random(3)
+    questions = tuple(make_question(i, rng) for i in range(40))
+    engine = catalog.Catalog(1, questions).scoring
+    codes = bytearray(len(questions))
+    counters = engine.empty_counters()
+    for _ in range(300):
+        pos = rng.randrange(len(questions))
+        new = rng.choice([scoring.UNANSWERED, scoring.YES, scoring.NO, scoring.NA])
+        engine.apply_delta(counters, pos, codes[pos], new)
+        codes[pos] = new
+        assert counters == engine.count(codes)
@@ -0,0 +1,117 @@
+import dataclasses
+import random
+from app import catalog, search
+from tests.test_import import CATALOG_CSV_CONTENT
+from tests.test_rollups import upload
+from tests.test_scoring import make_question
+
+WORDS = ["access", "review", "mfa", "password", "rotation", "logging"]
+
+def random_catalog(rng, size):
+    questions = []
+    for pos in range(size):
+        q = make_question(pos, rng)
+        questions.append(dataclasses.replace(
+            q,
+            question_text=" ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 6))),
+            iam_domain=rng.choice(["Access", "Identity", None]),
+            question_type=rng.choice(["core", "follow_up"]),
+        ))
+    return catalog.Catalog(1, tuple(questions))
+
+def brute_force(questions, index, query, filters):
+    terms = list(dict.fromkeys(search.tokenize(query)))
+    hits = []
+    for pos, q in enumerate(questions):
+        if not all(pos in index.postings.get(term, {}) for term in terms):
+            continue
+        if "iam_domain" in filters and q.iam_domain != filters["iam_domain"]:
+            continue
+        if "standard" in filters and filters["standard"] not in questions.scoring.standards_of[pos]:
+            continue
+        hits.append((pos, sum(index.postings[term][pos] for term in terms) if terms else None))
+    if terms:
+        hits.sort(key=lambda hit: -hit[1])
+    return hits
+
+def test_search_matches_brute_force_on_every_path(monkeypatch):
+    rng = random.Random(7)
+    questions = random_catalog(rng, 400)
+    # Default thresholds, then forced sparse, dense-with-threshold-walk and dense-full-score paths
+    for limit, fraction in [(search.FULL_SCORE_LIMIT, search.DENSE_FRACTION), (0, 10 ** 9), (0, 1), (10 ** 9, 1)]:
+        monkeypatch.setattr(search, "FULL_SCORE_LIMIT", limit)
+        monkeypatch.setattr(search, "DENSE_FRACTION", fraction)
+        index = search.SearchIndex(questions.questions, questions.scoring)
+        for _ in range(40):
+            query = " ".join(rng.sample(WORDS, rng.randint(0, 3)))
+            filters = {}
+            if rng.random() < 0.5:
+                filters["iam_domain"] = rng.choice(["Access", "Identity"])
+            if rng.random() < 0.5:
+                filters["standard"] = rng.choice(catalog.STANDARD_COLS)
+            page_size, offset = rng.randint(1, 30), rng.randint(0, 10)
+            result = index.search(query, filters, limit=page_size, offset=offset)
+            expected = brute_force(questions, index, query, filters)
+            assert result.total == len(expected)
+            assert [pos for pos, _ in result.hits] == [pos for pos, _ in expected[offset:offset + page_size]]
+
+def test_search_ranks_and_facets():
+    questions = catalog.Catalog(1, (
+        dataclasses.replace(make_question(0, nist_800_53_rev5="AC-2"), question_text="Are accounts reviewed?"),
+        dataclasses.replace(make_question(1, nist_800_53_rev5="AC-2|AC-3"), question_text="Is access to accounts reviewed quarterly for accounts?", iam_domain="E"),
+        dataclasses.replace(make_question(2, gdpr="Art.32"), question_text="Is MFA enforced?"),
+    ))
+    index = questions.search_index
+    assert questions.search_index is index
+
+    result = index.search("accounts reviewed")
+    assert result.total == 2
+    # Both terms in the shorter question weigh more per token
+    assert [pos for pos, _ in result.hits] == [0, 1]
+    assert result.facets["iam_domain"] == {"D": 1, "E": 1}
+    assert result.facets["standard"] == {"nist_800_53_rev5": 2}
+    assert "control_id" not in result.facets
+
+    # A control ID finds the questions mapped to it
+    assert [pos for pos, _ in index.search("ac-3").hits] == [1]
+
+    # A facet's counts ignore its own filter, so the alternatives stay visible
+    result = index.search("", {"standard": "nist_800_53_rev5", "control_id": "AC-3"})
+    assert result.hits == [(1, None)]
+    assert result.facets["control_id"] == {"AC-2": 2, "AC-3": 1}
+    assert result.facets["standard"] == {"nist_800_53_rev5": 1}
+
+    assert index.search("kerberos").total == 0
+
+    # An empty catalog still builds an index
+    assert catalog.Catalog(0, ()).search_index.search("mfa").total == 0
+
+def test_search_endpoint(client, db):
+    upload(client, CATALOG_CSV_CONTENT)
+    response = client.get("/questions/search", params={"q": "IdP"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["catalog_version"] == 1
+    assert body["total"] == 2
+    # Q_002 has fewer control tokens, so its one "IdP" weighs more
+    assert [hit["question_id"] for hit in body["hits"]] == ["Q_002", "Q_001"]
+    assert body["hits"][0]["score"] > body["hits"][1]["score"] > 0
+    assert body["facets"]["standard"] == {"iso_27001_2022": 2, "nist_800_53_rev5": 2, "soc_2_tsc": 1}
+    assert client.get(
+        "/questions/search", params={"q": "IdP"}, headers={"If-None-Match": response.headers["ETag"]}
+    ).status_code == 304
+
+    body = client.get("/questions/search", params={"standard": "iso_27001_2022", "control_id": "A.8.5"}).json()
+    assert [hit["question_id"] for hit in body["hits"]] == ["Q_001", "Q_003"]
+    assert body["hits"][0]["score"] is None
+    assert body["facets"]["control_id"] == {"A.8.5": 2, "A.8.2": 1}
+
+    # The next import's snapshot gets its own index; earlier versions stay searchable
+    upload(client, CATALOG_CSV_CONTENT.replace("Is MFA enforced?", "Is MFA enforced for the IdP?"))
+    assert client.get("/questions/search", params={"q": "idp"}).json()["total"] == 3
+    assert client.get("/questions/search", params={"q": "idp", "version": 1}).json()["total"] == 2
+
+    assert client.get("/questions/search", params={"control_id": "A.8.5"}).status_code == 400
+    assert client.get("/questions/search", params={"standard": "iso"}).status_code == 400
+    assert client.get("/questions/search", params={"limit": 0}).status_code == 400
+    assert client.get("/questions/search", params={"version": 9}).status_code == 404
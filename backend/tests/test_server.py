@@ -0,0 +1,13 @@
+from app import init_db, server
+
+def test_server_migrates_before_starting_workers(monkeypatch):
+    calls = []
+    monkeypatch.setattr(init_db, "init_db", lambda: calls.append("init_db"))
+    monkeypatch.setattr(server.uvicorn, "run", lambda app, **options: calls.append(("run", options["workers"])))
+
+    server.main(["--workers", "3"])
+    assert calls == ["init_db", ("run", 3)]
+
+    calls.clear()
+    server.main(["--skip-init-db"])
+    assert calls == [("run", max(server.settings.WEB_CONCURRENCY, 1))]
@@ -0,0 +1,70 @@
+import pytest
+from app import catalog, crud, schemas, validation
+from tests.test_rollups import upload
+from tests.test_import import CATALOG_CSV_CONTENT
+
+def make_validator():
+    questions = [
+        catalog.CatalogQuestion(id=1, question_id="Q1", answer_type="yes_no_partial_with_text", **dict.fromkeys(
+            ["section_id", "question_text", "iam_domain", "question_type", *catalog.STANDARD_COLS, "notes"]
+        )),
+        catalog.CatalogQuestion(id=2, question_id="Q2", answer_type="yes_no_na", **dict.fromkeys(
+            ["section_id", "question_text", "iam_domain", "question_type", *catalog.STANDARD_COLS, "notes"]
+        )),
+    ]
+    return validation.CatalogValidator(questions)
+
+def test_validator_normalizes():
+    answers = make_validator().validate([
+        schemas.Answer("Q1", " Partial ", "  MFA for admins only "),
+        schemas.Answer("Q2", "NA", "   "),
+    ])
+    assert answers == [schemas.Answer("Q1", "partial", "MFA for admins only"), schemas.Answer("Q2", "n/a", None)]
+
+def test_validator_collects_every_error():
+    with pytest.raises(validation.InvalidAnswers) as exc:
+        make_validator().validate([
+            schemas.Answer("Q1", "partial"),
+            schemas.Answer("Q2", "partial"),
+            schemas.Answer("Q3", "yes"),
+            schemas.Answer("Q2", "yes"),
+            schemas.Answer("Q2", "no"),
+        ])
+    assert [(e["index"], e["code"]) for e in exc.value.errors] == [
+        (0, "notes_required"), (1, "invalid_answer"), (2, "unknown_question"), (3, "duplicate"), (4, "duplicate")
+    ]
+    assert "Must be one of yes, no, n/a" in exc.value.errors[1]["message"]
+
+def test_validator_for_draft_deltas():
+    answers = make_validator().validate(
+        [schemas.Answer("Q1", None), schemas.Answer("Q1", "yes")], allow_clear=True, allow_duplicates=True
+    )
+    assert [a.answer for a in answers] == [None, "yes"]
+
+def test_submit_reports_all_errors(client, seed_questions):
+    response = client.post("/submit", json={"client_id": "acme", "answers": [
+        {"question_id": "Q-404", "answer": "yes"},
+        {"question_id": "Q-001", "answer": "maybe"},
+    ]})
+    assert response.status_code == 400
+    detail = response.json()["detail"]
+    assert detail["message"] == "2 invalid answers"
+    assert [e["code"] for e in detail["errors"]] == ["unknown_question", "invalid_answer"]
+
+def test_answer_type_rules_apply(client, db):
+    upload(client, CATALOG_CSV_CONTENT)
+    response = client.post("/submit", json={"client_id": "acme", "answers": [
+        {"question_id": "Q_001", "answer": "Partial", "notes": "Only for staff"},
+        {"question_id": "Q_002", "answer": " YES "},
+    ]})
+    assert response.status_code == 202
+    submission = crud.get_submission(db, response.json()["submission_id"])
+    assert crud.submission_answers(submission, catalog.get_catalog(db)) == [
+        {"question_id": "Q_001", "answer": "partial", "notes": "Only for staff"},
+        {"question_id": "Q_002", "answer": "yes", "notes": None},
+    ]
+
+    batch = client.post("/submit/batch", json=[
+        {"client_id": "acme", "answers": [{"question_id": "Q_001", "answer": "partial"}, {"question_id": "Q_001", "answer": "yes"}]}
+    ]).json()
+    assert [e["code"] for e in batch["items"][0]["errors"]] == ["notes_required", "duplicate"]